@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Build benchmark of build_transit_graph_v2.py on a synthetic or given GTFS feed.
+
+Generates a feed with generate_synthetic_gtfs.py (or uses --gtfs DIR), runs
+the builder in a subprocess for every --workers value and --repeat times,
+and reports from each run's build_stats sidecar (build_stats.py):
+    wall time, stream rows/s, peak RSS (main and worker processes),
+    output size (graph plus every extra file the flags produce)
+
+Builder outputs go to a temporary directory, never to data/. Arguments after
+"--" are passed to the builder (e.g. --cache, --timetable); with --cache the
+first run also builds data/gtfs_cache/, so use --repeat 2 or more.
+
+Usage:
+    python scripts/benchmark_transit_graph.py --preset region
+    python scripts/benchmark_transit_graph.py --preset national --keep-feed /tmp/gtfs_national
+    python scripts/benchmark_transit_graph.py --gtfs /tmp/gtfs_national --workers 1 --workers 8 --repeat 3
+    python scripts/benchmark_transit_graph.py --preset small --json bench.json -- --timetable --cluster-stops
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from generate_synthetic_gtfs import add_config_arguments, config_from_args, generate_feed
+
+BUILDER = Path(__file__).resolve().parent / "build_transit_graph_v2.py"
+
+
+def run_build(gtfs_dir: Path, out_dir: Path, workers: int, builder_args: list) -> dict:
+    """One builder run; returns its measurements and the build_stats sidecar."""
+    output = out_dir / "transit_graph.json"
+    for stale in out_dir.iterdir():
+        stale.unlink()
+    cmd = [sys.executable, str(BUILDER), "--feed", str(gtfs_dir), "--output", str(output),
+           "--workers", str(workers), *builder_args]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise SystemExit(f"Build failed ({' '.join(cmd)}):\n{proc.stderr[-2000:]}")
+
+    stats_path = output.with_name(f"{output.stem}_build_stats.json")
+    with open(stats_path, encoding="utf-8") as f:
+        stats = json.load(f)
+    stream = [s for s in stats["steps"] if s["step"] == "stream"]
+    rows = sum(s["rows"] for s in stream)
+    stream_seconds = sum(s["seconds"] for s in stream)
+    files = {p.name: p.stat().st_size for p in sorted(out_dir.iterdir())
+             if p.is_file() and p != stats_path}
+    return {
+        "workers": workers,
+        "wall_seconds": round(wall, 3),
+        "build_seconds": stats["total_seconds"],
+        "stream_rows": rows,
+        "stream_seconds": round(stream_seconds, 3),
+        "rows_per_s": round(rows / max(stream_seconds, 1e-9)),
+        "peak_rss_mb": max((s["peak_rss_mb"] or 0 for s in stats["steps"]), default=0),
+        "peak_children_rss_mb": max((s.get("peak_children_rss_mb") or 0 for s in stats["steps"]), default=0),
+        "graph_bytes": files.get(output.name, 0),
+        "output_bytes": sum(files.values()),
+        "files": files,
+        "steps": stats["steps"],
+    }
+
+
+def summarize(runs: list) -> dict:
+    """Median times and rates, maximum memory over the runs of one configuration."""
+    return {
+        "workers": runs[0]["workers"],
+        "runs": len(runs),
+        "wall_seconds": round(statistics.median(r["wall_seconds"] for r in runs), 3),
+        "rows_per_s": round(statistics.median(r["rows_per_s"] for r in runs)),
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+        "peak_children_rss_mb": max(r["peak_children_rss_mb"] for r in runs),
+        "output_bytes": runs[-1]["output_bytes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark build_transit_graph_v2.py; arguments after -- go to the builder")
+    parser.add_argument("--gtfs", type=Path, help="existing feed directory (default: generate one)")
+    parser.add_argument("--keep-feed", type=Path, metavar="DIR",
+                        help="generate the feed into DIR and keep it (default: temporary directory)")
+    parser.add_argument("--workers", type=int, action="append",
+                        help=f"builder --workers; repeat to compare (default: {os.cpu_count() or 1})")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per --workers value")
+    parser.add_argument("--json", type=Path, help="write config, feed summary and all runs here")
+    add_config_arguments(parser)
+    args, builder_args = parser.parse_known_args()
+    if builder_args[:1] == ["--"]:
+        builder_args = builder_args[1:]
+    workers_list = args.workers or [os.cpu_count() or 1]
+
+    with tempfile.TemporaryDirectory(prefix="transit_bench_") as tmp:
+        tmp = Path(tmp)
+        if args.gtfs:
+            gtfs_dir = args.gtfs
+            feed = {"dir": str(gtfs_dir),
+                    "bytes": sum(p.stat().st_size for p in gtfs_dir.glob("*.txt"))}
+        else:
+            gtfs_dir = args.keep_feed or tmp / "gtfs"
+            config = config_from_args(args)
+            print(f"Generating {args.preset} feed into {gtfs_dir} ...")
+            feed = {"dir": str(gtfs_dir), **generate_feed(gtfs_dir, config)}
+            print(f"  {feed['stop_times']:,} stop_times rows, {feed['bytes'] / 1e6:.1f} MB "
+                  f"in {feed['seconds']}s")
+
+        out_dir = tmp / "out"
+        out_dir.mkdir()
+        runs, results = [], []
+        for workers in workers_list:
+            config_runs = []
+            for i in range(args.repeat):
+                run = run_build(gtfs_dir, out_dir, workers, builder_args)
+                print(f"  workers={workers} run {i + 1}/{args.repeat}: {run['wall_seconds']:.1f}s, "
+                      f"{run['rows_per_s']:,} rows/s, peak RSS {run['peak_rss_mb']} MB")
+                config_runs.append(run)
+            runs.extend(config_runs)
+            results.append(summarize(config_runs))
+
+    print(f"\nFeed: {feed['dir']} ({feed['bytes'] / 1e6:.1f} MB)"
+          + (f", builder args: {' '.join(builder_args)}" if builder_args else ""))
+    print(f"{'workers':>7} {'wall s':>8} {'rows/s':>11} {'RSS MB':>8} {'workers MB':>10} {'output MB':>9}")
+    for r in results:
+        print(f"{r['workers']:>7} {r['wall_seconds']:>8.1f} {r['rows_per_s']:>11,} {r['peak_rss_mb']:>8.1f} "
+              f"{r['peak_children_rss_mb']:>10.1f} {r['output_bytes'] / 1e6:>9.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"created": time.strftime("%Y-%m-%d %H:%M:%S"), "feed": feed,
+                       "builder_args": builder_args, "results": results, "runs": runs},
+                      f, ensure_ascii=False, indent=1)
+        print(f"\nReport: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
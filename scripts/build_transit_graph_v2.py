@@ -7,20 +7,92 @@ Produces data/transit_graph.json with:
 - headways: {routeShort: headwayMinutes}
 - metadata
 
-Time profile: Monday 07:00-08:00 (morning commute to school).
+Default time profile: Monday 07:00-08:00 (morning commute to school).
+
+Usage:
+    python scripts/build_transit_graph_v2.py               # single process
+    python scripts/build_transit_graph_v2.py --workers 8   # stream stop_times.txt in 8 processes
+    python scripts/build_transit_graph_v2.py --cache       # reuse binary parse cache
+    python scripts/build_transit_graph_v2.py --binary      # also write transit_graph.bin (CSR)
+    python scripts/build_transit_graph_v2.py --tiles       # also write transit_graph_tiles/ (graph_tiles.py)
+    python scripts/build_transit_graph_v2.py --quantiles   # also write p10/p50/p90 per edge and route
+    python scripts/build_transit_graph_v2.py --walk-radius 0.4  # add walking edges (route "WALK")
+    python scripts/build_transit_graph_v2.py --timetable   # also write transit_graph_timetable.bin (RAPTOR)
+    python scripts/build_transit_graph_v2.py --contract    # also write transit_graph_contracted.json
+    python scripts/build_transit_graph_v2.py --frequencies # also write transit_graph_frequencies.bin
+    python scripts/build_transit_graph_v2.py --components prune  # drop stations that can't reach schools
+    python scripts/build_transit_graph_v2.py --cluster-stops     # merge same-name standalone stops nearby
+
+    # One graph from several feeds (IDs and routes namespaced as NAME:id, stations deduplicated):
+    python scripts/build_transit_graph_v2.py \
+        --feed CR=data/GTFS_CR --feed MHD=data/GTFS_CZ/MHD
+    python scripts/build_transit_graph_v2.py --state data/transit_graph_state.pkl  # for update_transit_graph.py
+    python scripts/build_transit_graph_v2.py --feed /tmp/synthetic --output /tmp/out/transit_graph.json
+
+    # Several profiles in one pass over stop_times.txt, one graph file each:
+    python scripts/build_transit_graph_v2.py \
+        --profile monday_07_08 \
+        --profile friday_pm=friday,13:00-15:00 \
+        --profile open_day=saturday,08:00-10:00,07:00-11:00 \
+        --profile first_school_day=2026-09-01,07:00-08:00
+
+Profile spec: NAME=DAY,HH:MM-HH:MM[,HH:MM-HH:MM]. DAY is a weekday (services
+whose calendar.txt flag is set, validity ignored) or a date YYYY-MM-DD
+(services active on that date: validity range + calendar_dates.txt, see
+service_calendar.py). The first window is the headway window, the optional
+second one filters trips by first departure (default: 30 min before to 60 min
+after the headway window). The default profile writes data/transit_graph.json,
+others data/transit_graph_<NAME>.json.
+
+With --workers N (N > 1, needs fork) stop_times.txt is split into byte ranges
+on trip_id boundaries and streamed by N worker processes; partial results are
+merged in file order, so the output is identical to the single-process build.
+Each worker holds its own partial graph, so memory grows with N.
+
+Every run writes per-step wall time, rows, rows/s and peak RSS to the graph
+metadata ("build_stats") and to data/transit_graph_build_stats.json
+(build_stats.py).
+
+With --cache the feed is parsed once into data/gtfs_cache/ (gtfs_cache.py) and
+memory-mapped on later runs; the cache is rebuilt when the feed files change.
 """
 
+import argparse
 import csv
 import json
+import math
+import multiprocessing
 import os
+import pickle
 import statistics
 import sys
 import time
-from collections import defaultdict
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from datetime import date
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from build_stats import BuildStats
+from departure_frequencies import (
+    MAX_HEADWAY, MIN_HEADWAY, median_gap_minutes, station_departures, write_frequencies,
+)
+from gtfs_cache import load_or_build
+from service_calendar import ServiceCalendar, parse_gtfs_date
+from stop_clusters import (
+    DEFAULT_CLUSTER_RADIUS_KM, apply_clusters, cluster_feed_duplicates, cluster_standalone_stops,
+    merge_parent_info, remap_parents,
+)
+from graph_components import MODES as COMPONENT_MODES, apply_components
+from graph_contraction import contract_graph, school_anchor_stops
+from graph_tiles import DEFAULT_TILE_DEG, write_tiles
+from transit_graph_binary import write_graph_binary
+from timetable_export import timetable_stops, write_timetable
+from walk_edges import add_walk_edges
+
 GTFS_DIR = Path(__file__).resolve().parent.parent / "data" / "GTFS_CR"
 OUTPUT = Path(__file__).resolve().parent.parent / "data" / "transit_graph.json"
+DEFAULT_SOURCE = "GTFS_CR (spojenka.cz)"  # metadata "source" of GTFS_DIR builds
 
 # Reference date for filtering: a Monday within the GTFS validity range
 # We'll pick the first Monday that falls within calendar validity
@@ -28,10 +100,59 @@ REFERENCE_WEEKDAY = "monday"
 HOUR_START = 7
 HOUR_END = 8
 
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
 # Blacklist known night routes to exclude from school accessibility analysis
 # Prague: 91-99 (night trams), 901-999 (night buses)
 NIGHT_ROUTE_PATTERNS = {'91', '92', '93', '94', '95', '96', '97', '98', '99'}
 
+# Travel times are accumulated as histograms with this bin width (seconds).
+# GTFS_CR times are whole minutes, so binning does not change the medians.
+TIME_BIN_SECONDS = 15
+
+# Sentinel for the time-string cache (None is a valid cached result)
+_UNPARSED = object()
+
+# Read-only state shared with shard workers (inherited via fork)
+_WORKER_STATE = {}
+
+# Format version of the --state file (see save_build_state)
+STATE_VERSION = 2
+
+
+@dataclass(frozen=True)
+class Profile:
+    """Time profile of one graph: service weekday, headway window and trip filter window."""
+    name: str
+    weekday: str
+    window_start: int  # headway window [start, end), seconds since midnight
+    window_end: int
+    trip_start: int    # trips whose first departure falls in [start, end), seconds
+    trip_end: int
+    service_date: date | None = None  # real date instead of the weekday flag
+
+    @property
+    def window_minutes(self) -> float:
+        return (self.window_end - self.window_start) / 60
+
+    @property
+    def day_label(self) -> str:
+        if self.service_date is not None:
+            return f"{self.service_date.isoformat()} ({self.weekday})"
+        return self.weekday
+
+
+DEFAULT_PROFILE = Profile(
+    name="monday_07_08",
+    weekday=REFERENCE_WEEKDAY,
+    window_start=HOUR_START * 3600,
+    window_end=HOUR_END * 3600,
+    trip_start=int(6.5 * 3600),
+    trip_end=9 * 3600,
+)
+
+PROFILE_PRESETS = {DEFAULT_PROFILE.name: DEFAULT_PROFILE}
+
 
 def parse_time_seconds(time_str: str) -> int | None:
     """Parse HH:MM:SS to seconds since midnight. Supports >24h."""
@@ -65,55 +186,500 @@ def is_night_route(route_short: str) -> bool:
     return False
 
 
-def main():
-    t0 = time.time()
+def _parse_clock(value: str) -> int:
+    """Parse "HH" or "HH:MM" to seconds since midnight."""
+    parts = value.strip().split(":")
+    hours = int(parts[0])
+    minutes = int(parts[1]) if len(parts) > 1 else 0
+    return hours * 3600 + minutes * 60
+
+
+def _parse_window(value: str) -> tuple[int, int]:
+    start, end = value.split("-")
+    start_sec, end_sec = _parse_clock(start), _parse_clock(end)
+    if end_sec <= start_sec:
+        raise ValueError(f"empty time window: {value}")
+    return start_sec, end_sec
+
+
+def parse_profile(spec: str) -> Profile:
+    """Parse NAME=DAY,HH:MM-HH:MM[,HH:MM-HH:MM] (DAY = weekday or YYYY-MM-DD) or a preset name."""
+    if "=" not in spec:
+        if spec not in PROFILE_PRESETS:
+            raise argparse.ArgumentTypeError(f"unknown profile preset: {spec}")
+        return PROFILE_PRESETS[spec]
+
+    name, rest = spec.split("=", 1)
+    parts = rest.split(",")
+    try:
+        weekday = parts[0].strip().lower()
+        service_date = parse_gtfs_date(weekday)
+        if service_date is not None:
+            weekday = WEEKDAYS[service_date.weekday()]
+        if weekday not in WEEKDAYS or len(parts) not in (2, 3):
+            raise ValueError(spec)
+        window_start, window_end = _parse_window(parts[1])
+        if len(parts) == 3:
+            trip_start, trip_end = _parse_window(parts[2])
+        else:
+            trip_start, trip_end = window_start - 1800, window_end + 3600
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid profile {spec!r}, expected NAME=DAY,HH:MM-HH:MM[,HH:MM-HH:MM]"
+        )
+    return Profile(name.strip(), weekday, window_start, window_end, max(0, trip_start), trip_end,
+                   service_date)
+
+
+def profile_output_path(profile: Profile, output: Path | None = None) -> Path:
+    """Default profile keeps transit_graph.json (read by /api/dostupnost)."""
+    output = output or OUTPUT
+    if profile.name == DEFAULT_PROFILE.name:
+        return output
+    return output.with_name(f"{output.stem}_{profile.name}{output.suffix}")
+
+
+def read_stop_times_header(path: Path) -> tuple[list[str], int]:
+    """Return stop_times.txt column names and the byte offset where data rows start."""
+    with open(path, "rb") as f:
+        first_line = f.readline()
+    header = next(csv.reader([first_line.decode("utf-8-sig")]))
+    return [h.strip() for h in header], len(first_line)
+
+
+def stop_times_columns(header: list[str]) -> tuple[int, int, int, int]:
+    """Column indices of (trip_id, stop_id, arrival_time, departure_time)."""
+    return (
+        header.index("trip_id"),
+        header.index("stop_id"),
+        header.index("arrival_time"),
+        header.index("departure_time"),
+    )
+
+
+def iter_stop_time_rows(path: Path, start: int, end: int | None = None):
+    """Yield parsed CSV rows of stop_times.txt from the byte range [start, end)."""
+    def lines():
+        with open(path, "rb") as f:
+            f.seek(start)
+            pos = start
+            for line in f:
+                if end is not None and pos >= end:
+                    break
+                pos += len(line)
+                yield line.decode("utf-8")
+
+    return csv.reader(lines())
+
+
+def iter_selected_trip_rows(path: Path, start: int, trip_ids: set[str], i_trip: int):
+    """Yield parsed CSV rows of the given trips only.
+
+    Other lines are rejected by a byte check of the trip_id field, without
+    decoding or CSV parsing, so scanning for a few changed trips is cheap.
+    """
+    selected = {trip_id.encode("utf-8") for trip_id in trip_ids}
+    with open(path, "rb") as f:
+        f.seek(start)
+        for line in f:
+            if b'"' not in line:
+                fields = line.split(b",", i_trip + 1)
+                if len(fields) <= i_trip or fields[i_trip].rstrip(b"\r\n") not in selected:
+                    continue
+            row = next(csv.reader([line.decode("utf-8")]))
+            if len(row) > i_trip and row[i_trip] in trip_ids:
+                yield row
+
+
+def shard_offsets(path: Path, n_shards: int, i_trip: int, data_start: int) -> list[tuple[int, int]]:
+    """Split stop_times.txt into byte ranges that start on a trip_id boundary.
+
+    Rows of one trip are contiguous in GTFS stop_times (the single-pass build
+    relies on that too), so each range holds whole trips only.
+    """
+    size = os.path.getsize(path)
+    boundaries = [data_start]
+
+    with open(path, "rb") as f:
+        for k in range(1, n_shards):
+            target = data_start + k * (size - data_start) // n_shards
+            if target <= boundaries[-1]:
+                continue
+            f.seek(target)
+            f.readline()  # skip the partial line
+            pos = f.tell()
+            first_trip = None
+            while True:
+                line = f.readline()
+                if not line:
+                    pos = size
+                    break
+                row = next(csv.reader([line.decode("utf-8")]), [])
+                if not row:
+                    pos += len(line)
+                    continue
+                trip_id = row[i_trip]
+                if first_trip is None:
+                    first_trip = trip_id
+                elif trip_id != first_trip:
+                    break
+                pos += len(line)
+            if boundaries[-1] < pos < size:
+                boundaries.append(pos)
+
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def new_accumulators():
+    """Per-profile accumulators: (edge_data, headway_departures).
+
+    - edge_data: (parent_from, parent_to) → {route_short: Counter{time_bin: trips}}
+      with time_bin = travel_seconds // TIME_BIN_SECONDS, so memory grows with
+      edges × distinct travel times, not with trips
+    - headway_departures: (route_short, parent_stop) → [departure_seconds in headway window]
+    """
+    return defaultdict(lambda: defaultdict(Counter)), defaultdict(list)
+
+
+def make_trip_processor(trip_info: dict, stop_parent: dict, profiles: list[Profile], accumulators: list,
+                        contributions: dict | None = None, timetable_trips: list | None = None):
+    """Return process_trip(trip_id, stops_list) feeding the per-profile accumulators.
+
+    stops_list is [(stop_id, arrival_sec, departure_sec), ...] of one trip with
+    None for missing times. Shared by the CSV stream and the parse-cache stream.
+
+    If contributions is a dict, every accepted trip is recorded there as
+    trip_id → (route_short, profile_indices, [(edge, time_bin), ...],
+    first_parent, first_departure), so it can be subtracted again later
+    (see remove_trip_contribution).
+
+    If timetable_trips is a list, every accepted trip is appended as
+    (trip_id, route_short, profile_indices, [(parent, arrival, departure), ...])
+    for the timetable export (see timetable_export.py).
+    """
+    mask_profiles = {}  # profile_mask → [(profile_index, profile, edge_data, headway_departures), ...]
+
+    def process_trip(trip_id, stops_list):
+        """Process a complete trip: extract consecutive edges and headway data."""
+        info = trip_info.get(trip_id)
+        if not info:
+            return
+        route_short, mask = info
+
+        # Filter: exclude night routes (91-99, 901-999)
+        if is_night_route(route_short):
+            return
+
+        # Filter: only process trips with departures in the profile's trip window
+        # (6:30-9:00 by default). This excludes night services ending early morning
+        # (e.g., night trams ending 5:00-6:30)
+        dep_times = [dep for _, _, dep in stops_list if dep is not None]
+        if not dep_times:
+            return
+        min_dep = min(dep_times)
+
+        targets = mask_profiles.get(mask)
+        if targets is None:
+            targets = mask_profiles[mask] = [
+                (i, profile, *accumulators[i])
+                for i, profile in enumerate(profiles) if mask >> i & 1
+            ]
+        targets = [t for t in targets if t[1].trip_start <= min_dep < t[1].trip_end]
+        if not targets:
+            return
+
+        trip_edges = []
+        for i in range(len(stops_list) - 1):
+            sid_from, _, dep_sec_from = stops_list[i]
+            sid_to, arr_sec_to, _ = stops_list[i + 1]
+
+            if dep_sec_from is None or arr_sec_to is None:
+                continue
+
+            parent_from = stop_parent.get(sid_from, sid_from)
+            parent_to = stop_parent.get(sid_to, sid_to)
+
+            if parent_from == parent_to:
+                continue
+
+            travel_sec = arr_sec_to - dep_sec_from
+            if travel_sec < 0:
+                continue
+            if travel_sec > 7200:  # Skip edges > 2 hours (data errors)
+                continue
+
+            trip_edges.append(((parent_from, parent_to), travel_sec // TIME_BIN_SECONDS))
 
+        first_sid, _, first_dep = stops_list[0]
+        first_parent = stop_parent.get(first_sid, first_sid)
+
+        for _, profile, edge_data, headway_departures in targets:
+            for edge, time_bin in trip_edges:
+                edge_data[edge][route_short][time_bin] += 1
+
+            # Headway: collect departures from first stop in the headway window
+            if first_dep is not None:
+                if profile.window_start <= first_dep < profile.window_end:
+                    headway_departures[(route_short, first_parent)].append(first_dep)
+
+        if contributions is not None:
+            contributions[trip_id] = (
+                route_short, tuple(t[0] for t in targets), trip_edges, first_parent, first_dep
+            )
+        if timetable_trips is not None:
+            timetable_trips.append((
+                trip_id, route_short, tuple(t[0] for t in targets), timetable_stops(stops_list, stop_parent)
+            ))
+
+    return process_trip
+
+
+def remove_trip_contribution(accumulators: list, profiles: list[Profile], contribution: tuple):
+    """Subtract one recorded trip (see make_trip_processor) from the accumulators."""
+    route_short, profile_indices, trip_edges, first_parent, first_dep = contribution
+    for i in profile_indices:
+        edge_data, headway_departures = accumulators[i]
+        for edge, time_bin in trip_edges:
+            route_times = edge_data[edge]
+            counts = route_times[route_short]
+            counts[time_bin] -= 1
+            if counts[time_bin] <= 0:
+                del counts[time_bin]
+            if not counts:
+                del route_times[route_short]
+            if not route_times:
+                del edge_data[edge]
+
+        profile = profiles[i]
+        if first_dep is not None and profile.window_start <= first_dep < profile.window_end:
+            key = (route_short, first_parent)
+            departures = headway_departures[key]
+            departures.remove(first_dep)
+            if not departures:
+                del headway_departures[key]
+
+
+def stream_stop_times(rows, cols, trip_info: dict, stop_parent: dict,
+                      profiles: list[Profile], progress: bool = False,
+                      contributions: dict | None = None, timetable_trips: list | None = None):
+    """Build edge and headway accumulators for every profile in one pass.
+
+    trip_info maps trip_id → (route_short, profile_mask); bit i of the mask is
+    set when the trip's service runs on the weekday of profiles[i]. Per-trip
+    contributions and timetable trips are recorded when given.
+
+    Returns (accumulators, lines_processed, distinct_times) with one
+    (edge_data, headway_departures) pair per profile.
+    """
+    i_trip, i_stop, i_arr, i_dep = cols
+
+    accumulators = [new_accumulators() for _ in profiles]
+    process_trip = make_trip_processor(
+        trip_info, stop_parent, profiles, accumulators, contributions, timetable_trips
+    )
+
+    # Process trip by trip
+    current_trip_id = None
+    trip_stops = []  # [(stop_id, arrival_sec, departure_sec), ...]
+
+    # Parsed "HH:MM:SS" → seconds; distinct time strings are few compared to rows
+    time_cache = {}
+
+    lines_processed = 0
+    for lines_processed, row in enumerate(rows, 1):
+        if progress and not lines_processed % 1_000_000:
+            print(f"  ...{lines_processed / 1_000_000:.0f}M lines")
+        if not row:
+            continue
+
+        tid = row[i_trip]
+
+        # Trip boundary
+        if tid != current_trip_id:
+            if current_trip_id and trip_stops:
+                process_trip(current_trip_id, trip_stops)
+            current_trip_id = tid
+            trip_stops = []
+
+        # Skip trips outside every profile early (before touching any other column)
+        if tid not in trip_info:
+            continue
+
+        arr_str = row[i_arr]
+        arr = time_cache.get(arr_str, _UNPARSED)
+        if arr is _UNPARSED:
+            arr = time_cache[arr_str] = parse_time_seconds(arr_str)
+
+        dep_str = row[i_dep]
+        if dep_str == arr_str:
+            dep = arr
+        else:
+            dep = time_cache.get(dep_str, _UNPARSED)
+            if dep is _UNPARSED:
+                dep = time_cache[dep_str] = parse_time_seconds(dep_str)
+
+        trip_stops.append((row[i_stop], arr, dep))
+
+    # Don't forget the last trip
+    if current_trip_id and trip_stops:
+        process_trip(current_trip_id, trip_stops)
+
+    return accumulators, lines_processed, len(time_cache)
+
+
+def _stream_shard(bounds: tuple[int, int]):
+    """Worker: stream one byte range of stop_times.txt (state inherited via fork)."""
+    state = _WORKER_STATE
+    rows = iter_stop_time_rows(state["path"], *bounds)
+    contributions = {} if state["record"] else None
+    timetable_trips = [] if state["timetable"] else None
+    accumulators, lines, distinct_times = stream_stop_times(
+        rows, state["cols"], state["trip_info"], state["stop_parent"], state["profiles"],
+        contributions=contributions, timetable_trips=timetable_trips,
+    )
+    return plain_accumulators(accumulators), lines, distinct_times, contributions, timetable_trips
+
+
+def merge_accumulators(accumulators: list, other: list):
+    """Add other per-profile accumulators (plain or defaultdict) into accumulators."""
+    for (edge_data, headway_departures), (other_edges, other_headways) in zip(accumulators, other):
+        for edge, route_times in other_edges.items():
+            target = edge_data[edge]
+            for route_short, counts in route_times.items():
+                target[route_short].update(counts)
+        for key, departures in other_headways.items():
+            headway_departures[key].extend(departures)
+
+
+def plain_accumulators(accumulators: list) -> list:
+    """defaultdict(lambda) can't be pickled: convert to plain dicts (Counters stay)."""
+    return [
+        ({edge: dict(route_times) for edge, route_times in edge_data.items()}, dict(headway_departures))
+        for edge_data, headway_departures in accumulators
+    ]
+
+
+def restore_accumulators(plain: list) -> list:
+    """Inverse of plain_accumulators()."""
+    accumulators = []
+    for plain_edges, plain_headways in plain:
+        edge_data, headway_departures = new_accumulators()
+        for edge, route_times in plain_edges.items():
+            edge_data[edge].update(route_times)
+        headway_departures.update(plain_headways)
+        accumulators.append((edge_data, headway_departures))
+    return accumulators
+
+
+def save_build_state(path: Path, gtfs_dir: Path, profiles: list[Profile],
+                     accumulators: list, contributions: dict, cluster_radius: float | None = None,
+                     output: Path = OUTPUT, options: dict | None = None,
+                     timetable_trips: list | None = None):
+    """Persist accumulators + per-trip contributions for update_transit_graph.py.
+
+    The output path and artifact options (see output_options) are stored too,
+    so an update rewrites the same files; timetable_trips are kept when the
+    build writes a timetable or frequencies. Internal pickle format
+    (STATE_VERSION); profiles are stored as dicts so the file loads regardless
+    of how this module was imported.
+    """
+    state = {
+        "version": STATE_VERSION,
+        "gtfs_dir": str(gtfs_dir),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "profiles": [asdict(p) for p in profiles],
+        "accumulators": plain_accumulators(accumulators),
+        "contributions": contributions,
+        "cluster_radius": cluster_radius,
+        "output": str(output),
+        "options": options or {},
+        "timetable_trips": timetable_trips,
+    }
+    with open(path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"State: {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB, {len(contributions)} trips)")
+
+
+def load_build_state(path: Path) -> dict:
+    """Load a --state file; accumulators come back as defaultdicts, profiles as Profile."""
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != STATE_VERSION:
+        raise ValueError(f"{path}: state version {state.get('version')}, expected {STATE_VERSION}")
+    state["profiles"] = [Profile(**p) for p in state["profiles"]]
+    state["accumulators"] = restore_accumulators(state["accumulators"])
+    return state
+
+
+def report_service_masks(calendar: ServiceCalendar, service_mask: list[int], profiles: list[Profile]):
+    """Print active service counts per profile, warn about dates outside the feed."""
+    print(f"  Feed validity {calendar.start} .. {calendar.end}, {len(calendar.service_ids)} services")
+    for i, profile in enumerate(profiles):
+        count = sum(1 for mask in service_mask if mask >> i & 1)
+        print(f"  {count} {profile.day_label} service_ids ({profile.name})")
+        if profile.service_date is not None and not calendar.covers(profile.service_date):
+            print(f"  WARNING: {profile.service_date} is outside the feed validity")
+
+
+def load_feed(gtfs_dir: Path, profiles: list[Profile], stats: BuildStats | None = None):
+    """Steps 1-4 from the GTFS CSV files (timed into stats when given).
+
+    Returns (trip_info, stop_parent, parent_info):
+    - trip_info: trip_id → (route_short, profile_mask)
+    - stop_parent: stop_id → parent_station (or itself)
+    - parent_info: parent_id → (name, lat, lon)
+    """
     # --- Step 1: Load routes.txt → route_id → route_short_name ---
+    stats = stats or BuildStats()
     print("Loading routes.txt...")
     route_id_to_short = {}
-    with open(GTFS_DIR / "routes.txt", encoding="utf-8-sig") as f:
+    rows = 0
+    with open(gtfs_dir / "routes.txt", encoding="utf-8-sig") as f:
         reader = csv.DictReader(f)
-        for row in reader:
+        for rows, row in enumerate(reader, 1):
             rid = row["route_id"].strip()
             short = row.get("route_short_name", "").strip()
             if rid and short:
                 route_id_to_short[rid] = short
     print(f"  {len(route_id_to_short)} routes loaded")
+    stats.lap("routes", rows)
 
-    # --- Step 2: Load calendar.txt → Monday service_ids ---
+    # --- Step 2: Compile calendar.txt + calendar_dates.txt → service index → profile mask ---
     print("Loading calendar.txt...")
-    monday_service_ids = set()
-    with open(GTFS_DIR / "calendar.txt", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row.get(REFERENCE_WEEKDAY, "0") == "1":
-                monday_service_ids.add(row["service_id"].strip())
-    print(f"  {len(monday_service_ids)} Monday service_ids")
+    calendar = ServiceCalendar.from_gtfs(gtfs_dir)
+    service_mask = calendar.profile_masks(profiles)
+    report_service_masks(calendar, service_mask, profiles)
+    stats.lap("calendar", len(calendar.service_ids))
 
-    # --- Step 3: Load trips.txt → filter Monday trips → trip_id → route_short_name ---
+    # --- Step 3: Load trips.txt → trip_id → (route_short_name, profile mask) ---
     print("Loading trips.txt...")
-    trip_to_route_short = {}
-    with open(GTFS_DIR / "trips.txt", encoding="utf-8-sig") as f:
+    trip_info = {}
+    rows = 0
+    with open(gtfs_dir / "trips.txt", encoding="utf-8-sig") as f:
         reader = csv.DictReader(f)
-        for row in reader:
-            sid = row["service_id"].strip()
-            if sid not in monday_service_ids:
+        for rows, row in enumerate(reader, 1):
+            service = calendar.index.get(row["service_id"].strip())
+            mask = service_mask[service] if service is not None else 0
+            if not mask:
                 continue
             tid = row["trip_id"].strip()
             rid = row["route_id"].strip()
             short = route_id_to_short.get(rid, "")
             if tid and short:
-                trip_to_route_short[tid] = short
-    print(f"  {len(trip_to_route_short)} Monday trips with route info")
+                trip_info[tid] = (short, mask)
+    print(f"  {len(trip_info)} trips with route info in at least one profile")
+    stats.lap("trips", rows)
 
     # --- Step 4: Load stops.txt → stop_id → parent_station, name, lat, lon ---
     print("Loading stops.txt...")
     stop_parent = {}  # stop_id → parent_station (or itself if location_type=1)
     parent_info = {}  # parent_id → (name, lat, lon)
 
-    with open(GTFS_DIR / "stops.txt", encoding="utf-8-sig") as f:
+    rows = 0
+    with open(gtfs_dir / "stops.txt", encoding="utf-8-sig") as f:
         reader = csv.DictReader(f)
-        for row in reader:
+        for rows, row in enumerate(reader, 1):
             sid = row["stop_id"].strip()
             name = row["stop_name"].strip()
             lat = row.get("stop_lat", "")
@@ -140,137 +706,279 @@ def main():
                     parent_info[sid] = (name, lat_f, lon_f)
 
     print(f"  {len(parent_info)} parent stations")
+    stats.lap("stops", rows)
 
-    # --- Step 5: Stream stop_times.txt → build edges + headway data ---
-    print("Streaming stop_times.txt (this may take a while)...")
-    t_stream = time.time()
+    return trip_info, stop_parent, parent_info
 
-    # Edge data: (parent_from, parent_to) → {route_short: [travel_time_seconds, ...]}
-    edge_data = defaultdict(lambda: defaultdict(list))
 
-    # Headway data: (route_short, parent_stop) → [departure_seconds in 7-8 window]
-    headway_departures = defaultdict(list)
+def parse_feed(spec: str) -> tuple[str, Path]:
+    """Parse --feed [NAME=]DIR; NAME defaults to the directory name."""
+    name, sep, path = spec.partition("=")
+    if not sep:
+        name, path = Path(spec).name, spec
+    if not name or ":" in name or "|" in name:
+        raise argparse.ArgumentTypeError(f"invalid feed name in {spec!r}")
+    return name, Path(path)
 
-    # Process trip by trip
-    current_trip_id = None
-    trip_stops = []  # [(stop_id, arrival_sec, departure_sec), ...]
 
-    def process_trip(trip_id, stops_list):
-        """Process a complete trip: extract consecutive edges and headway data."""
-        route_short = trip_to_route_short.get(trip_id)
-        if not route_short:
-            return
-
-        # Filter: exclude night routes (91-99, 901-999)
-        if is_night_route(route_short):
-            return
-
-        # Filter: only process trips with departures in the school commute window (6:30-9:00)
-        # This excludes night services ending early morning (e.g., night trams ending 5:00-6:30)
-        dep_times = [dep for _, _, dep in stops_list if dep is not None]
-        if not dep_times:
-            return
-        min_dep = min(dep_times)
-        if min_dep < 6.5 * 3600 or min_dep >= 9 * 3600:  # 6:30-9:00
-            return
-
-        for i in range(len(stops_list) - 1):
-            sid_from, _, dep_sec_from = stops_list[i]
-            sid_to, arr_sec_to, _ = stops_list[i + 1]
+def feed_source(feeds: list[tuple[str, Path]]) -> str:
+    """Metadata "source": DEFAULT_SOURCE for GTFS_DIR, else "NAME (DIR)" per feed."""
+    if len(feeds) == 1 and feeds[0][1].resolve() == GTFS_DIR:
+        return DEFAULT_SOURCE
+    return ", ".join(f"{name} ({gtfs_dir})" for name, gtfs_dir in feeds)
 
-            if dep_sec_from is None or arr_sec_to is None:
-                continue
 
-            parent_from = stop_parent.get(sid_from, sid_from)
-            parent_to = stop_parent.get(sid_to, sid_to)
+def namespace_feed(name: str, trip_info: dict, stop_parent: dict, parent_info: dict):
+    """Prefix parent stations and routes of one feed with "NAME:" (multi-feed builds).
 
-            if parent_from == parent_to:
-                continue
-
-            travel_sec = arr_sec_to - dep_sec_from
-            if travel_sec < 0:
-                continue
-            if travel_sec > 7200:  # Skip edges > 2 hours (data errors)
-                continue
+    Synthetic parents "a|b" become "NAME:a|NAME:b". Night routes are dropped
+    here, since the night filter only recognizes unprefixed route names.
+    """
+    def namespaced(parent):
+        return "|".join(f"{name}:{member}" for member in parent.split("|"))
 
-            edge_data[(parent_from, parent_to)][route_short].append(travel_sec)
+    trip_info = {
+        tid: (f"{name}:{short}", mask)
+        for tid, (short, mask) in trip_info.items() if not is_night_route(short)
+    }
+    stop_parent = {sid: namespaced(parent) for sid, parent in stop_parent.items()}
+    parent_info = {namespaced(parent): info for parent, info in parent_info.items()}
+    return trip_info, stop_parent, parent_info
 
-        # Headway: collect departures from first stop in 7:00-8:00 window
-        if stops_list:
-            first_sid, _, first_dep = stops_list[0]
-            if first_dep is not None:
-                if HOUR_START * 3600 <= first_dep < HOUR_END * 3600:
-                    parent = stop_parent.get(first_sid, first_sid)
-                    headway_departures[(route_short, parent)].append(first_dep)
 
-    lines_processed = 0
-    with open(GTFS_DIR / "stop_times.txt", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            lines_processed += 1
-            if lines_processed % 1_000_000 == 0:
-                print(f"  ...{lines_processed / 1_000_000:.0f}M lines")
+def cluster_feed_stops(stop_parent: dict, parent_info: dict, radius_km: float) -> int:
+    """Step 4b: merge standalone stops with the same name nearby (stop_clusters.py), in place."""
+    print(f"Clustering standalone stops within {radius_km} km...")
+    clusters = cluster_standalone_stops(stop_parent, parent_info, radius_km)
+    count = apply_clusters(stop_parent, parent_info, clusters)
+    print(f"  {len(clusters)} stops merged into {count} clusters, {len(parent_info)} parent stations")
+    return len(clusters)
 
-            tid = row["trip_id"].strip()
 
-            # Trip boundary
-            if tid != current_trip_id:
-                if current_trip_id and trip_stops:
-                    process_trip(current_trip_id, trip_stops)
-                current_trip_id = tid
-                trip_stops = []
+def stream_feed(gtfs_dir: Path, trip_info: dict, stop_parent: dict,
+                profiles: list[Profile], workers: int, contributions: dict | None = None,
+                rows=None, timetable_trips: list | None = None):
+    """Step 5 from stop_times.txt, sharded across worker processes when workers > 1.
 
-            # Skip non-Monday trips early
-            if tid not in trip_to_route_short:
-                continue
+    rows optionally replaces the single-process row iterator (e.g. rows of
+    selected trips only). Per-trip contributions and timetable trips are
+    recorded when given.
 
-            sid = row["stop_id"].strip()
-            arr = parse_time_seconds(row.get("arrival_time", ""))
-            dep = parse_time_seconds(row.get("departure_time", ""))
-            seq = int(row.get("stop_sequence", "0"))
+    Returns (accumulators, lines_processed, distinct_times).
+    """
+    stop_times_path = gtfs_dir / "stop_times.txt"
+    header, data_start = read_stop_times_header(stop_times_path)
+    cols = stop_times_columns(header)
+
+    shards = []
+    if workers > 1 and rows is None:
+        shards = shard_offsets(stop_times_path, workers, cols[0], data_start)
+
+    if len(shards) > 1:
+        print(f"  {len(shards)} shards on {workers} worker processes")
+        _WORKER_STATE.update(
+            path=stop_times_path,
+            cols=cols,
+            trip_info=trip_info,
+            stop_parent=stop_parent,
+            profiles=profiles,
+            record=contributions is not None,
+            timetable=timetable_trips is not None,
+        )
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            results = pool.map(_stream_shard, shards, chunksize=1)
+        _WORKER_STATE.clear()
+
+        # Merge in shard order so edge insertion order matches the single-process build
+        accumulators = [new_accumulators() for _ in profiles]
+        lines_processed = 0
+        distinct_times = 0
+        for shard_accumulators, shard_lines, shard_times, shard_contributions, shard_trips in results:
+            merge_accumulators(accumulators, shard_accumulators)
+            lines_processed += shard_lines
+            distinct_times = max(distinct_times, shard_times)
+            if contributions is not None:
+                contributions.update(shard_contributions)
+            if timetable_trips is not None:
+                timetable_trips.extend(shard_trips)
+    else:
+        if rows is None:
+            rows = iter_stop_time_rows(stop_times_path, data_start)
+        accumulators, lines_processed, distinct_times = stream_stop_times(
+            rows, cols, trip_info, stop_parent, profiles, progress=True,
+            contributions=contributions, timetable_trips=timetable_trips,
+        )
+
+    return accumulators, lines_processed, distinct_times
+
+
+def load_cached_feed(cache, profiles: list[Profile], stats: BuildStats | None = None):
+    """Steps 1-4 from the binary parse cache (see gtfs_cache.py), timed into stats.
+
+    Returns (trip_info, stop_parent, parent_info) like the CSV loaders, but
+    trip_info and stop_parent are keyed by the cache's integer indices.
+    """
+    stats = stats or BuildStats()
+    short_names = cache.strings("route_short_names")
+    route_short = cache.array("route_short")
+    stats.lap("routes", len(route_short))
+
+    calendar = ServiceCalendar.from_cache(cache)
+    service_mask = calendar.profile_masks(profiles)
+    report_service_masks(calendar, service_mask, profiles)
+    stats.lap("calendar", len(calendar.service_ids))
+
+    trip_info = {}
+    trip_route = cache.array("trip_route")
+    for tid, (rid, sid) in enumerate(zip(trip_route, cache.array("trip_service"))):
+        mask = service_mask[sid]
+        if mask and rid >= 0 and route_short[rid] >= 0:
+            trip_info[tid] = (short_names[route_short[rid]], mask)
+    print(f"  {len(trip_info)} trips with route info in at least one profile")
+    stats.lap("trips", len(trip_route))
+
+    stop_ids = cache.strings("stop_ids")
+    stop_names = cache.strings("stop_names")
+    stop_lat, stop_lon = cache.array("stop_lat"), cache.array("stop_lon")
+    location_type = cache.array("stop_location_type")
+
+    stop_parent = {}
+    parent_info = {}
+    for idx, parent in enumerate(cache.array("stop_parent")):
+        stop_parent[idx] = stop_ids[parent]
+        if location_type[idx] < 0:
+            continue  # referenced by stop_times/parent_station but missing in stops.txt
+        lat, lon = stop_lat[idx], stop_lon[idx]
+        if math.isnan(lat) or math.isnan(lon):
+            lat, lon = 0.0, 0.0
+        if location_type[idx] == 1 or (parent == idx and stop_ids[idx] not in parent_info):
+            parent_info[stop_ids[idx]] = (stop_names[idx], lat, lon)
+    print(f"  {len(parent_info)} parent stations")
+    stats.lap("stops", len(stop_ids))
+
+    return trip_info, stop_parent, parent_info
+
+
+def stream_cached_stop_times(cache, trip_info: dict, stop_parent: dict, profiles: list[Profile],
+                             contributions: dict | None = None, timetable_trips: list | None = None):
+    """Step 5 from the parse cache: whole trips are skipped by their precomputed
+    first departure before any row is touched."""
+    accumulators = [new_accumulators() for _ in profiles]
+    recorded = {} if contributions is not None else None
+    recorded_trips = [] if timetable_trips is not None else None
+    process_trip = make_trip_processor(
+        trip_info, stop_parent, profiles, accumulators, recorded, recorded_trips
+    )
+
+    st_stop = cache.array("st_stop")
+    st_arr = cache.array("st_arrival")
+    st_dep = cache.array("st_departure")
+    group_offset = cache.array("group_offset")
+    group_min_dep = cache.array("group_min_departure")
+    trip_start = min(p.trip_start for p in profiles)
+    trip_end = max(p.trip_end for p in profiles)
+
+    trips_processed = 0
+    for g, tid in enumerate(cache.array("group_trip")):
+        if tid not in trip_info:
+            continue
+        if not trip_start <= group_min_dep[g] < trip_end:
+            continue
+        lo, hi = group_offset[g], group_offset[g + 1]
+        process_trip(tid, [
+            (sid, arr if arr >= 0 else None, dep if dep >= 0 else None)
+            for sid, arr, dep in zip(st_stop[lo:hi], st_arr[lo:hi], st_dep[lo:hi])
+        ])
+        trips_processed += 1
 
-            trip_stops.append((sid, arr, dep))
+    if recorded is not None or recorded_trips is not None:
+        trip_ids = cache.strings("trip_ids")
+    if recorded is not None:
+        contributions.update((trip_ids[tid], contribution) for tid, contribution in recorded.items())
+    if recorded_trips is not None:
+        timetable_trips.extend((trip_ids[tid], *rest) for tid, *rest in recorded_trips)
 
-    # Don't forget the last trip
-    if current_trip_id and trip_stops:
-        process_trip(current_trip_id, trip_stops)
+    return accumulators, len(st_stop), trips_processed
 
-    print(f"  Processed {lines_processed} lines in {time.time() - t_stream:.1f}s")
-    print(f"  Raw edge pairs: {len(edge_data)}")
 
-    # --- Step 6: Compute headways per route (before edge aggregation, so we can filter) ---
-    print("Computing headways...")
+def compute_headways(headway_departures: dict, profile: Profile) -> dict:
+    """Median headway per route_short from first-stop departures in the window."""
     route_headways_raw = defaultdict(list)
 
     for (route_short, parent_stop), departures in headway_departures.items():
-        if len(departures) < 2:
-            # Single departure → can't compute interval, estimate from count
-            # 1 departure in 60 min window → headway ≈ 60
-            route_headways_raw[route_short].append(60.0)
-            continue
-        departures_sorted = sorted(departures)
-        intervals = [
-            (departures_sorted[i + 1] - departures_sorted[i]) / 60
-            for i in range(len(departures_sorted) - 1)
-        ]
-        if intervals:
-            route_headways_raw[route_short].append(statistics.median(intervals))
+        route_headways_raw[route_short].append(median_gap_minutes(departures, profile.window_minutes))
 
     headways_out = {}
     for route_short, values in route_headways_raw.items():
         h = round(statistics.median(values), 1)
         # Clamp between 2 and 120 min
-        h = max(2.0, min(120.0, h))
+        h = max(MIN_HEADWAY, min(MAX_HEADWAY, h))
         headways_out[route_short] = h
 
-    print(f"  Headways computed for {len(headways_out)} routes")
+    return headways_out
 
-    # Sample headways
-    sample_routes = sorted(headways_out.items(), key=lambda x: x[1])[:10]
-    print(f"  Shortest headway routes: {sample_routes}")
 
-    # --- Step 7: Aggregate edges (filter routes without headway data) ---
-    print("Aggregating edges...")
+def histogram_median(counts: dict) -> float:
+    """statistics.median of a {time_bin: count} histogram, in seconds.
+
+    Even counts average the two middle values, like statistics.median.
+    """
+    total = sum(counts.values())
+    lo_rank, hi_rank = (total - 1) // 2, total // 2
+    lo = None
+    seen = 0
+    for time_bin, count in sorted(counts.items()):
+        seen += count
+        if lo is None and seen > lo_rank:
+            lo = time_bin
+        if seen > hi_rank:
+            return (lo + time_bin) * TIME_BIN_SECONDS / 2
+    raise ValueError("empty histogram")
+
+
+def histogram_quantile(counts: dict, q: float) -> int:
+    """Nearest-rank quantile (0 < q < 1) of a {time_bin: count} histogram, in seconds."""
+    total = sum(counts.values())
+    rank = max(0, math.ceil(q * total) - 1)
+    seen = 0
+    for time_bin, count in sorted(counts.items()):
+        seen += count
+        if seen > rank:
+            return time_bin * TIME_BIN_SECONDS
+    raise ValueError("empty histogram")
+
+
+def travel_time_quantiles(edge_data: dict, headways_out: dict) -> dict:
+    """p10/p50/p90 travel times (minutes) and trip counts per edge and per route.
+
+    {from: {to: {"all": [p10, p50, p90, trips], route_short: [...], ...}}},
+    limited to routes with headway data like the aggregated edges.
+    """
+    def summary(counts):
+        return [
+            round(histogram_quantile(counts, 0.1) / 60, 1),
+            round(histogram_median(counts) / 60, 1),
+            round(histogram_quantile(counts, 0.9) / 60, 1),
+            sum(counts.values()),
+        ]
+
+    quantiles = defaultdict(dict)
+    for (p_from, p_to), route_times in edge_data.items():
+        routes = sorted(r for r in route_times if r in headways_out)
+        if not routes:
+            continue
+        all_times = Counter()
+        for route_short in routes:
+            all_times.update(route_times[route_short])
+        entry = {"all": summary(all_times)}
+        for route_short in routes:
+            entry[route_short] = summary(route_times[route_short])
+        quantiles[p_from][p_to] = entry
+    return {k: dict(sorted(v.items())) for k, v in sorted(quantiles.items())}
+
+
+def aggregate_edges(edge_data: dict, headways_out: dict) -> tuple[dict, int]:
+    """Reduce per-route travel times to one median edge (routes without headway dropped)."""
     edges_out = defaultdict(list)
     total_edges = 0
 
@@ -284,14 +992,14 @@ def main():
             continue
 
         # Compute travel times only for routes with headway
-        all_times = []
+        all_times = Counter()
         for route_short in route_shorts:
-            all_times.extend(route_times[route_short])
+            all_times.update(route_times[route_short])
 
         if not all_times:
             continue
 
-        median_sec = statistics.median(all_times)
+        median_sec = histogram_median(all_times)
         median_min = round(median_sec / 60, 1)
 
         # Clamp minimum to 0.5 min
@@ -304,10 +1012,11 @@ def main():
         edges_out[p_from].append([p_to, median_min, route_shorts])
         total_edges += 1
 
-    print(f"  Aggregated edges: {total_edges}")
+    return edges_out, total_edges
 
-    # --- Step 8: Build stops dict (only parents that appear in edges) ---
-    print("Building stops dict...")
+
+def build_stops(edges_out: dict, parent_info: dict) -> dict:
+    """Stops dict with only the parents that appear in edges."""
     relevant_parents = set()
     for p_from, neighbors in edges_out.items():
         relevant_parents.add(p_from)
@@ -320,37 +1029,406 @@ def main():
         if info:
             name, lat, lon = info
             stops_out[pid] = [name, lat, lon]
+    return stops_out
+
+
+def build_profile_graph(profile: Profile, edge_data: dict, headway_departures: dict,
+                        parent_info: dict, output_path: Path, binary: bool = False,
+                        tile_deg: float | None = None, quantiles: bool = False,
+                        walk_radius: float | None = None, contract: bool = False,
+                        components: str | None = None, stats: BuildStats | None = None,
+                        feeds: list[str] | None = None, source: str = DEFAULT_SOURCE):
+    """Steps 6-9 for one profile: headways, edge aggregation, stops, write.
+
+    With binary=True the graph is also written as CSR next to the JSON
+    (transit_graph_binary.py); with tile_deg set, as regional tiles in
+    <output>_tiles/ (graph_tiles.py). quantiles=True writes travel time
+    p10/p50/p90 per edge and route to <output>_quantiles.json. walk_radius (km)
+    adds walking edges between stations (walk_edges.py). contract=True writes
+    <output>_contracted.json with pass-through chains contracted
+    (graph_contraction.py). components ("report", "mark" or "prune") analyzes
+    connectivity and marks/prunes stations that cannot reach the main network
+    or a school stop (graph_components.py). feeds names the feeds of a
+    multi-feed build in the metadata; source is the metadata "source" (feed_source).
+    Steps are timed into stats (build_stats.py); the
+    graph metadata gets the steps up to the write.
+    """
+    stats = stats or BuildStats()
+    print(f"\n[{profile.name}] {profile.day_label}, "
+          f"window {profile.window_start // 3600:02d}:{profile.window_start % 3600 // 60:02d}-"
+          f"{profile.window_end // 3600:02d}:{profile.window_end % 3600 // 60:02d}")
+    print(f"  Raw edge pairs: {len(edge_data)}")
+
+    # --- Step 6: Compute headways per route (before edge aggregation, so we can filter) ---
+    print("Computing headways...")
+    headways_out = compute_headways(headway_departures, profile)
+    print(f"  Headways computed for {len(headways_out)} routes")
+    stats.lap("headways", sum(len(d) for d in headway_departures.values()), profile=profile.name)
+
+    # Sample headways
+    sample_routes = sorted(headways_out.items(), key=lambda x: x[1])[:10]
+    print(f"  Shortest headway routes: {sample_routes}")
 
+    # --- Step 7: Aggregate edges (filter routes without headway data) ---
+    print("Aggregating edges...")
+    edges_out, total_edges = aggregate_edges(edge_data, headways_out)
+    print(f"  Aggregated edges: {total_edges}")
+
+    # --- Step 8: Build stops dict (only parents that appear in edges) ---
+    print("Building stops dict...")
+    stops_out = build_stops(edges_out, parent_info)
     print(f"  Stops in graph: {len(stops_out)}")
 
-    # --- Step 9: Write output ---
-    print("Writing output...")
+    # --- Step 8b: Walking transfer edges between nearby stations (opt-in) ---
+    walk_metadata = {}
+    if walk_radius:
+        print(f"Adding walking edges within {walk_radius} km...")
+        walk_count = add_walk_edges(edges_out, headways_out, stops_out, walk_radius)
+        total_edges += walk_count
+        walk_metadata = {"walk_edges": walk_count, "walk_radius_km": walk_radius}
+        print(f"  Walking edges: {walk_count}")
+    stats.lap("aggregate", len(edge_data), profile=profile.name)
+
     output_data = {
         "metadata": {
-            "source": "GTFS_CR (spojenka.cz)",
-            "profile": "monday_07_08",
+            "source": source,
+            **({"feeds": feeds} if feeds else {}),
+            "profile": profile.name,
+            **({"service_date": profile.service_date.isoformat()} if profile.service_date else {}),
             "parent_stations": len(stops_out),
             "stations_with_edges": len(edges_out),
             "directed_edges": total_edges,
             "avg_out_degree": round(total_edges / max(1, len(edges_out)), 1),
             "routes_with_headway": len(headways_out),
+            **walk_metadata,
             "version": 2,
+            "build_stats": stats.summary(profile.name),
         },
         "stops": dict(sorted(stops_out.items())),
         "edges": {k: v for k, v in sorted(edges_out.items())},
         "headways": dict(sorted(headways_out.items())),
     }
 
-    with open(OUTPUT, "w", encoding="utf-8") as f:
+    anchors = school_anchor_stops(stops_out, feeds=feeds) if components or contract else set()
+
+    # --- Step 8c: Connected components, mark/prune disconnected stations (opt-in) ---
+    if components:
+        print(f"Analyzing connected components ({components})...")
+        components_path = output_path.with_name(f"{output_path.stem}_components.json")
+        output_data, report = apply_components(output_data, anchors, components, components_path)
+        print(f"  {report['weak_components']} weak / {report['strong_components']} strong components, "
+              f"main network {report['main_network']} of {report['stations']} stations")
+        print(f"  Islands: {len(report['islands'])}, disconnected: {len(report['disconnected'])} "
+              f"(report: {components_path})")
+        stats.lap("components", report["stations"], profile=profile.name)
+        output_data["metadata"]["build_stats"] = stats.summary(profile.name)
+
+    # --- Step 9: Write output ---
+    print("Writing output...")
+    with open(output_path, "w", encoding="utf-8") as f:
         json.dump(output_data, f, ensure_ascii=False, separators=(",", ":"))
 
-    file_size_mb = os.path.getsize(OUTPUT) / (1024 * 1024)
-    print(f"\nDone in {time.time() - t0:.1f}s")
-    print(f"Output: {OUTPUT} ({file_size_mb:.1f} MB)")
-    print(f"  Stops: {len(stops_out)}")
-    print(f"  Edges: {total_edges}")
-    print(f"  Routes with headway: {len(headways_out)}")
-    print(f"  Median headway (all routes): {statistics.median(headways_out.values()):.1f} min")
+    file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+    print(f"Output: {output_path} ({file_size_mb:.1f} MB)")
+    if binary:
+        binary_path = output_path.with_suffix(".bin")
+        write_graph_binary(output_data, binary_path)
+        print(f"Binary: {binary_path} ({os.path.getsize(binary_path) / (1024 * 1024):.1f} MB)")
+    if tile_deg:
+        tiles_dir = output_path.with_name(f"{output_path.stem}_tiles")
+        index = write_tiles(output_data, tiles_dir, tile_deg)
+        print(f"Tiles: {tiles_dir} ({len(index['tiles'])} tiles, {len(index['boundary'])} boundary stops)")
+    if quantiles:
+        quantiles_path = output_path.with_name(f"{output_path.stem}_quantiles.json")
+        with open(quantiles_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "metadata": {"profile": profile.name, "format": "[p10, p50, p90, trips], minutes"},
+                "edges": travel_time_quantiles(edge_data, headways_out),
+            }, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"Quantiles: {quantiles_path}")
+    if contract:
+        contracted = contract_graph(output_data, anchors)
+        contracted_path = output_path.with_name(f"{output_path.stem}_contracted.json")
+        with open(contracted_path, "w", encoding="utf-8") as f:
+            json.dump(contracted, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"Contracted: {contracted_path} ({contracted['metadata']['contracted_stops']} stops contracted, "
+              f"{len(output_data['edges'])} → {contracted['metadata']['network_stations']} network stations)")
+    stats.lap("write", output_data["metadata"]["directed_edges"], profile=profile.name)
+    print(f"  Stops: {len(output_data['stops'])}")
+    print(f"  Edges: {output_data['metadata']['directed_edges']}")
+    print(f"  Routes with headway: {len(output_data['headways'])}")
+    if output_data["headways"]:
+        print(f"  Median headway (all routes): {statistics.median(output_data['headways'].values()):.1f} min")
+
+
+def profile_trips(timetable_trips: list, index: int) -> list:
+    """[(trip_id, route_short, stops), ...] of the trips accepted by profiles[index]."""
+    return [
+        (trip_id, route_short, stops)
+        for trip_id, route_short, profile_indices, stops in timetable_trips
+        if index in profile_indices
+    ]
+
+
+def write_profile_timetable(profile: Profile, index: int, timetable_trips: list,
+                            parent_info: dict, output_path: Path):
+    """Timetable of one profile's trips next to its graph (<output>_timetable.bin)."""
+    trips = profile_trips(timetable_trips, index)
+    timetable_path = output_path.with_name(f"{output_path.stem}_timetable.bin")
+    summary = write_timetable(trips, parent_info, timetable_path, meta={
+        "profile": profile.name,
+        "day": profile.day_label,
+        **({"service_date": profile.service_date.isoformat()} if profile.service_date else {}),
+        "trip_window": [profile.trip_start, profile.trip_end],
+    })
+    print(f"Timetable: {timetable_path} ({os.path.getsize(timetable_path) / (1024 * 1024):.1f} MB, "
+          f"{summary['patterns']} patterns, {summary['trips']} trips)")
+    return summary
+
+
+def write_profile_frequencies(profile: Profile, index: int, timetable_trips: list, output_path: Path):
+    """Departure frequencies per (station, route) in the headway window (<output>_frequencies.bin)."""
+    departures = station_departures(profile_trips(timetable_trips, index),
+                                    profile.window_start, profile.window_end)
+    frequencies_path = output_path.with_name(f"{output_path.stem}_frequencies.bin")
+    summary = write_frequencies(departures, profile.window_minutes, frequencies_path, meta={
+        "profile": profile.name,
+        "window": [profile.window_start, profile.window_end],
+    })
+    print(f"Frequencies: {frequencies_path} ({summary['entries']} station/route pairs)")
+    return summary
+
+
+def output_options(args) -> dict:
+    """Artifact flags of a build (stored in the --state file for updates)."""
+    return {
+        "binary": args.binary,
+        "tiles": args.tiles,
+        "quantiles": args.quantiles,
+        "walk_radius": args.walk_radius,
+        "contract": args.contract,
+        "components": args.components,
+        "timetable": args.timetable,
+        "frequencies": args.frequencies,
+    }
+
+
+def write_profile_outputs(profiles: list[Profile], accumulators: list, parent_info: dict,
+                          output: Path, options: dict, timetable_trips: list | None,
+                          stats: BuildStats, feeds: list[str] | None = None,
+                          source: str = DEFAULT_SOURCE):
+    """Steps 6-9 per profile, plus its timetable and frequencies when enabled in options."""
+    for i, (profile, (edge_data, headway_departures)) in enumerate(zip(profiles, accumulators)):
+        output_path = profile_output_path(profile, output)
+        build_profile_graph(profile, edge_data, headway_departures, parent_info,
+                            output_path, binary=options["binary"], tile_deg=options["tiles"],
+                            quantiles=options["quantiles"], walk_radius=options["walk_radius"],
+                            contract=options["contract"], components=options["components"],
+                            stats=stats, feeds=feeds, source=source)
+        if options["timetable"]:
+            summary = write_profile_timetable(profile, i, timetable_trips, parent_info, output_path)
+            stats.lap("timetable", summary["trips"], profile=profile.name)
+        if options["frequencies"]:
+            summary = write_profile_frequencies(profile, i, timetable_trips, output_path)
+            stats.lap("frequencies", summary["entries"], profile=profile.name)
+
+
+def build_stats_path(output: Path) -> Path:
+    return output.with_name(f"{output.stem}_build_stats.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build transit graph v2 from GTFS_CR")
+    parser.add_argument(
+        "--feed", dest="feeds", action="append", type=parse_feed, metavar="[NAME=]DIR",
+        help="GTFS feed directory; repeat for a merged multi-feed graph with IDs and routes "
+             f"namespaced as NAME:id (default: {GTFS_DIR})",
+    )
+    parser.add_argument(
+        "--dedup-radius", type=float, default=DEFAULT_CLUSTER_RADIUS_KM, metavar="KM",
+        help="multi-feed: merge same-name stations of different feeds within KM, at most one "
+             f"station per feed in each merged station (default {DEFAULT_CLUSTER_RADIUS_KM})",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=OUTPUT, metavar="PATH",
+        help="graph of the default profile; other outputs are named after it "
+             f"(default: {OUTPUT})",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes for streaming stop_times.txt (default: 1 = single process)",
+    )
+    parser.add_argument(
+        "--profile", dest="profiles", action="append", type=parse_profile,
+        help="NAME=WEEKDAY,HH:MM-HH:MM[,HH:MM-HH:MM] or preset name; repeatable "
+             f"(default: {DEFAULT_PROFILE.name})",
+    )
+    parser.add_argument(
+        "--cache", action="store_true",
+        help="read the feed from the binary parse cache (built on first use)",
+    )
+    parser.add_argument(
+        "--binary", action="store_true",
+        help="also write each graph as binary CSR (.bin next to the JSON)",
+    )
+    parser.add_argument(
+        "--tiles", nargs="?", type=float, const=DEFAULT_TILE_DEG, metavar="DEG",
+        help=f"also write regional tiles on a DEG grid (default {DEFAULT_TILE_DEG})",
+    )
+    parser.add_argument(
+        "--quantiles", action="store_true",
+        help="also write p10/p50/p90 travel times per edge and route (<output>_quantiles.json)",
+    )
+    parser.add_argument(
+        "--walk-radius", type=float, metavar="KM",
+        help="add walking edges between stations within KM (pseudo-route WALK, headway 0)",
+    )
+    parser.add_argument(
+        "--contract", action="store_true",
+        help="also write a graph with pass-through chains contracted, school stops kept "
+             "(<output>_contracted.json)",
+    )
+    parser.add_argument(
+        "--components", choices=COMPONENT_MODES,
+        help="connected-component report (<output>_components.json); mark or prune stations "
+             "that cannot reach the main network or a school stop",
+    )
+    parser.add_argument(
+        "--timetable", action="store_true",
+        help="also write route patterns and trip times for schedule-based routing "
+             "(<output>_timetable.bin)",
+    )
+    parser.add_argument(
+        "--frequencies", action="store_true",
+        help="also write departure counts and median gaps per station and route "
+             "(<output>_frequencies.bin)",
+    )
+    parser.add_argument(
+        "--cluster-stops", nargs="?", type=float, const=DEFAULT_CLUSTER_RADIUS_KM, metavar="KM",
+        help="merge standalone stops with the same name within KM into one station "
+             f"(default {DEFAULT_CLUSTER_RADIUS_KM})",
+    )
+    parser.add_argument(
+        "--state", type=Path,
+        help="save build state (accumulators + per-trip contributions) for incremental updates",
+    )
+    args = parser.parse_args()
+    workers = args.workers if hasattr(os, "fork") else 1
+    profiles = args.profiles or [DEFAULT_PROFILE]
+
+    if len({p.name for p in profiles}) != len(profiles):
+        parser.error("profile names must be unique")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.time()
+    stats = BuildStats()
+
+    feeds = args.feeds or [(GTFS_DIR.name, GTFS_DIR)]
+    multi_feed = len(feeds) > 1
+    if len({name for name, _ in feeds}) != len(feeds):
+        parser.error("feed names must be unique")
+    if multi_feed and args.state:
+        parser.error("--state supports a single feed")
+
+    # --- Steps 1-4 per feed (+ 4b clustering, namespacing in multi-feed builds) ---
+    sources = []  # (name, gtfs_dir, cache, trip_info, stop_parent)
+    parent_info = {}
+    for name, gtfs_dir in feeds:
+        if multi_feed:
+            print(f"\n=== Feed {name}: {gtfs_dir} ===")
+            stats.feed = name
+        cache = None
+        if args.cache:
+            print("Loading GTFS parse cache...")
+            cache = load_or_build(gtfs_dir)
+            stats.lap("cache")
+            trip_info, stop_parent, feed_parent_info = load_cached_feed(cache, profiles, stats)
+        else:
+            trip_info, stop_parent, feed_parent_info = load_feed(gtfs_dir, profiles, stats)
+
+        if args.cluster_stops:
+            merged = cluster_feed_stops(stop_parent, feed_parent_info, args.cluster_stops)
+            stats.lap("clusters", merged)
+        if multi_feed:
+            trip_info, stop_parent, feed_parent_info = namespace_feed(
+                name, trip_info, stop_parent, feed_parent_info
+            )
+        parent_info.update(feed_parent_info)
+        sources.append((name, gtfs_dir, cache, trip_info, stop_parent))
+    stats.feed = None
+
+    # --- Step 4c: Deduplicate stations across feeds (same name within dedup radius) ---
+    if multi_feed:
+        print(f"\nDeduplicating stations across feeds within {args.dedup_radius} km...")
+        clusters = cluster_feed_duplicates(parent_info, args.dedup_radius)
+        count = merge_parent_info(parent_info, clusters)
+        for _, _, _, _, stop_parent in sources:
+            remap_parents(stop_parent, clusters)
+        print(f"  {len(clusters)} stations merged into {count}, {len(parent_info)} parent stations")
+        stats.lap("dedup", len(clusters))
+
+    # --- Step 5: Stream stop_times.txt → build edges + headway data ---
+    contributions = {} if args.state else None
+    timetable_trips = [] if args.timetable or args.frequencies else None
+    accumulators = None
+    for name, gtfs_dir, cache, trip_info, stop_parent in sources:
+        print(f"Streaming {gtfs_dir / 'stop_times.txt'} (this may take a while)...")
+        stats.feed = name if multi_feed else None
+        feed_trips = [] if timetable_trips is not None else None
+        if cache is not None:
+            feed_accumulators, lines_processed, trips_processed = stream_cached_stop_times(
+                cache, trip_info, stop_parent, profiles, contributions, feed_trips
+            )
+            detail = f"{trips_processed} trips in profile windows"
+        else:
+            feed_accumulators, lines_processed, distinct_times = stream_feed(
+                gtfs_dir, trip_info, stop_parent, profiles, workers, contributions,
+                timetable_trips=feed_trips,
+            )
+            detail = f"{distinct_times} distinct times"
+
+        # Feeds share one set of accumulators
+        if accumulators is None:
+            accumulators = feed_accumulators
+        else:
+            merge_accumulators(accumulators, feed_accumulators)
+        if feed_trips is not None:
+            if multi_feed:
+                feed_trips = [(f"{name}:{trip_id}", *rest) for trip_id, *rest in feed_trips]
+            timetable_trips.extend(feed_trips)
+
+        stream = stats.lap("stream", lines_processed)
+        print(f"  Processed {lines_processed} lines in {stream['seconds']:.1f}s "
+              f"({stream['rows_per_s']:,} rows/s, {detail})")
+    stats.feed = None
+
+    if args.state:
+        save_build_state(args.state, feeds[0][1], profiles, accumulators, contributions,
+                         cluster_radius=args.cluster_stops, output=args.output,
+                         options=output_options(args), timetable_trips=timetable_trips)
+        stats.lap("state", len(contributions))
+
+    # --- Steps 6-9 per profile ---
+    write_profile_outputs(profiles, accumulators, parent_info, args.output, output_options(args),
+                          timetable_trips, stats,
+                          feeds=[name for name, _ in feeds] if multi_feed else None,
+                          source=feed_source(feeds))
+
+    stats_path = build_stats_path(args.output)
+    stats.write(
+        stats_path,
+        feeds=[
+            {"name": name, "dir": str(gtfs_dir),
+             "stop_times_bytes": (gtfs_dir / "stop_times.txt").stat().st_size}
+            for name, gtfs_dir in feeds
+        ],
+        profiles=[p.name for p in profiles],
+        workers=workers,
+        cache=args.cache,
+    )
+    print(f"\nBuild stats: {stats_path}")
+    print(f"Done in {time.time() - t0:.1f}s")
 
 
 if __name__ == "__main__":
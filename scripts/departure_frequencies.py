@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Departure frequency table per (parent station, route) for wait-time estimates.
+
+The graph's "headways" hold one value per route_short, taken from first-stop
+departures only. This table counts the departures of every route at every
+station inside the profile's headway window and keeps their median gap, so
+branches and segments with a different frequency get their own value.
+
+Binary layout (transit_graph_binary container, magic b"SSKFREQ\\0"):
+    stop_id_*, route_*      string tables (parent stations, route_short)
+    stop_offsets            uint32; entries of stop s = [off[s], off[s+1]), sorted by route
+    entry_route             uint16 route index
+    entry_departures        uint16 departures in the window (capped at 65535)
+    entry_headway           uint16 median gap in deciminutes, same rules as the
+                            graph headways (single departure = window length,
+                            clamped to 2-120 min)
+
+Lookup of a (stop, route) pair is a binary search over the few routes of one
+stop.
+"""
+
+import statistics
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+from transit_graph_binary import BinaryContainer, _string_table, write_container
+
+FREQUENCY_MAGIC = b"SSKFREQ\0"
+FREQUENCY_VERSION = 1
+
+MIN_HEADWAY = 2.0
+MAX_HEADWAY = 120.0
+
+
+def median_gap_minutes(departures: list[int], window_minutes: float) -> float:
+    """Median interval between departures (seconds) in minutes; window length for one departure."""
+    if len(departures) < 2:
+        # 1 departure in 60 min window → headway ≈ 60
+        return window_minutes
+    departures_sorted = sorted(departures)
+    return statistics.median(
+        (departures_sorted[i + 1] - departures_sorted[i]) / 60 for i in range(len(departures_sorted) - 1)
+    )
+
+
+def station_departures(trips, window_start: int, window_end: int) -> dict:
+    """(parent, route_short) → [departure seconds] in the window.
+
+    trips: [(trip_id, route_short, [(parent, arrival, departure), ...]), ...]
+    (see timetable_export.timetable_stops); the last stop of a trip is not a
+    departure.
+    """
+    departures = defaultdict(list)
+    for _, route_short, stops in trips:
+        for parent, _, dep in stops[:-1]:
+            if window_start <= dep < window_end:
+                departures[(parent, route_short)].append(dep)
+    return departures
+
+
+def write_frequencies(departures: dict, window_minutes: float, path: Path, meta: dict | None = None) -> dict:
+    """Write the frequency table for station_departures() output; returns summary counts."""
+    stop_ids = sorted({parent for parent, _ in departures})
+    routes = sorted({route for _, route in departures})
+    if len(routes) > 0xFFFF:
+        raise ValueError(f"{len(routes)} routes do not fit uint16 route indices")
+    stop_index = {sid: i for i, sid in enumerate(stop_ids)}
+    route_index = {r: i for i, r in enumerate(routes)}
+
+    by_stop = defaultdict(list)
+    for (parent, route_short), times in departures.items():
+        headway = max(MIN_HEADWAY, min(MAX_HEADWAY, round(median_gap_minutes(times, window_minutes), 1)))
+        by_stop[stop_index[parent]].append((route_index[route_short], len(times), headway))
+
+    stop_offsets = array("I", [0])
+    entry_route, entry_departures, entry_headway = array("H"), array("H"), array("H")
+    for s in range(len(stop_ids)):
+        for route, count, headway in sorted(by_stop[s]):
+            entry_route.append(route)
+            entry_departures.append(min(0xFFFF, count))
+            entry_headway.append(round(headway * 10))
+        stop_offsets.append(len(entry_route))
+
+    stop_id_blob, stop_id_offsets = _string_table(stop_ids)
+    route_blob, route_offsets = _string_table(routes)
+    summary = {"stops": len(stop_ids), "routes": len(routes), "entries": len(entry_route)}
+    write_container(path, FREQUENCY_MAGIC, FREQUENCY_VERSION, {
+        "stop_id_blob": stop_id_blob,
+        "stop_id_offsets": stop_id_offsets,
+        "route_blob": route_blob,
+        "route_offsets": route_offsets,
+        "stop_offsets": stop_offsets,
+        "entry_route": entry_route,
+        "entry_departures": entry_departures,
+        "entry_headway": entry_headway,
+    }, meta={**(meta or {}), "window_minutes": window_minutes, **summary})
+    return summary
+
+
+class DepartureFrequencies:
+    """Memory-mapped frequency table; lookups by index or by stop_id/route_short."""
+
+    def __init__(self, path: Path):
+        c = BinaryContainer(path, FREQUENCY_MAGIC, FREQUENCY_VERSION)
+        self.meta = c.meta
+        self.stop_ids = c.strings("stop_id")
+        self.routes = c.strings("route")
+        self.stop_index = {sid: i for i, sid in enumerate(self.stop_ids)}
+        self.route_index = {r: i for i, r in enumerate(self.routes)}
+        self.stop_offsets = c.section("stop_offsets")
+        self.entry_route = c.section("entry_route")
+        self.entry_departures = c.section("entry_departures")
+        self.entry_headway = c.section("entry_headway")
+
+    def entry(self, stop: int, route: int) -> int | None:
+        """Entry index of a (stop index, route index) pair."""
+        lo, hi = self.stop_offsets[stop], self.stop_offsets[stop + 1]
+        i = bisect_left(self.entry_route, route, lo, hi)
+        return i if i < hi and self.entry_route[i] == route else None
+
+    def lookup(self, stop_id: str, route_short: str) -> tuple[int, float] | None:
+        """(departures, headway_minutes) of a route at a station, None if it does not depart there."""
+        stop, route = self.stop_index.get(stop_id), self.route_index.get(route_short)
+        if stop is None or route is None:
+            return None
+        e = self.entry(stop, route)
+        if e is None:
+            return None
+        return self.entry_departures[e], self.entry_headway[e] / 10
+
+    def headway(self, stop_id: str, route_short: str) -> float | None:
+        found = self.lookup(stop_id, route_short)
+        return found[1] if found else None
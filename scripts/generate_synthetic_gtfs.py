@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Synthetic GTFS feeds for benchmarking build_transit_graph_v2.py.
+
+GTFS_CR cannot be shipped as a fixture, so this writes a deterministic
+(seeded) feed with the same shape:
+
+- towns with a power-law size distribution inside the Czech bounding box;
+  stations scattered around each town centre
+- parent stations (location_type=1) with one platform per direction, and
+  standalone stops, some of them split into two same-name stops ~30 m apart
+  (one per direction, as in CISJR data)
+- local bus routes inside a town, regional bus routes between towns and rail
+  routes between town hubs, each along the stations of a corridor
+- trips in both directions, frequency following a daily profile (morning and
+  afternoon peaks), times rounded to whole minutes
+- night routes (901+) running 23:00-28:30 every day
+- calendar.txt services WD (Mon-Fri), SA, SU, NIGHT and calendar_dates.txt
+  exceptions for fixed-date public holidays (WD removed, SU added)
+
+stop_times.txt is written trip by trip, so memory stays small at national
+scale (PRESETS["national"]: about 22M stop_times rows, 850 MB).
+
+Usage:
+    python scripts/generate_synthetic_gtfs.py /tmp/gtfs_small --preset small
+    python scripts/generate_synthetic_gtfs.py /tmp/gtfs_national --preset national
+    python scripts/generate_synthetic_gtfs.py /tmp/gtfs --stations 8000 --routes 1200 --trips-per-hour 3
+"""
+
+import argparse
+import csv
+import math
+import random
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, fields, replace
+from datetime import date, timedelta
+from pathlib import Path
+
+from walk_edges import KM_PER_DEG_LAT
+
+# Czech Republic bounding box (lat, lon)
+BBOX = (48.55, 12.09, 51.06, 18.86)
+
+# Share of the peak frequency per hour of the day (0-23)
+HOURLY_PROFILE = (
+    0, 0, 0, 0, 0.2, 0.5, 1.0, 1.0, 0.8, 0.5, 0.5, 0.5,
+    0.5, 0.6, 0.9, 1.0, 0.9, 0.7, 0.5, 0.4, 0.3, 0.3, 0.2, 0.1,
+)
+# Frequency relative to WD per service
+SERVICE_FACTORS = {"WD": 1.0, "SA": 0.5, "SU": 0.4}
+SERVICE_DAYS = {
+    "WD": (1, 1, 1, 1, 1, 0, 0),
+    "SA": (0, 0, 0, 0, 0, 1, 0),
+    "SU": (0, 0, 0, 0, 0, 0, 1),
+    "NIGHT": (1, 1, 1, 1, 1, 1, 1),
+}
+# Fixed-date public holidays (MM-DD); WD does not run, SU runs instead
+HOLIDAYS = ("01-01", "05-01", "05-08", "07-05", "07-06", "09-28", "10-28", "11-17", "12-24", "12-25", "12-26")
+
+NIGHT_START = 23 * 3600
+NIGHT_END = 28 * 3600 + 1800
+NIGHT_HEADWAY = 3600
+
+# route kind → (route_type, speed km/h, corridor width km, dwell s)
+ROUTE_KINDS = {
+    "local": (3, 20, 0.6, 0),
+    "regional": (3, 40, 1.5, 0),
+    "rail": (2, 70, 1.0, 60),
+}
+GRID_KM = 2.0
+DETOUR_FACTOR = 1.3
+
+SYLLABLES = ("bro", "lho", "ta", "ou", "pa", "kře", "vi", "ce", "tře", "bí", "hra", "dec",
+             "no", "vá", "ves", "mi", "ku", "lov", "stě", "ra", "dub", "ná", "chod", "sko")
+STOP_SUFFIXES = ("náměstí", "škola", "pošta", "nádraží", "sídliště", "rozc.", "u kostela",
+                 "hřbitov", "žel. st.", "obecní úřad", "točna", "nemocnice")
+
+
+@dataclass(frozen=True)
+class FeedConfig:
+    stations: int = 2000
+    towns: int = 0                  # 0 = stations // 40
+    parent_share: float = 0.3       # stations with parent station + platforms
+    twin_share: float = 0.2         # standalone stations split into two same-name stops
+    routes: int = 200
+    rail_share: float = 0.08
+    regional_share: float = 0.5
+    min_route_stops: int = 6
+    max_route_stops: int = 30
+    trips_per_hour: float = 4.0     # peak, per direction
+    night_routes: int = 5
+    start_date: str = "20260901"
+    end_date: str = "20270630"
+    seed: int = 1
+
+
+PRESETS = {
+    "small": FeedConfig(stations=500, routes=40, trips_per_hour=2, night_routes=2),
+    "region": FeedConfig(stations=6000, routes=900, trips_per_hour=3, night_routes=10),
+    "national": FeedConfig(stations=36000, routes=13000, trips_per_hour=3, night_routes=40),
+}
+
+
+def _town_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def _night_names(count: int) -> list:
+    """Night route names the builder recognizes (901-999, then 91-99)."""
+    names = [str(n) for n in range(901, 1000)] + [str(n) for n in range(91, 100)]
+    if count > len(names):
+        raise ValueError(f"at most {len(names)} night routes")
+    return names[:count]
+
+
+def _day_names(count: int) -> list:
+    """Day route names avoiding the night ranges 91-99 and 901-999."""
+    names, n = [], 1
+    while len(names) < count:
+        if not (91 <= n <= 99 or 901 <= n <= 999):
+            names.append(str(n))
+        n += 1
+    return names
+
+
+def place_stations(config: FeedConfig, rng: random.Random) -> tuple[list, list]:
+    """Stations [(x_km, y_km, town, name)] and towns [(x_km, y_km, radius_km, name, [station])].
+
+    The plane is an equirectangular projection of BBOX (x east, y north, km).
+    """
+    lat0, lon0, lat1, lon1 = BBOX
+    km_per_deg_lon = KM_PER_DEG_LAT * math.cos(math.radians((lat0 + lat1) / 2))
+    width, height = (lon1 - lon0) * km_per_deg_lon, (lat1 - lat0) * KM_PER_DEG_LAT
+
+    n_towns = max(1, config.towns or config.stations // 40)
+    weights = [1 / (rank + 1) ** 0.9 for rank in range(n_towns)]
+    total = sum(weights)
+    towns = []
+    for w in weights:
+        radius = 0.8 + 12 * math.sqrt(w / total)
+        towns.append((rng.uniform(0, width), rng.uniform(0, height), radius, _town_name(rng), []))
+
+    stations = []
+    for i in range(config.stations):
+        t = i if i < n_towns else rng.choices(range(n_towns), weights)[0]  # every town gets a hub
+        tx, ty, radius, town_name, members = towns[t]
+        if not members:
+            x, y, name = tx, ty, town_name
+        else:
+            x = min(width, max(0.0, rng.gauss(tx, radius / 2)))
+            y = min(height, max(0.0, rng.gauss(ty, radius / 2)))
+            name = f"{town_name}, {rng.choice(STOP_SUFFIXES)}"
+            if rng.random() < 0.5:
+                name = f"{name} {len(members)}"
+        members.append(i)
+        stations.append((x, y, t, name))
+    return stations, towns
+
+
+class _Grid:
+    """Stations bucketed into GRID_KM cells."""
+
+    def __init__(self, stations: list):
+        self.cells = defaultdict(list)
+        for i, (x, y, _, _) in enumerate(stations):
+            self.cells[(int(x // GRID_KM), int(y // GRID_KM))].append(i)
+
+    def corridor(self, stations: list, a: int, b: int, width_km: float) -> list:
+        """Stations within width_km of segment a→b, ordered from a to b."""
+        ax, ay = stations[a][:2]
+        bx, by = stations[b][:2]
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy or 1e-9
+        reach = int(width_km // GRID_KM) + 1
+        steps = int(math.sqrt(length2) / GRID_KM) + 1
+        seen, found = set(), []
+        for s in range(steps + 1):
+            cx, cy = int((ax + dx * s / steps) // GRID_KM), int((ay + dy * s / steps) // GRID_KM)
+            for gx in range(cx - reach, cx + reach + 1):
+                for gy in range(cy - reach, cy + reach + 1):
+                    if (gx, gy) in seen:
+                        continue
+                    seen.add((gx, gy))
+                    for i in self.cells.get((gx, gy), ()):
+                        x, y = stations[i][:2]
+                        t = ((x - ax) * dx + (y - ay) * dy) / length2
+                        if 0 < t < 1 and abs((x - ax) * dy - (y - ay) * dx) / math.sqrt(length2) <= width_km:
+                            found.append((t, i))
+        return [a] + [i for _, i in sorted(found)] + [b]
+
+
+def _route_path(stations: list, towns: list, grid: _Grid, kind: str, config: FeedConfig,
+                rng: random.Random) -> list:
+    """Station sequence of one route of the given kind."""
+    _, _, width, _ = ROUTE_KINDS[kind]
+    if kind == "local":
+        members = rng.choice([t[4] for t in towns if len(t[4]) >= 3] or [t[4] for t in towns])
+        a = rng.choice(members)
+        b = max(rng.sample(members, min(len(members), 5)),
+                key=lambda i: math.dist(stations[i][:2], stations[a][:2]))
+    else:
+        lo, hi = (8, 50) if kind == "regional" else (30, 150)
+        hubs = [t[4][0] for t in towns if t[4]]
+        a = rng.choice(hubs) if kind == "rail" else rng.randrange(len(stations))
+        candidates = [h for h in rng.sample(hubs, min(len(hubs), 30))
+                      if lo <= math.dist(stations[h][:2], stations[a][:2]) <= hi]
+        b = candidates[0] if candidates else rng.choice(hubs)
+    if a == b:
+        return [a]
+
+    path = grid.corridor(stations, a, b, width)
+    limit = rng.randint(config.min_route_stops, config.max_route_stops)
+    if len(path) > limit:
+        keep = sorted(rng.sample(range(1, len(path) - 1), limit - 2))
+        path = [path[0]] + [path[k] for k in keep] + [path[-1]]
+    return path
+
+
+def _departures(rng: random.Random, trips_per_hour: float, factor: float) -> list:
+    """Departure times (s) over the day following HOURLY_PROFILE."""
+    times = []
+    t = 4 * 3600 + rng.randrange(0, 30) * 60
+    while t < 24 * 3600:
+        rate = trips_per_hour * factor * HOURLY_PROFILE[t // 3600]
+        if rate <= 0:
+            t = (t // 3600 + 1) * 3600
+            continue
+        times.append(t)
+        t += max(2, round(60 / rate)) * 60
+    return times
+
+
+def _hhmmss(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _holiday_dates(start: str, end: str) -> list:
+    first = date(int(start[:4]), int(start[4:6]), int(start[6:]))
+    last = date(int(end[:4]), int(end[4:6]), int(end[6:]))
+    days = []
+    day = first
+    while day <= last:
+        if day.strftime("%m-%d") in HOLIDAYS:
+            days.append(day.strftime("%Y%m%d"))
+        day += timedelta(days=1)
+    return days
+
+
+def generate_feed(out_dir: Path, config: FeedConfig) -> dict:
+    """Write a synthetic GTFS feed to out_dir; returns row counts and sizes."""
+    t0 = time.time()
+    rng = random.Random(config.seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    stations, towns = place_stations(config, rng)
+    grid = _Grid(stations)
+
+    # --- stops.txt: platforms per direction ---
+    lat0, lon0, lat1, _ = BBOX
+    km_per_deg_lon = KM_PER_DEG_LAT * math.cos(math.radians((lat0 + lat1) / 2))
+    platforms = []  # station → (stop_id direction 0, stop_id direction 1)
+    stop_rows = []
+    for i, (x, y, _, name) in enumerate(stations):
+        lat, lon = round(lat0 + y / KM_PER_DEG_LAT, 6), round(lon0 + x / km_per_deg_lon, 6)
+        kind = rng.random()
+        if kind < config.parent_share:
+            parent = f"P{i}"
+            stop_rows.append([parent, name, lat, lon, 1, ""])
+            ids = (f"{parent}Z1", f"{parent}Z2")
+            for k, sid in enumerate(ids):
+                stop_rows.append([sid, name, round(lat + 0.0001 * k, 6), lon, 0, parent])
+        elif kind < config.parent_share + (1 - config.parent_share) * config.twin_share:
+            ids = (f"S{i}A", f"S{i}B")
+            for k, sid in enumerate(ids):
+                stop_rows.append([sid, name, round(lat + 0.00027 * k, 6), lon, 0, ""])
+        else:
+            ids = (f"S{i}", f"S{i}")
+            stop_rows.append([ids[0], name, lat, lon, 0, ""])
+        platforms.append(ids)
+
+    with open(out_dir / "stops.txt", "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["stop_id", "stop_name", "stop_lat", "stop_lon", "location_type", "parent_station"])
+        w.writerows(stop_rows)
+
+    # --- routes.txt ---
+    n_rail = round(config.routes * config.rail_share)
+    n_regional = round(config.routes * config.regional_share)
+    kinds = ["rail"] * n_rail + ["regional"] * n_regional + ["local"] * (config.routes - n_rail - n_regional)
+    routes = []  # (route_id, short_name, kind, night)
+    for n, (kind, short) in enumerate(zip(kinds, _day_names(len(kinds)))):
+        routes.append((f"R{n + 1}", f"S{short}" if kind == "rail" else short, kind, False))
+    for short in _night_names(config.night_routes):
+        routes.append((f"N{short}", short, "regional", True))
+
+    with open(out_dir / "agency.txt", "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["agency_id", "agency_name", "agency_url", "agency_timezone"])
+        w.writerow(["1", "Synthetic Transit", "https://example.invalid", "Europe/Prague"])
+    with open(out_dir / "routes.txt", "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["route_id", "agency_id", "route_short_name", "route_type"])
+        for route_id, short, kind, _ in routes:
+            w.writerow([route_id, "1", short, ROUTE_KINDS[kind][0]])
+
+    # --- calendar.txt, calendar_dates.txt ---
+    with open(out_dir / "calendar.txt", "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["service_id", "monday", "tuesday", "wednesday", "thursday", "friday",
+                    "saturday", "sunday", "start_date", "end_date"])
+        for service_id, days in SERVICE_DAYS.items():
+            w.writerow([service_id, *days, config.start_date, config.end_date])
+    holidays = _holiday_dates(config.start_date, config.end_date)
+    with open(out_dir / "calendar_dates.txt", "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["service_id", "date", "exception_type"])
+        for day in holidays:
+            w.writerow(["WD", day, 2])
+            w.writerow(["SU", day, 1])
+
+    # --- trips.txt + stop_times.txt, streamed trip by trip ---
+    trip_count = stop_time_rows = 0
+    with open(out_dir / "trips.txt", "w", encoding="utf-8", newline="") as ft, \
+            open(out_dir / "stop_times.txt", "w", encoding="utf-8", newline="") as fs:
+        wt, ws = csv.writer(ft), csv.writer(fs)
+        wt.writerow(["route_id", "service_id", "trip_id", "direction_id"])
+        ws.writerow(["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"])
+        for route_id, _, kind, night in routes:
+            path = _route_path(stations, towns, grid, kind, config, rng)
+            if len(path) < 2:
+                continue
+            _, speed, _, dwell = ROUTE_KINDS[kind]
+            hops = [max(60, round(math.dist(stations[a][:2], stations[b][:2]) * DETOUR_FACTOR
+                                  / speed * 60) * 60)
+                    for a, b in zip(path, path[1:])]
+            route_factor = rng.choice((0.25, 0.5, 1.0, 1.0, 2.0))
+            if night:
+                schedule = {"NIGHT": list(range(NIGHT_START + rng.randrange(0, 30) * 60, NIGHT_END, NIGHT_HEADWAY))}
+            else:
+                schedule = {service_id: _departures(rng, config.trips_per_hour, route_factor * factor)
+                            for service_id, factor in SERVICE_FACTORS.items()}
+
+            for direction in (0, 1):
+                seq = path if direction == 0 else path[::-1]
+                seq_hops = hops if direction == 0 else hops[::-1]
+                for service_id, starts in schedule.items():
+                    for start in starts:
+                        trip_count += 1
+                        trip_id = f"T{trip_count}"
+                        wt.writerow([route_id, service_id, trip_id, direction])
+                        t = start
+                        rows = []
+                        for k, station in enumerate(seq):
+                            if k:
+                                t += seq_hops[k - 1]
+                            stay = dwell if 0 < k < len(seq) - 1 else 0
+                            rows.append([trip_id, _hhmmss(t), _hhmmss(t + stay),
+                                         platforms[station][direction], k + 1])
+                            t += stay
+                        ws.writerows(rows)
+                        stop_time_rows += len(rows)
+
+    files = {p.name: p.stat().st_size for p in sorted(out_dir.glob("*.txt"))}
+    return {
+        "config": asdict(config),
+        "stations": len(stations),
+        "stops": len(stop_rows),
+        "routes": len(routes),
+        "trips": trip_count,
+        "stop_times": stop_time_rows,
+        "holidays": len(holidays),
+        "bytes": sum(files.values()),
+        "files": files,
+        "seconds": round(time.time() - t0, 1),
+    }
+
+
+def config_from_args(args) -> FeedConfig:
+    """Preset with every explicitly given FeedConfig field replaced."""
+    overrides = {f.name: getattr(args, f.name) for f in fields(FeedConfig)
+                 if getattr(args, f.name, None) is not None}
+    return replace(PRESETS[args.preset], **overrides)
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """--preset plus one option per FeedConfig field (shared with benchmark_transit_graph.py)."""
+    parser.add_argument("--preset", choices=PRESETS, default="small",
+                        help="base FeedConfig; the options below override single fields")
+    for f in fields(FeedConfig):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=type(f.default), metavar=f.name.upper())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic GTFS feed")
+    parser.add_argument("out_dir", type=Path)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    summary = generate_feed(args.out_dir, config_from_args(args))
+    print(f"Output: {args.out_dir} ({summary['bytes'] / 1e6:.1f} MB in {summary['seconds']}s)")
+    print(f"  {summary['stations']} stations, {summary['stops']} stops, {summary['routes']} routes, "
+          f"{summary['trips']} trips, {summary['stop_times']} stop_times rows")
+
+
+if __name__ == "__main__":
+    main()
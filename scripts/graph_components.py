@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Connected-component analysis of transit_graph.json.
+
+- Weakly connected components (union-find) show islands: groups of stations
+  with no link at all to the rest of the network.
+- Strongly connected components (Tarjan, iterative) find the main network:
+  the largest set of stations that can all reach each other.
+
+A station is useful to /api/dostupnost if a search starting there can reach
+the main network or a school-relevant station (see graph_contraction.py
+school_anchor_stops). Stations that cannot are "disconnected": they are shipped
+and indexed but can never lead to a school. Stations that cannot be reached
+from the main network are only reported (valid origins, often data errors).
+
+Modes:
+    report  write the analysis to <output>_components.json
+    mark    report + "disconnected": [stop_id, ...] in the graph
+    prune   report + drop disconnected stations and their edges
+
+Usage:
+    python scripts/graph_components.py data/transit_graph.json              # report
+    python scripts/graph_components.py data/transit_graph.json --mode prune -o pruned.json
+"""
+
+import argparse
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from graph_contraction import SCHOOL_LOCATIONS, school_anchor_stops
+
+MODES = ("report", "mark", "prune")
+
+
+def graph_nodes(edges: dict) -> list:
+    """Every station with an edge, sources first (edge order), then pure destinations."""
+    nodes = dict.fromkeys(edges)
+    for neighbors in edges.values():
+        for dest, _, _ in neighbors:
+            nodes.setdefault(dest)
+    return list(nodes)
+
+
+def weak_components(edges: dict) -> list[list]:
+    """Weakly connected components (union-find), largest first."""
+    parent = {}
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for node in graph_nodes(edges):
+        parent[node] = node
+    size = dict.fromkeys(parent, 1)
+    for source, neighbors in edges.items():
+        for dest, _, _ in neighbors:
+            a, b = find(source), find(dest)
+            if a != b:
+                if size[a] < size[b]:
+                    a, b = b, a
+                parent[b] = a
+                size[a] += size[b]
+
+    groups = defaultdict(list)
+    for node in parent:
+        groups[find(node)].append(node)
+    return sorted((sorted(g) for g in groups.values()), key=lambda g: (-len(g), g[0]))
+
+
+def strong_components(edges: dict) -> list[list]:
+    """Strongly connected components (iterative Tarjan), largest first."""
+    index, low = {}, {}
+    on_stack, stack = set(), []
+    components = []
+    counter = 0
+
+    for root in graph_nodes(edges):
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(edges.get(root, ())))]
+        while work:
+            node, neighbors = work[-1]
+            advanced = False
+            for dest, _, _ in neighbors:
+                if dest not in index:
+                    index[dest] = low[dest] = counter
+                    counter += 1
+                    stack.append(dest)
+                    on_stack.add(dest)
+                    work.append((dest, iter(edges.get(dest, ()))))
+                    advanced = True
+                    break
+                if dest in on_stack:
+                    low[node] = min(low[node], index[dest])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                caller = work[-1][0]
+                low[caller] = min(low[caller], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(sorted(component))
+
+    return sorted(components, key=lambda g: (-len(g), g[0]))
+
+
+def _reachable(adjacency: dict, sources) -> set:
+    seen = set(sources)
+    frontier = list(seen)
+    while frontier:
+        node = frontier.pop()
+        for nxt in adjacency.get(node, ()):
+            if nxt not in seen:
+                seen.add(nxt)
+                frontier.append(nxt)
+    return seen
+
+
+def analyze_components(graph: dict, anchors: set) -> dict:
+    """Component report of a transit_graph.json dict; "disconnected" lists stations to mark/prune."""
+    edges, stops = graph["edges"], graph["stops"]
+    weak = weak_components(edges)
+    strong = strong_components(edges)
+    main = set(strong[0]) if strong else set()
+
+    forward = {source: [dest for dest, _, _ in neighbors] for source, neighbors in edges.items()}
+    backward = defaultdict(list)
+    for source, targets in forward.items():
+        for dest in targets:
+            backward[dest].append(source)
+
+    nodes = graph_nodes(edges)
+    targets = main | (anchors & set(nodes))
+    reaches = _reachable(backward, targets)     # can reach the main network or a school stop
+    reached = _reachable(forward, main)         # can be reached from the main network
+
+    def named(ids):
+        return [[sid, stops.get(sid, [""])[0]] for sid in sorted(ids)]
+
+    main_weak = next((set(g) for g in weak if main & set(g)), set())
+    return {
+        "stations": len(nodes),
+        "weak_components": len(weak),
+        "strong_components": len(strong),
+        "main_network": len(main),
+        "school_stops": len(anchors & set(nodes)),
+        "weak_sizes": dict(sorted(Counter(len(g) for g in weak).items())),
+        "strong_sizes": dict(sorted(Counter(len(g) for g in strong).items())),
+        "islands": [named(g) for g in weak if not main_weak & set(g)],
+        "unreachable_from_network": named(set(nodes) - reached),
+        "disconnected": sorted(set(nodes) - reaches),
+    }
+
+
+def prune_graph(graph: dict, disconnected: set) -> dict:
+    """Copy of a transit_graph.json dict without the given stations and their edges."""
+    edges = {
+        source: [edge for edge in neighbors if edge[0] not in disconnected]
+        for source, neighbors in graph["edges"].items() if source not in disconnected
+    }
+    edges = {source: neighbors for source, neighbors in edges.items() if neighbors}
+    routes = {r for neighbors in edges.values() for _, _, rs in neighbors for r in rs}
+    total_edges = sum(len(neighbors) for neighbors in edges.values())
+    stops = {sid: info for sid, info in graph["stops"].items() if sid not in disconnected}
+    return {
+        **graph,
+        "metadata": {
+            **graph.get("metadata", {}),
+            "parent_stations": len(stops),
+            "stations_with_edges": len(edges),
+            "directed_edges": total_edges,
+            "avg_out_degree": round(total_edges / max(1, len(edges)), 1),
+            "routes_with_headway": len([r for r in graph.get("headways", {}) if r in routes]),
+            "pruned_stations": len(disconnected),
+        },
+        "stops": stops,
+        "edges": edges,
+        "headways": {r: h for r, h in graph.get("headways", {}).items() if r in routes},
+    }
+
+
+def apply_components(graph: dict, anchors: set, mode: str, report_path: Path) -> tuple[dict, dict]:
+    """Analyze, write the report and return (graph for the given mode, report)."""
+    report = analyze_components(graph, anchors)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"metadata": {"mode": mode, **graph.get("metadata", {})}, **report},
+                  f, ensure_ascii=False, indent=1)
+
+    disconnected = report["disconnected"]
+    if mode == "mark":
+        graph = {**graph, "metadata": {**graph["metadata"], "disconnected_stations": len(disconnected)},
+                 "disconnected": disconnected}
+    elif mode == "prune" and disconnected:
+        graph = prune_graph(graph, set(disconnected))
+    return graph, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Component analysis and pruning of transit_graph.json")
+    parser.add_argument("graph", type=Path)
+    parser.add_argument("--mode", choices=MODES, default="report")
+    parser.add_argument("-o", "--output", type=Path, help="graph for mark/prune (default: overwrite GRAPH)")
+    parser.add_argument("--schools", type=Path, default=SCHOOL_LOCATIONS)
+    args = parser.parse_args()
+
+    with open(args.graph, encoding="utf-8") as f:
+        graph = json.load(f)
+    anchors = school_anchor_stops(graph["stops"], args.schools, feeds=graph["metadata"].get("feeds"))
+    report_path = args.graph.with_name(f"{args.graph.stem}_components.json")
+    graph, report = apply_components(graph, anchors, args.mode, report_path)
+
+    print(f"Report: {report_path}")
+    print(f"  {report['stations']} stations, {report['weak_components']} weak / "
+          f"{report['strong_components']} strong components, main network {report['main_network']}")
+    print(f"  Islands: {len(report['islands'])}, unreachable from network: "
+          f"{len(report['unreachable_from_network'])}, disconnected: {len(report['disconnected'])}")
+    if args.mode != "report":
+        output = args.output or args.graph
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(graph, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"Output: {output} ({args.mode})")
+
+
+if __name__ == "__main__":
+    main()
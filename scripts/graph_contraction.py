@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Degree-2 chain contraction of transit_graph.json.
+
+A pass-through station is one whose only neighbours are the previous and
+next station of a line, with the same route set entering and leaving:
+    one-way:  a → v → b
+    two-way:  a ⇄ v ⇄ b  (routes a→v = v→b and b→v = v→a)
+Chains of such stations are replaced by one shortcut edge per direction.
+Under the /api/dostupnost cost model (wait on boarding, transfer penalty on
+route change, WALK without wait), riding through a pass-through station on the
+same route costs exactly the summed travel time, so shortest times between
+the remaining stations do not change.
+
+School-relevant stations are never contracted: the school's stop_id from
+data/school_locations.json and every station within SCHOOL_ANCHOR_RADIUS_KM
+of a school (the walking radius the API uses to match stops to schools).
+
+The contracted graph keeps all stops and adds
+    "via": {from_id: {to_id: [[stop_id, minutes_from_start], ...]}}
+listing the intermediate stations of each shortcut for path reconstruction.
+Contracted stations keep their original out-edges, so they still work as
+search origins; no other station has an edge into them, so searches from the
+remaining stations never enter a chain and reach its stations only via "via".
+
+Usage:
+    python scripts/graph_contraction.py data/transit_graph.json   # → data/transit_graph_contracted.json
+"""
+
+import argparse
+import json
+import math
+from collections import defaultdict
+from pathlib import Path
+
+from walk_edges import KM_PER_DEG_LAT, haversine_km
+
+SCHOOL_LOCATIONS = Path(__file__).resolve().parent.parent / "data" / "school_locations.json"
+
+# Same as MAX_WALK_DISTANCE_KM in src/app/api/dostupnost/route.ts
+SCHOOL_ANCHOR_RADIUS_KM = 1.5
+
+
+def _namespaced_stations(stops: dict, feeds: list[str]) -> dict:
+    """(feed, member stop_id) → stations of a multi-feed graph containing "FEED:stop_id"."""
+    stations = defaultdict(set)
+    for sid in stops:
+        for member in sid.split("|"):
+            feed, _, stop_id = member.partition(":")
+            if feed in feeds:
+                stations[(feed, stop_id)].add(sid)
+    return stations
+
+
+def school_anchor_stops(stops: dict, school_locations: Path = SCHOOL_LOCATIONS,
+                        radius_km: float = SCHOOL_ANCHOR_RADIUS_KM,
+                        feeds: list[str] | None = None) -> set:
+    """Stations that must stay in the graph: school stops and stops within radius_km of a school.
+
+    In a multi-feed graph (feeds = its feed names) station IDs are namespaced
+    "FEED:stop_id" and may merge several feeds; a school stop "a|b" anchors
+    every station holding FEED:a and FEED:b of one feed.
+    """
+    if not school_locations.exists():
+        return set()
+    with open(school_locations, encoding="utf-8") as f:
+        schools = json.load(f).get("schools", {})
+
+    school_ids = {loc["stop_id"] for loc in schools.values() if loc.get("stop_id")}
+    if feeds:
+        stations = _namespaced_stations(stops, feeds)
+        anchors = set()
+        for school_id in school_ids:
+            for feed in feeds:
+                anchors |= set.intersection(*(stations.get((feed, m), set()) for m in school_id.split("|")))
+    else:
+        anchors = school_ids
+
+    cell = radius_km / KM_PER_DEG_LAT  # degrees; lon cells widened below
+    grid = defaultdict(list)
+    for sid, (_, lat, lon) in stops.items():
+        if lat or lon:
+            grid[(math.floor(lat / cell), math.floor(lon / cell))].append((sid, lat, lon))
+
+    for loc in schools.values():
+        lat, lon = loc.get("lat"), loc.get("lon")
+        if lat is None or lon is None:
+            continue
+        row, col = math.floor(lat / cell), math.floor(lon / cell)
+        lon_cells = math.ceil(1 / max(0.1, math.cos(math.radians(abs(lat) + cell))))
+        for r in range(row - 1, row + 2):
+            for c in range(col - lon_cells, col + lon_cells + 1):
+                for sid, stop_lat, stop_lon in grid.get((r, c), ()):
+                    if haversine_km(lat, lon, stop_lat, stop_lon) <= radius_km:
+                        anchors.add(sid)
+    return anchors
+
+
+def _pass_through(out_edges: dict, in_edges: dict, sid: str) -> dict | None:
+    """{predecessor: successor} if sid is a pass-through station, else None."""
+    outs, ins = out_edges.get(sid, {}), in_edges.get(sid, {})
+    if len(outs) == 1 and len(ins) == 1:
+        (a, routes_in), = ins.items()
+        (b, (_, routes_out)), = outs.items()
+        if a != b and routes_in == routes_out:
+            return {a: b}
+    elif len(outs) == 2 and set(outs) == set(ins):
+        a, b = outs
+        if ins[a] == outs[b][1] and ins[b] == outs[a][1]:
+            return {a: b, b: a}
+    return None
+
+
+def contract_chains(edges: dict, anchors: set) -> tuple[dict, dict, int]:
+    """Contract pass-through chains of a transit_graph.json "edges" dict.
+
+    Returns (edges, via, contracted_stops) with edges in the same format;
+    contracted stations keep their out-edges (origins inside a chain).
+    Chains that would close a loop or duplicate an existing edge are kept.
+    """
+    out_edges = {}
+    in_edges = defaultdict(dict)
+    for source, neighbors in edges.items():
+        out_edges[source] = {dest: (minutes, frozenset(routes)) for dest, minutes, routes in neighbors}
+        for dest, _, routes in neighbors:
+            in_edges[dest][source] = frozenset(routes)
+
+    through = {}
+    for sid in out_edges:
+        if sid not in anchors:
+            successor = _pass_through(out_edges, in_edges, sid)
+            if successor is not None:
+                through[sid] = successor
+
+    # Both directions of a two-way chain pass the same stations, so a chain is
+    # contracted only if no chain through its stations had to be kept
+    chains = []  # (source, first_dest, last, minutes, routes, [[stop, offset], ...])
+    blocked = set()
+    targets = defaultdict(set)
+    for source, neighbors in edges.items():
+        if source in through:
+            continue
+        for dest, minutes, routes in neighbors:
+            if dest not in through:
+                continue
+            chain, total, prev, cur = [], minutes, source, dest
+            while cur in through:
+                chain.append([cur, round(total, 1)])
+                nxt = through[cur][prev]
+                total += out_edges[cur][nxt][0]
+                prev, cur = cur, nxt
+                if cur == dest:  # ring of pass-through stations
+                    break
+            if cur in through or cur == source or cur in out_edges[source] or cur in targets[source]:
+                blocked.update(stop for stop, _ in chain)
+                continue
+            targets[source].add(cur)
+            chains.append((source, dest, cur, round(total, 1), routes, chain))
+
+    contracted = set()
+    shortcuts = defaultdict(dict)  # source → {first_dest: shortcut edge}
+    via = defaultdict(dict)
+    for source, dest, last, minutes, routes, chain in chains:
+        if any(stop in blocked for stop, _ in chain):
+            continue
+        shortcuts[source][dest] = [last, minutes, routes]
+        via[source][last] = chain
+        contracted.update(stop for stop, _ in chain)
+
+    result = {}
+    for source, neighbors in edges.items():
+        replaced = shortcuts.get(source, {})
+        result[source] = sorted(replaced.get(dest, [dest, minutes, routes])
+                                for dest, minutes, routes in neighbors)
+    via_out = {source: dict(sorted(targets.items())) for source, targets in sorted(via.items())}
+    return result, via_out, len(contracted)
+
+
+def contract_graph(graph: dict, anchors: set) -> dict:
+    """Contracted copy of a transit_graph.json dict (stops and headways unchanged)."""
+    edges, via, contracted = contract_chains(graph["edges"], anchors)
+    total_edges = sum(len(neighbors) for neighbors in edges.values())
+    return {
+        "metadata": {
+            **graph.get("metadata", {}),
+            "stations_with_edges": len(edges),
+            "directed_edges": total_edges,
+            "avg_out_degree": round(total_edges / max(1, len(edges)), 1),
+            "contracted_stops": contracted,
+            "network_stations": len(edges) - contracted,  # stations with edges into them
+            "shortcut_edges": sum(len(targets) for targets in via.values()),
+        },
+        "stops": graph["stops"],
+        "edges": dict(sorted(edges.items())),
+        "headways": graph.get("headways", {}),
+        "via": via,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contract pass-through chains of transit_graph.json")
+    parser.add_argument("graph", type=Path)
+    parser.add_argument("-o", "--output", type=Path, help="default: <graph>_contracted.json")
+    parser.add_argument("--schools", type=Path, default=SCHOOL_LOCATIONS)
+    parser.add_argument("--anchor-radius", type=float, default=SCHOOL_ANCHOR_RADIUS_KM, metavar="KM")
+    args = parser.parse_args()
+
+    with open(args.graph, encoding="utf-8") as f:
+        graph = json.load(f)
+    anchors = school_anchor_stops(graph["stops"], args.schools, args.anchor_radius,
+                                  feeds=graph["metadata"].get("feeds"))
+    contracted = contract_graph(graph, anchors)
+
+    output = args.output or args.graph.with_name(f"{args.graph.stem}_contracted.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(contracted, f, ensure_ascii=False, separators=(",", ":"))
+    meta = contracted["metadata"]
+    print(f"Output: {output}")
+    print(f"  Anchors: {len(anchors)}, contracted stops: {meta['contracted_stops']}, "
+          f"shortcuts: {meta['shortcut_edges']}")
+    print(f"  Network stations: {len(graph['edges'])} → {meta['network_stations']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Regional tiling of transit_graph.json for partial loads.
+
+Stops are partitioned on a lat/lon grid. Every tile is a shard in the
+transit_graph.json format: its own stops, all their outgoing edges (including
+edges leaving the tile) and the headways of routes used there. index.json
+holds the grid, per-tile bounding boxes and neighbours, and the boundary
+index: for every stop reached by an edge crossing a tile border, the tile
+that owns it. A consumer loads the origin tile (+ neighbours) and pulls in
+further tiles only when a search reaches a boundary stop.
+
+Grid: tile_deg degrees of latitude × 1.5·tile_deg of longitude, roughly square
+at Czech latitudes (default 0.25° ≈ 28 × 27 km).
+
+Usage:
+    python scripts/graph_tiles.py data/transit_graph.json                  # → data/transit_graph_tiles/
+    python scripts/graph_tiles.py data/transit_graph.json --tile-deg 0.5
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+from collections import defaultdict
+from pathlib import Path
+
+DEFAULT_TILE_DEG = 0.25
+LON_FACTOR = 1.5
+UNPLACED = "unplaced"
+
+
+def tile_key(lat: float, lon: float, tile_deg: float = DEFAULT_TILE_DEG) -> str:
+    """Grid cell of a coordinate, e.g. "r200_c38"."""
+    row = math.floor(lat / tile_deg)
+    col = math.floor(lon / (tile_deg * LON_FACTOR))
+    return f"r{row}_c{col}"
+
+
+def _parse_key(key: str) -> tuple[int, int] | None:
+    if not key.startswith("r"):
+        return None
+    row, col = key[1:].split("_c")
+    return int(row), int(col)
+
+
+def _adjacent_keys(key: str) -> list[str]:
+    cell = _parse_key(key)
+    if cell is None:
+        return []
+    row, col = cell
+    return [f"r{row + dr}_c{col + dc}" for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+
+
+def assign_tiles(graph: dict, tile_deg: float) -> dict:
+    """stop_id → tile key; stops without coordinates follow their first predecessor."""
+    stops, edges = graph["stops"], graph["edges"]
+    stop_tile = {}
+    for sid, (_, lat, lon) in stops.items():
+        if lat or lon:
+            stop_tile[sid] = tile_key(lat, lon, tile_deg)
+
+    for source, neighbors in edges.items():
+        for dest, _, _ in neighbors:
+            if dest not in stop_tile and source in stop_tile:
+                stop_tile[dest] = stop_tile[source]
+    for source, neighbors in edges.items():
+        stop_tile.setdefault(source, UNPLACED)
+        for dest, _, _ in neighbors:
+            stop_tile.setdefault(dest, UNPLACED)
+    for sid in stops:
+        stop_tile.setdefault(sid, UNPLACED)
+    return stop_tile
+
+
+def write_tiles(graph: dict, out_dir: Path, tile_deg: float = DEFAULT_TILE_DEG) -> dict:
+    """Split a graph into tile shards + index.json; returns the index."""
+    stop_tile = assign_tiles(graph, tile_deg)
+    headways = graph.get("headways", {})
+
+    tiles = defaultdict(lambda: {"stops": {}, "edges": {}, "routes": set()})
+    for sid, tile in stop_tile.items():
+        shard = tiles[tile]
+        if sid in graph["stops"]:
+            shard["stops"][sid] = graph["stops"][sid]
+
+    boundary = {}
+    connected = defaultdict(set)
+    for source, neighbors in graph["edges"].items():
+        tile = stop_tile[source]
+        tiles[tile]["edges"][source] = neighbors
+        for dest, _, routes in neighbors:
+            tiles[tile]["routes"].update(routes)
+            if stop_tile[dest] != tile:
+                boundary[dest] = stop_tile[dest]
+                connected[tile].add(stop_tile[dest])
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir(parents=True)
+
+    index_tiles = {}
+    for key in sorted(tiles):
+        shard = tiles[key]
+        lats = [lat for _, lat, lon in shard["stops"].values() if lat or lon]
+        lons = [lon for _, lat, lon in shard["stops"].values() if lat or lon]
+        data = {
+            "metadata": {**graph.get("metadata", {}), "tile": key},
+            "stops": dict(sorted(shard["stops"].items())),
+            "edges": dict(sorted(shard["edges"].items())),
+            "headways": {r: headways[r] for r in sorted(shard["routes"]) if r in headways},
+        }
+        filename = f"{key}.json"
+        with open(out_dir / filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        index_tiles[key] = {
+            "file": filename,
+            "bbox": [min(lats), min(lons), max(lats), max(lons)] if lats else None,
+            "stops": len(shard["stops"]),
+            "edges": sum(len(v) for v in shard["edges"].values()),
+            "adjacent": [k for k in _adjacent_keys(key) if k in tiles],
+            "connected": sorted(connected[key]),
+        }
+
+    index = {
+        "metadata": graph.get("metadata", {}),
+        "tile_deg": tile_deg,
+        "lon_factor": LON_FACTOR,
+        "tiles": index_tiles,
+        "boundary": dict(sorted(boundary.items())),
+    }
+    with open(out_dir / "index.json", "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    return index
+
+
+class TiledGraph:
+    """Lazily loaded tiled graph with the transit_graph.json stops/edges/headways dicts."""
+
+    def __init__(self, tiles_dir: Path):
+        self.dir = tiles_dir
+        with open(tiles_dir / "index.json", encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.tile_deg = self.index["tile_deg"]
+        self.boundary = self.index["boundary"]
+        self.loaded = set()
+        self.stops, self.edges, self.headways = {}, {}, {}
+
+    def tile_for_point(self, lat: float, lon: float) -> str | None:
+        key = tile_key(lat, lon, self.tile_deg)
+        return key if key in self.index["tiles"] else None
+
+    def load_tile(self, key: str):
+        if key in self.loaded or key not in self.index["tiles"]:
+            return
+        with open(self.dir / self.index["tiles"][key]["file"], encoding="utf-8") as f:
+            shard = json.load(f)
+        self.stops.update(shard["stops"])
+        self.edges.update(shard["edges"])
+        self.headways.update(shard["headways"])
+        self.loaded.add(key)
+
+    def load_around(self, lat: float, lon: float, with_adjacent: bool = True) -> list[str]:
+        """Load the tile containing (lat, lon) and its grid neighbours."""
+        key = self.tile_for_point(lat, lon)
+        if key is None:
+            return []
+        keys = [key] + (self.index["tiles"][key]["adjacent"] if with_adjacent else [])
+        for k in keys:
+            self.load_tile(k)
+        return keys
+
+    def neighbors(self, stop_id: str) -> list:
+        """Outgoing edges of a stop, loading its tile first if it lies across a boundary."""
+        tile = self.boundary.get(stop_id)
+        if tile is not None and tile not in self.loaded:
+            self.load_tile(tile)
+        return self.edges.get(stop_id, [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split transit_graph.json into regional tiles")
+    parser.add_argument("graph", type=Path)
+    parser.add_argument("-o", "--output", type=Path, help="tile directory (default: <graph>_tiles/)")
+    parser.add_argument("--tile-deg", type=float, default=DEFAULT_TILE_DEG)
+    args = parser.parse_args()
+
+    with open(args.graph, encoding="utf-8") as f:
+        graph = json.load(f)
+    out_dir = args.output or args.graph.with_name(f"{args.graph.stem}_tiles")
+    index = write_tiles(graph, out_dir, args.tile_deg)
+
+    sizes = [os.path.getsize(out_dir / t["file"]) for t in index["tiles"].values()]
+    print(f"Output: {out_dir} ({len(index['tiles'])} tiles, {len(index['boundary'])} boundary stops)")
+    if sizes:
+        print(f"  Tile size: max {max(sizes) / 1024:.0f} KB, "
+              f"median {sorted(sizes)[len(sizes) // 2] / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
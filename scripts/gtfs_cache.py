@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""Binary parse cache for a GTFS feed.
+
+The first run parses stop_times, trips, routes, stops, calendar and
+calendar_dates once and writes them as flat little-endian arrays (one file
+per column) plus small JSON string tables. Later runs memory-map the arrays,
+so graph builds with different parameters skip CSV parsing entirely.
+
+IDs are dictionary-encoded to ints (index into the string table), times are
+int32 seconds since midnight (-1 = missing). stop_times rows are grouped into
+contiguous trip runs with a precomputed first departure, so consumers can
+drop whole trips without touching their rows.
+
+The cache directory is keyed by the feed's resolved path and a SHA-256 of the
+source files; the hashes are memoized by (size, mtime) so an unchanged feed is
+not re-hashed. Building a new version drops the older caches of the same path.
+
+Usage:
+    python scripts/gtfs_cache.py data/GTFS_CR            # build (or reuse) the cache
+    python scripts/gtfs_cache.py data/GTFS_CR --rebuild
+
+Arrays use the stdlib array/mmap modules, so no extra dependency is needed.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import mmap
+import shutil
+import sys
+import time
+from array import array
+from pathlib import Path
+
+CACHE_VERSION = 2
+CACHE_ROOT = Path(__file__).resolve().parent.parent / "data" / "gtfs_cache"
+
+SOURCE_FILES = ("routes.txt", "calendar.txt", "trips.txt", "stops.txt", "stop_times.txt")
+OPTIONAL_FILES = ("calendar_dates.txt",)
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Column arrays: name → typecode
+ARRAYS = {
+    # routes
+    "route_short": "i",       # index into route_short_names, -1 = empty
+    # calendar (services referenced only from trips.txt get mask 0)
+    "service_weekdays": "B",  # bit i = WEEKDAYS[i]
+    "service_start": "i",     # YYYYMMDD, 0 = unknown
+    "service_end": "i",
+    # calendar_dates (see service_calendar.py)
+    "cd_service": "i",
+    "cd_date": "i",           # YYYYMMDD
+    "cd_type": "b",           # 1 = added, 2 = removed
+    # trips
+    "trip_route": "i",
+    "trip_service": "i",
+    # stops
+    "stop_parent": "i",       # index of parent stop (self for stations/standalone)
+    "stop_location_type": "b",
+    "stop_lat": "d",          # NaN when missing
+    "stop_lon": "d",
+    # stop_times
+    "st_stop": "i",
+    "st_arrival": "i",        # seconds, -1 = missing
+    "st_departure": "i",
+    # contiguous trip runs in stop_times.txt
+    "group_trip": "i",        # trip index, -1 = trip not in trips.txt
+    "group_offset": "q",      # first row of the run; one extra entry = row count
+    "group_min_departure": "i",
+}
+
+STRING_TABLES = ("route_ids", "route_short_names", "service_ids", "trip_ids", "stop_ids", "stop_names")
+
+
+def parse_time_seconds(time_str: str) -> int:
+    """Parse HH:MM:SS to seconds since midnight, -1 when invalid."""
+    parts = time_str.strip().split(":")
+    if len(parts) != 3:
+        return -1
+    try:
+        return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
+    except ValueError:
+        return -1
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def feed_fingerprint(gtfs_dir: Path, cache_root: Path) -> str:
+    """SHA-256 over the source files' hashes, memoized by (size, mtime_ns)."""
+    memo_path = cache_root / "hash_memo.json"
+    try:
+        memo = json.loads(memo_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        memo = {}
+
+    combined = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    changed = False
+    for name in SOURCE_FILES + OPTIONAL_FILES:
+        path = (gtfs_dir / name).resolve()
+        if name in OPTIONAL_FILES and not path.exists():
+            combined.update(f"{name}:missing".encode())
+            continue
+        stat = path.stat()
+        entry = memo.get(str(path))
+        if not entry or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _sha256(path)}
+            memo[str(path)] = entry
+            changed = True
+        combined.update(f"{name}:{entry['sha256']}".encode())
+
+    if changed:
+        cache_root.mkdir(parents=True, exist_ok=True)
+        memo_path.write_text(json.dumps(memo, indent=1), encoding="utf-8")
+    return combined.hexdigest()
+
+
+def _reader(path: Path):
+    f = open(path, encoding="utf-8-sig", newline="")
+    reader = csv.reader(f)
+    header = [h.strip() for h in next(reader, [])]
+    return f, reader, {name: i for i, name in enumerate(header)}
+
+
+def _col(row: list, idx: int | None) -> str:
+    if idx is None or idx >= len(row):
+        return ""
+    return row[idx].strip()
+
+
+class _Table:
+    """String ↔ index dictionary used while building."""
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def get(self, value: str) -> int:
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+
+def build_cache(gtfs_dir: Path, out_dir: Path, fingerprint: str):
+    """Parse the feed once and write arrays + string tables to out_dir."""
+    t0 = time.time()
+    arrays = {name: array(code) for name, code in ARRAYS.items()}
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    # routes.txt
+    route_ids, route_shorts = _Table(), _Table()
+    f, reader, cols = _reader(gtfs_dir / "routes.txt")
+    with f:
+        i_id, i_short = cols["route_id"], cols.get("route_short_name")
+        for row in reader:
+            if not row:
+                continue
+            rid = route_ids.get(_col(row, i_id))
+            short = _col(row, i_short)
+            if rid == len(arrays["route_short"]):
+                arrays["route_short"].append(-1)
+            arrays["route_short"][rid] = route_shorts.get(short) if short else -1
+
+    # calendar.txt
+    services = _Table()
+
+    def service_idx(value: str) -> int:
+        idx = services.get(value)
+        if idx == len(arrays["service_weekdays"]):
+            arrays["service_weekdays"].append(0)
+            arrays["service_start"].append(0)
+            arrays["service_end"].append(0)
+        return idx
+
+    f, reader, cols = _reader(gtfs_dir / "calendar.txt")
+    with f:
+        day_cols = [cols.get(day) for day in WEEKDAYS]
+        for row in reader:
+            if not row:
+                continue
+            sid = service_idx(_col(row, cols["service_id"]))
+            mask = 0
+            for bit, idx in enumerate(day_cols):
+                if _col(row, idx) == "1":
+                    mask |= 1 << bit
+            arrays["service_weekdays"][sid] = mask
+            for name, col in (("service_start", "start_date"), ("service_end", "end_date")):
+                value = _col(row, cols.get(col))
+                arrays[name][sid] = int(value) if value.isdigit() else 0
+
+    # calendar_dates.txt (optional)
+    dates_path = gtfs_dir / "calendar_dates.txt"
+    if dates_path.exists():
+        f, reader, cols = _reader(dates_path)
+        with f:
+            i_service, i_date, i_type = cols["service_id"], cols["date"], cols["exception_type"]
+            for row in reader:
+                if not row:
+                    continue
+                day, exception_type = _col(row, i_date), _col(row, i_type)
+                if not day.isdigit():
+                    continue
+                arrays["cd_service"].append(service_idx(_col(row, i_service)))
+                arrays["cd_date"].append(int(day))
+                arrays["cd_type"].append(int(exception_type) if exception_type.isdigit() else 0)
+
+    # trips.txt
+    trips = _Table()
+    f, reader, cols = _reader(gtfs_dir / "trips.txt")
+    with f:
+        i_trip, i_route, i_service = cols["trip_id"], cols["route_id"], cols["service_id"]
+        for row in reader:
+            if not row:
+                continue
+            tid = trips.get(_col(row, i_trip))
+            route = route_ids.index.get(_col(row, i_route), -1)
+            service = service_idx(_col(row, i_service))
+            if tid == len(arrays["trip_route"]):
+                arrays["trip_route"].append(route)
+                arrays["trip_service"].append(service)
+            else:
+                arrays["trip_route"][tid] = route
+                arrays["trip_service"][tid] = service
+
+    # stops.txt
+    stops = _Table()
+    stop_names = []
+    parents = []  # parent stop_id string per stop, resolved after all stops are known
+
+    def stop_idx(value: str) -> int:
+        idx = stops.get(value)
+        if idx == len(stop_names):
+            stop_names.append("")
+            parents.append(value)
+            arrays["stop_location_type"].append(-1)
+            arrays["stop_lat"].append(math.nan)
+            arrays["stop_lon"].append(math.nan)
+        return idx
+
+    f, reader, cols = _reader(gtfs_dir / "stops.txt")
+    with f:
+        i_id, i_name = cols["stop_id"], cols.get("stop_name")
+        i_lat, i_lon = cols.get("stop_lat"), cols.get("stop_lon")
+        i_type, i_parent = cols.get("location_type"), cols.get("parent_station")
+        for row in reader:
+            if not row:
+                continue
+            sid = _col(row, i_id)
+            idx = stop_idx(sid)
+            stop_names[idx] = _col(row, i_name)
+            loc_type = _col(row, i_type)
+            arrays["stop_location_type"][idx] = int(loc_type) if loc_type.isdigit() else 0
+            try:
+                arrays["stop_lat"][idx] = float(_col(row, i_lat))
+                arrays["stop_lon"][idx] = float(_col(row, i_lon))
+            except ValueError:
+                arrays["stop_lat"][idx] = arrays["stop_lon"][idx] = math.nan
+            parent = _col(row, i_parent)
+            parents[idx] = parent if parent and loc_type != "1" else sid
+
+    # stop_times.txt (stops unknown to stops.txt are appended with location_type -1)
+    f, reader, cols = _reader(gtfs_dir / "stop_times.txt")
+    with f:
+        i_trip, i_stop = cols["trip_id"], cols["stop_id"]
+        i_arr, i_dep = cols["arrival_time"], cols["departure_time"]
+        st_stop, st_arr, st_dep = arrays["st_stop"], arrays["st_arrival"], arrays["st_departure"]
+        group_trip, group_offset = arrays["group_trip"], arrays["group_offset"]
+        group_min_dep = arrays["group_min_departure"]
+        time_cache = {}
+        stop_lookup = stops.index
+
+        current_trip = None
+        min_dep = -1
+        for row in reader:
+            if not row:
+                continue
+            tid = row[i_trip]
+            if tid != current_trip:
+                if current_trip is not None:
+                    group_min_dep.append(min_dep)
+                current_trip = tid
+                min_dep = -1
+                group_trip.append(trips.index.get(tid.strip(), -1))
+                group_offset.append(len(st_stop))
+
+            sid = row[i_stop]
+            idx = stop_lookup.get(sid)
+            if idx is None:
+                idx = stop_idx(sid.strip())
+            st_stop.append(idx)
+
+            arr_str, dep_str = row[i_arr], row[i_dep]
+            arr = time_cache.get(arr_str)
+            if arr is None:
+                arr = time_cache[arr_str] = parse_time_seconds(arr_str)
+            dep = time_cache.get(dep_str)
+            if dep is None:
+                dep = time_cache[dep_str] = parse_time_seconds(dep_str)
+            st_arr.append(arr)
+            st_dep.append(dep)
+            if dep >= 0 and (min_dep < 0 or dep < min_dep):
+                min_dep = dep
+
+        if current_trip is not None:
+            group_min_dep.append(min_dep)
+        group_offset.append(len(st_stop))
+
+    for parent in parents[:]:  # parents may reference stops missing from stops.txt
+        stop_idx(parent)
+    arrays["stop_parent"].extend(stops.index[p] for p in parents)
+
+    strings = {
+        "route_ids": route_ids.values,
+        "route_short_names": route_shorts.values,
+        "service_ids": services.values,
+        "trip_ids": trips.values,
+        "stop_ids": stops.values,
+        "stop_names": stop_names,
+    }
+
+    for name, values in arrays.items():
+        with open(tmp_dir / f"{name}.bin", "wb") as out:
+            values.tofile(out)
+    for name, values in strings.items():
+        with open(tmp_dir / f"{name}.json", "w", encoding="utf-8") as out:
+            json.dump(values, out, ensure_ascii=False, separators=(",", ":"))
+
+    manifest = {
+        "version": CACHE_VERSION,
+        "fingerprint": fingerprint,
+        "source": str(gtfs_dir.resolve()),
+        "byteorder": sys.byteorder,
+        "arrays": {name: {"type": code, "length": len(arrays[name])} for name, code in ARRAYS.items()},
+        "counts": {
+            "routes": len(route_ids.values),
+            "services": len(services.values),
+            "trips": len(trips.values),
+            "stops": len(stops.values),
+            "stop_times": len(arrays["st_stop"]),
+            "groups": len(arrays["group_trip"]),
+        },
+        "build_seconds": round(time.time() - t0, 1),
+    }
+    with open(tmp_dir / "manifest.json", "w", encoding="utf-8") as out:
+        json.dump(manifest, out, indent=2)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    tmp_dir.rename(out_dir)
+
+
+class GTFSCache:
+    """Read-only view of a built cache; arrays are memory-mapped."""
+
+    def __init__(self, cache_dir: Path):
+        self.dir = cache_dir
+        with open(cache_dir / "manifest.json", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest["byteorder"] != sys.byteorder:
+            raise ValueError(f"{cache_dir} was built on a {self.manifest['byteorder']}-endian machine")
+        self._arrays = {}
+        self._strings = {}
+        self._maps = []
+
+    @property
+    def counts(self) -> dict:
+        return self.manifest["counts"]
+
+    def array(self, name: str):
+        """Memory-mapped column as a typed memoryview (indexable like a list)."""
+        if name not in self._arrays:
+            code = self.manifest["arrays"][name]["type"]
+            path = self.dir / f"{name}.bin"
+            if path.stat().st_size == 0:
+                self._arrays[name] = array(code)
+            else:
+                with open(path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps.append(mapped)
+                self._arrays[name] = memoryview(mapped).cast(code)
+        return self._arrays[name]
+
+    def strings(self, name: str) -> list[str]:
+        if name not in self._strings:
+            with open(self.dir / f"{name}.json", encoding="utf-8") as f:
+                self._strings[name] = json.load(f)
+        return self._strings[name]
+
+
+def cache_dir_for(gtfs_dir: Path, fingerprint: str, cache_root: Path = CACHE_ROOT) -> Path:
+    """<feed dir name>-<hash of its resolved path>-<fingerprint>; same-named feeds don't collide."""
+    source = gtfs_dir.resolve()
+    path_hash = hashlib.sha256(str(source).encode("utf-8")).hexdigest()[:8]
+    return cache_root / f"{source.name}-{path_hash}-{fingerprint[:16]}"
+
+
+def _cache_source(cache_dir: Path) -> str | None:
+    try:
+        with open(cache_dir / "manifest.json", encoding="utf-8") as f:
+            return json.load(f).get("source")
+    except (OSError, ValueError):
+        return None
+
+
+def load_or_build(gtfs_dir: Path, cache_root: Path = CACHE_ROOT, rebuild: bool = False) -> GTFSCache:
+    """Open the cache for gtfs_dir, building it first if the feed changed."""
+    fingerprint = feed_fingerprint(gtfs_dir, cache_root)
+    cache_dir = cache_dir_for(gtfs_dir, fingerprint, cache_root)
+    if rebuild or not (cache_dir / "manifest.json").exists():
+        print(f"Building GTFS cache {cache_dir} ...")
+        build_cache(gtfs_dir, cache_dir, fingerprint)
+        # Drop caches of earlier versions of the same feed (same source path)
+        source = str(gtfs_dir.resolve())
+        for stale in cache_root.iterdir():
+            if stale != cache_dir and stale.is_dir() and _cache_source(stale) == source:
+                shutil.rmtree(stale, ignore_errors=True)
+    return GTFSCache(cache_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build binary parse cache for a GTFS feed")
+    parser.add_argument("gtfs_dir", type=Path)
+    parser.add_argument("--cache-root", type=Path, default=CACHE_ROOT)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    cache = load_or_build(args.gtfs_dir, args.cache_root, args.rebuild)
+    size_mb = sum(p.stat().st_size for p in cache.dir.iterdir()) / (1024 * 1024)
+    print(f"Cache: {cache.dir} ({size_mb:.1f} MB) in {time.time() - t0:.1f}s")
+    for name, count in cache.counts.items():
+        print(f"  {name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
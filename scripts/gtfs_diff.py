@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Streaming diff of two GTFS feeds.
+
+Compares two feed directories file by file and reports added, removed and
+changed entities per file, e.g.:
+
+    python scripts/gtfs_diff.py data/GTFS_CR_prev data/GTFS_CR -o data/gtfs_diff.json
+
+Each file is streamed once per feed. Rows are not kept in memory: every
+entity is reduced to a 64-bit key hash, a 64-bit content digest and its key
+string packed into a shared byte buffer, so memory depends on the number of
+entities, not on the number of rows or the file size.
+
+Entities are identified by natural keys (NATURAL_KEYS). Files with a group
+column (stop_times.txt → trip_id, shapes.txt → shape_id) are compared per
+group: the digests of all rows of one trip are folded into one trip digest,
+so a multi-GB stop_times.txt costs one small record per trip.
+
+Output JSON (consumed by incremental rebuilds, see update_transit_graph.py):
+- files: {filename: {status, key, entity, old_rows, new_rows,
+                     added: [...], removed: [...], changed: [...]}}
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import sys
+import time
+from array import array
+from pathlib import Path
+
+# filename → (natural key columns, group column or None)
+NATURAL_KEYS = {
+    "agency.txt": (("agency_id",), None),
+    "stops.txt": (("stop_id",), None),
+    "routes.txt": (("route_id",), None),
+    "trips.txt": (("trip_id",), None),
+    "stop_times.txt": (("trip_id", "stop_sequence"), "trip_id"),
+    "calendar.txt": (("service_id",), None),
+    "calendar_dates.txt": (("service_id", "date"), None),
+    "shapes.txt": (("shape_id", "shape_pt_sequence"), "shape_id"),
+    "frequencies.txt": (("trip_id", "start_time"), None),
+    "transfers.txt": (("from_stop_id", "to_stop_id"), None),
+    "fare_attributes.txt": (("fare_id",), None),
+    "fare_rules.txt": (("fare_id", "route_id", "origin_id", "destination_id"), None),
+    "feed_info.txt": (("feed_publisher_name",), None),
+}
+
+KEY_SEP = "\x1f"
+MASK64 = (1 << 64) - 1
+
+
+def _hash64(text: str) -> int:
+    """64-bit hash of a string (stable across runs, unlike hash())."""
+    return int.from_bytes(
+        hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def read_header(path: Path) -> list[str]:
+    """Return the stripped column names of a GTFS file."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), [])
+    return [h.strip() for h in header]
+
+
+class EntityTable:
+    """Compact (key hash, digest, key) table for one file of one feed.
+
+    Key strings are packed into a single bytearray; hashes and digests live
+    in array('Q'), so one entity costs ~16 bytes plus its key length.
+    """
+
+    def __init__(self):
+        self.hashes = array("Q")
+        self.digests = array("Q")
+        self.key_blob = bytearray()
+        self.key_offsets = array("Q", [0])
+        self.rows = 0
+        self.order = None
+
+    def add(self, key: str, digest: int):
+        self.hashes.append(_hash64(key))
+        self.digests.append(digest & MASK64)
+        self.key_blob += key.encode("utf-8")
+        self.key_offsets.append(len(self.key_blob))
+
+    def key(self, idx: int) -> str:
+        return self.key_blob[self.key_offsets[idx]:self.key_offsets[idx + 1]].decode("utf-8")
+
+    def finalize(self):
+        """Sort by key hash and fold repeated keys (non-contiguous groups, duplicates)."""
+        order = sorted(range(len(self.hashes)), key=self.hashes.__getitem__)
+        folded = array("L")
+        for idx in order:
+            if folded and self.hashes[folded[-1]] == self.hashes[idx]:
+                head = folded[-1]
+                self.digests[head] = (self.digests[head] + self.digests[idx]) & MASK64
+            else:
+                folded.append(idx)
+        self.order = folded
+
+    def __len__(self):
+        return len(self.order) if self.order is not None else len(self.hashes)
+
+
+def scan_file(path: Path, key_cols: tuple, group_col: str | None, columns: list[str]) -> EntityTable:
+    """Stream one GTFS file into an EntityTable.
+
+    Args:
+        key_cols: natural key columns of one row
+        group_col: if set, rows are folded per value of this column
+        columns: columns included in the content digest (shared by both feeds)
+    """
+    table = EntityTable()
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        col_idx = {name: i for i, name in enumerate(header)}
+        width = len(header)
+        key_idx = [col_idx[c] for c in key_cols if c in col_idx]
+        digest_idx = [col_idx[c] for c in columns]
+        group_idx = col_idx.get(group_col) if group_col else None
+
+        current_group = None
+        group_digest = 0
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row += [""] * (width - len(row))
+            table.rows += 1
+            digest = _hash64(KEY_SEP.join(row[i].strip() for i in digest_idx))
+
+            if group_idx is None:
+                key = KEY_SEP.join(row[i].strip() for i in key_idx)
+                table.add(key, digest)
+                continue
+
+            group = row[group_idx].strip()
+            if group != current_group:
+                if current_group is not None:
+                    table.add(current_group, group_digest)
+                current_group = group
+                group_digest = 0
+            # Sum is order-independent, so reordered rows within a trip don't count as changes
+            group_digest = (group_digest + digest) & MASK64
+
+        if current_group is not None:
+            table.add(current_group, group_digest)
+
+    table.finalize()
+    return table
+
+
+def _format_key(key: str, key_cols: tuple, group_col: str | None):
+    if group_col or len(key_cols) == 1:
+        return key
+    return key.split(KEY_SEP)
+
+
+def diff_file(old_path: Path, new_path: Path, filename: str) -> dict:
+    """Diff one GTFS file present in both feeds."""
+    key_cols, group_col = NATURAL_KEYS.get(filename, (None, None))
+    old_header = read_header(old_path)
+    new_header = read_header(new_path)
+    if key_cols is None:
+        # Unknown file: key by the first column
+        key_cols = (old_header[0],) if old_header else ()
+
+    common = sorted(set(old_header) & set(new_header))
+    old = scan_file(old_path, key_cols, group_col, common)
+    new = scan_file(new_path, key_cols, group_col, common)
+
+    added, removed, changed = [], [], []
+    i = j = 0
+    while i < len(old.order) or j < len(new.order):
+        oi = old.order[i] if i < len(old.order) else None
+        nj = new.order[j] if j < len(new.order) else None
+        oh = old.hashes[oi] if oi is not None else None
+        nh = new.hashes[nj] if nj is not None else None
+        if nh is None or (oh is not None and oh < nh):
+            removed.append(_format_key(old.key(oi), key_cols, group_col))
+            i += 1
+        elif oh is None or nh < oh:
+            added.append(_format_key(new.key(nj), key_cols, group_col))
+            j += 1
+        else:
+            if old.digests[oi] != new.digests[nj]:
+                changed.append(_format_key(new.key(nj), key_cols, group_col))
+            i += 1
+            j += 1
+
+    return {
+        "status": "compared",
+        "key": list(key_cols),
+        "entity": group_col or "+".join(key_cols),
+        "columns_added": sorted(set(new_header) - set(old_header)),
+        "columns_removed": sorted(set(old_header) - set(new_header)),
+        "old_rows": old.rows,
+        "new_rows": new.rows,
+        "old_entities": len(old),
+        "new_entities": len(new),
+        "added": sorted(added),
+        "removed": sorted(removed),
+        "changed": sorted(changed),
+    }
+
+
+def diff_feeds(old_dir: Path, new_dir: Path, files: list[str] | None = None) -> dict:
+    """Diff two GTFS feed directories file by file."""
+    old_files = {p.name for p in old_dir.glob("*.txt")}
+    new_files = {p.name for p in new_dir.glob("*.txt")}
+    names = sorted(old_files | new_files)
+    if files:
+        names = [n for n in names if n in files]
+
+    result = {"old": str(old_dir), "new": str(new_dir), "files": {}}
+    for name in names:
+        t = time.time()
+        if name not in new_files:
+            result["files"][name] = {"status": "removed"}
+        elif name not in old_files:
+            result["files"][name] = {"status": "added"}
+        else:
+            result["files"][name] = diff_file(old_dir / name, new_dir / name, name)
+            result["files"][name]["seconds"] = round(time.time() - t, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming diff of two GTFS feeds")
+    parser.add_argument("old_dir", type=Path)
+    parser.add_argument("new_dir", type=Path)
+    parser.add_argument("-o", "--output", type=Path, help="write full diff JSON here")
+    parser.add_argument("--files", help="comma-separated subset, e.g. trips.txt,stop_times.txt")
+    args = parser.parse_args()
+
+    for d in (args.old_dir, args.new_dir):
+        if not d.is_dir():
+            print(f"Not a directory: {d}")
+            sys.exit(1)
+
+    files = [f.strip() for f in args.files.split(",")] if args.files else None
+    result = diff_feeds(args.old_dir, args.new_dir, files)
+
+    print(f"{'file':<22} {'status':<9} {'old rows':>11} {'new rows':>11} "
+          f"{'added':>8} {'removed':>8} {'changed':>8}")
+    for name, info in result["files"].items():
+        if info["status"] != "compared":
+            print(f"{name:<22} {info['status']:<9}")
+            continue
+        print(f"{name:<22} {info['status']:<9} {info['old_rows']:>11} {info['new_rows']:>11} "
+              f"{len(info['added']):>8} {len(info['removed']):>8} {len(info['changed']):>8}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"Output: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ Output:
 - data/GTFS_CZ/VL/ - GTFS pro vlaky
 - data/GTFS_CZ/BUS/ - GTFS pro autobusy
 - data/GTFS_CZ/MHD/ - GTFS pro MHD
+- data/GTFS_CZ/_intermediate_json/ - dekódované JSON (jen s --debug-json)
 - logs/ - Detailní logy
 """
 
@@ -64,9 +65,11 @@ class GTFSStats:
 class KompletToGTFS:
     """Master konvertor KOMPLET → GTFS."""
 
-    def __init__(self, komplet_dir: Path, output_base_dir: Path):
+    def __init__(self, komplet_dir: Path, output_base_dir: Path,
+                 export_intermediate_json: bool = False):
         self.komplet_dir = komplet_dir
         self.output_base_dir = output_base_dir
+        self.export_intermediate_json = export_intermediate_json
 
         # Vytvoř strukturu adresářů
         self.output_dirs = {
@@ -78,9 +81,10 @@ class KompletToGTFS:
         for dir_path in self.output_dirs.values():
             dir_path.mkdir(parents=True, exist_ok=True)
 
-        # Adresář pro intermediate JSON
+        # Adresář pro intermediate JSON (jen pro debug, feed se staví v paměti)
         self.json_dir = output_base_dir / '_intermediate_json'
-        self.json_dir.mkdir(parents=True, exist_ok=True)
+        if self.export_intermediate_json:
+            self.json_dir.mkdir(parents=True, exist_ok=True)
 
         # Setup logging
         self.log_dir = Path('logs')
@@ -287,10 +291,15 @@ class KompletToGTFS:
                 processing_time = (datetime.now() - start_time).total_seconds() * 1000
 
                 if success:
-                    # Export JSON
-                    json_file = self.json_dir / category / f"{tt_file.stem}.json"
-                    json_file.parent.mkdir(parents=True, exist_ok=True)
-                    decoder.export_json(json_file)
+                    # Debug export JSON
+                    if self.export_intermediate_json:
+                        json_file = self.json_dir / category / f"{tt_file.stem}.json"
+                        json_file.parent.mkdir(parents=True, exist_ok=True)
+                        decoder.export_json(json_file)
+
+                    # Předej zastávky a hrany rovnou do GTFS feedu
+                    self._add_city_to_gtfs(category, tt_file.stem,
+                                           decoder.stops, decoder.edge_averages())
 
                     # Statistiky
                     decoder_stats = decoder.get_stats()
@@ -319,24 +328,13 @@ class KompletToGTFS:
             self.decoding_stats.append(stats)
 
     def _build_gtfs_feeds(self):
-        """Sestav GTFS feed z dekódovaných JSON souborů."""
+        """Dokonči GTFS feed (města přidává už dekódování v Phase 2)."""
         for category in ['VL', 'BUS', 'MHD']:
             self.logger.info(f"\n[{category}] Building GTFS feed...")
 
             # Vytvoř agency
             self._create_agency(category)
 
-            # Načti všechny JSON soubory
-            json_dir = self.json_dir / category
-            if not json_dir.exists():
-                continue
-
-            json_files = sorted(json_dir.glob('*.json'))
-            self.logger.debug(f"  Processing {len(json_files)} JSON files")
-
-            for json_file in json_files:
-                self._add_city_to_gtfs(category, json_file)
-
             self.logger.info(f"  ✓ {len(self.gtfs_data[category]['stops'])} stops")
             self.logger.info(f"  ✓ {len(self.gtfs_data[category]['routes'])} routes")
             self.logger.info(f"  ✓ {len(self.gtfs_data[category]['trips'])} trips")
@@ -357,15 +355,17 @@ class KompletToGTFS:
             'agency_lang': 'cs'
         })
 
-    def _add_city_to_gtfs(self, category: str, json_file: Path):
-        """Přidej město do GTFS."""
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        city_name = json_file.stem
-        stops_list = data['stops']
-        edges_data = data.get('edges', {})
-
+    def _add_city_to_gtfs(self, category: str, city_name: str, stops_list: List[str],
+                          edges_avg: Dict[Tuple[int, int], float]):
+        """
+        Přidej město do GTFS.
+
+        Args:
+            category: VL/BUS/MHD
+            city_name: Název města (stem .tt souboru)
+            stops_list: Názvy zastávek z dekodéru
+            edges_avg: Dict[(from_idx, to_idx), průměrný cestovní čas v minutách]
+        """
         # Vytvoř zastávky
         city_stop_ids = {}
         for idx, stop_name in enumerate(stops_list):
@@ -405,9 +405,7 @@ class KompletToGTFS:
         })
 
         # Vytvoř spoje z hran
-        for edge_key, edge_info in edges_data.items():
-            from_idx, to_idx = map(int, edge_key.split('->'))
-
+        for (from_idx, to_idx), travel_time_avg in edges_avg.items():
             if from_idx not in city_stop_ids or to_idx not in city_stop_ids:
                 continue
 
@@ -431,7 +429,7 @@ class KompletToGTFS:
                 'departure_time': self._format_time(start_time),
             })
 
-            arrival_time = start_time + int(edge_info['travel_time_avg'])
+            arrival_time = start_time + int(travel_time_avg)
 
             self.gtfs_data[category]['stop_times'].append({
                 'trip_id': trip_id,
@@ -600,22 +598,26 @@ class KompletToGTFS:
 
 
 def main():
-    if len(sys.argv) < 2:
+    debug_json = '--debug-json' in sys.argv
+    args = [a for a in sys.argv[1:] if a != '--debug-json']
+
+    if not args:
         print("Usage:")
-        print("  python komplet_to_gtfs.py <komplet_dir> [output_dir]")
+        print("  python komplet_to_gtfs.py <komplet_dir> [output_dir] [--debug-json]")
         print("\nExample:")
         print("  python komplet_to_gtfs.py data/KOMPLET")
         print("  python komplet_to_gtfs.py data/KOMPLET data/GTFS_CZ")
+        print("  python komplet_to_gtfs.py data/KOMPLET data/GTFS_CZ --debug-json  # + _intermediate_json/")
         sys.exit(1)
 
-    komplet_dir = Path(sys.argv[1])
-    output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path('data/GTFS_CZ')
+    komplet_dir = Path(args[0])
+    output_dir = Path(args[1]) if len(args) > 1 else Path('data/GTFS_CZ')
 
     if not komplet_dir.exists():
         print(f"❌ Directory does not exist: {komplet_dir}")
         sys.exit(1)
 
-    converter = KompletToGTFS(komplet_dir, output_dir)
+    converter = KompletToGTFS(komplet_dir, output_dir, export_intermediate_json=debug_json)
     success = converter.convert()
 
     sys.exit(0 if success else 1)
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""RAPTOR earliest-arrival routing on the timetable export (timetable_export.py).
+
+The graph router (transit_router.py) uses median travel times and a headway
+based wait; this one answers "leave at 07:10, when do I arrive" from the
+actual trips of a profile (build_transit_graph_v2.py --timetable writes
+<output>_timetable.bin with the profile's trip window).
+
+Round k of RAPTOR (Delling et al., "Round-Based Public Transit Routing")
+scans every route pattern serving a stop that improved in round k-1, rides
+the earliest catchable trip (binary search, patterns are FIFO) and improves
+arrivals along it; k rounds = k trips = k-1 transfers. After each round
+footpaths are relaxed once from the stops reached by a trip.
+
+- max_transfers limits the rounds
+- min transfer time: after leaving a trip, the next trip must depart at
+  least min_transfer_seconds (or transfer_seconds[stop_id]) later; the
+  origin and footpath arrivals need no extra time
+- footpaths: station pairs within walk_radius_km, walking time as in
+  walk_edges.py (the /api/dostupnost walking model)
+- max_minutes prunes arrivals later than departure + max_minutes
+
+Every label keeps its journey as a chain of leg tuples, so journeys are
+read back without predecessor arrays.
+
+profile() is rRAPTOR: it runs the departures from the origin in a window
+latest first, keeping the per-round labels between runs, and returns the
+Pareto set of (departure, arrival, transfers) per stop.
+
+Usage:
+    python scripts/raptor_router.py data/transit_graph_timetable.bin STOP_ID 07:10 [TARGET_ID]
+    python scripts/raptor_router.py data/transit_graph_timetable.bin STOP_ID 07:00-08:00 TARGET_ID --walk-radius 0.4
+"""
+
+import argparse
+import math
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+
+from timetable_export import Timetable
+from walk_edges import nearby_pairs, walk_minutes
+
+DEFAULT_MAX_TRANSFERS = 5
+# Same as TRANSFER_PENALTY in src/app/api/dostupnost/route.ts
+DEFAULT_MIN_TRANSFER_SECONDS = 120
+
+_UNREACHED = 1 << 62
+
+# Leg tuples: (mode, from_stop, to_stop, departure, arrival, trip, previous leg)
+_TRIP = "trip"
+_WALK = "walk"
+
+
+@dataclass
+class Leg:
+    mode: str           # "trip" or "walk"
+    from_stop: str
+    to_stop: str
+    departure: int      # seconds since midnight
+    arrival: int
+    trip_id: str = ""
+    route: str = ""
+
+
+def build_footpaths(timetable: Timetable, radius_km: float) -> list:
+    """Per stop index [(other stop index, walking seconds)] for stations within radius_km."""
+    coords = {
+        i: (lat, lon)
+        for i, (lat, lon) in enumerate(zip(timetable.stop_lat, timetable.stop_lon))
+        if not (math.isnan(lat) or math.isnan(lon))
+    }
+    footpaths = [[] for _ in timetable.stop_ids]
+    for a, b, distance in nearby_pairs(coords, radius_km):
+        footpaths[a].append((b, round(walk_minutes(distance) * 60)))
+    for paths in footpaths:
+        paths.sort()
+    return footpaths
+
+
+def format_time(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+
+class _Labels:
+    """Best arrival, best arrival by trip and best boarding time per stop.
+
+    A profile query keeps one copy per round k (≤ k trips): a value set in
+    round k is copied into the later rounds, so round k holds the best journey
+    with at most k trips over all departures scanned so far. A single query
+    needs only one copy, shared by all rounds. Footpaths are not transitive,
+    so walking on starts from the best trip arrival, kept apart from arrivals
+    on foot.
+    """
+
+    def __init__(self, n: int, rounds: int, per_round: bool = False):
+        self.rounds = rounds
+        copies = rounds if per_round else 1
+        self.copies = copies
+        self.arrival = [[_UNREACHED] * n for _ in range(copies)]
+        self.arrival_leg = [[None] * n for _ in range(copies)]
+        self.by_trip = [[_UNREACHED] * n for _ in range(copies)]
+        self.ready = [[_UNREACHED] * n for _ in range(copies)]
+        self.ready_leg = [[None] * n for _ in range(copies)]
+        self.trips = [0] * n  # trips of the last copy's arrival
+
+    def slot(self, k: int) -> int:
+        return min(k, self.copies - 1)
+
+    def improve(self, values: list, legs: list | None, k: int, stop: int, value: int, leg) -> bool:
+        """Set value in copies k.. while it is better; False if copy k was not improved."""
+        if value >= values[k][stop]:
+            return False
+        for m in range(k, self.copies):
+            if value >= values[m][stop]:
+                break
+            values[m][stop] = value
+            if legs is not None:
+                legs[m][stop] = leg
+        return True
+
+
+class RaptorResult:
+    """Labels of one earliest-arrival query."""
+
+    def __init__(self, router: "RaptorRouter", departure: int, labels: _Labels, rounds: int):
+        self.router = router
+        self.departure = departure
+        self.labels = labels
+        self.rounds = rounds
+
+    def arrival(self, stop) -> int | None:
+        value = self.labels.arrival[-1][self.router.index(stop)]
+        return value if value != _UNREACHED else None
+
+    def transfers(self, stop) -> int | None:
+        s = self.router.index(stop)
+        if self.labels.arrival[-1][s] == _UNREACHED:
+            return None
+        return max(0, self.labels.trips[s] - 1)
+
+    def reached(self) -> dict:
+        """stop_id → arrival seconds for every reached stop."""
+        stop_ids = self.router.stop_ids
+        return {stop_ids[s]: a for s, a in enumerate(self.labels.arrival[-1]) if a != _UNREACHED}
+
+    def journey(self, stop) -> list | None:
+        """Legs from the origin to a reached stop ([] at the origin), None if unreached."""
+        s = self.router.index(stop)
+        if self.labels.arrival[-1][s] == _UNREACHED:
+            return None
+        return self.router.legs(self.labels.arrival_leg[-1][s])
+
+
+class RaptorRouter:
+    """Route patterns and trip times of a Timetable in flat lists for RAPTOR scans."""
+
+    def __init__(self, timetable: Timetable, walk_radius_km: float | None = None,
+                 min_transfer_seconds: int = DEFAULT_MIN_TRANSFER_SECONDS,
+                 transfer_seconds: dict | None = None):
+        tt = self.timetable = timetable
+        self.stop_ids = tt.stop_ids
+        self.stop_index = tt.stop_index
+        n = len(self.stop_ids)
+
+        self.pattern_stops = [list(tt.pattern_stops(p)) for p in range(tt.num_patterns)]
+        self.pattern_trip_offsets = list(tt.pattern_trip_offsets)
+        self.trip_time_offsets = list(tt.trip_time_offsets)
+        self.arrival = tt.arrival
+        self.departure = tt.departure
+
+        self.stop_patterns = [tt.patterns_at(s) for s in range(n)]
+        self.footpaths = build_footpaths(tt, walk_radius_km) if walk_radius_km else [[] for _ in range(n)]
+        self.transfer_seconds = [min_transfer_seconds] * n
+        for sid, seconds in (transfer_seconds or {}).items():
+            if sid in self.stop_index:
+                self.transfer_seconds[self.stop_index[sid]] = seconds
+
+    @classmethod
+    def load(cls, path: Path, **kwargs) -> "RaptorRouter":
+        return cls(Timetable(path), **kwargs)
+
+    def index(self, stop) -> int:
+        if isinstance(stop, int):
+            return stop
+        if stop not in self.stop_index:
+            raise KeyError(f"unknown stop {stop!r}")
+        return self.stop_index[stop]
+
+    def _origin(self, labels: _Labels, source: int, departure: int, touched: set | None = None) -> dict:
+        """Round 0: the origin and its footpaths; returns stop → (ready, leg) to board from."""
+        marked = {}
+        if labels.improve(labels.ready, labels.ready_leg, 0, source, departure, None):
+            if labels.improve(labels.arrival, labels.arrival_leg, 0, source, departure, None):
+                labels.trips[source] = 0
+            marked[source] = (departure, None)
+        for other, seconds in self.footpaths[source]:
+            t = departure + seconds
+            leg = (_WALK, source, other, departure, t, -1, None)
+            if labels.improve(labels.ready, labels.ready_leg, 0, other, t, leg):
+                marked[other] = (t, leg)
+            last = labels.arrival[-1][other]
+            if labels.improve(labels.arrival, labels.arrival_leg, 0, other, t, leg):
+                if t < last:
+                    labels.trips[other] = 0
+                    if touched is not None:
+                        touched.add(other)
+        return marked
+
+    def _rounds(self, labels: _Labels, marked: dict, limit: int,
+                target: int | None, touched: set | None = None) -> int:
+        """RAPTOR rounds 1.. from the marked stops; returns the rounds run.
+
+        touched collects the stops whose last-round arrival improved.
+        """
+        improve = labels.improve
+        last_arrival, trips = labels.arrival[-1], labels.trips
+        pattern_stops, trip_offsets = self.pattern_stops, self.pattern_trip_offsets
+        time_offsets, arr_times, dep_times = self.trip_time_offsets, self.arrival, self.departure
+        transfer_seconds, footpaths, stop_patterns = self.transfer_seconds, self.footpaths, self.stop_patterns
+
+        rounds = 0
+        for k in range(1, labels.rounds):
+            if not marked:
+                break
+            rounds = k
+            j = labels.slot(k)
+            arrival, by_trip_k, ready = labels.arrival[j], labels.by_trip[j], labels.ready[j]
+            queue = {}
+            for s in marked:
+                for p, pos in stop_patterns[s]:
+                    if pos < queue.get(p, _UNREACHED):
+                        queue[p] = pos
+
+            next_marked = {}
+            by_trip = {}  # stop → (arrival, leg) of its best trip arrival this round
+            for p, start in queue.items():
+                stops = pattern_stops[p]
+                first, end = trip_offsets[p], trip_offsets[p + 1]
+                bound = min(limit, last_arrival[target]) if target is not None else limit
+                trip = -1
+                toff = board_stop = board_dep = 0
+                board_leg = None
+                for i in range(start, len(stops)):
+                    s = stops[i]
+                    if trip >= 0:
+                        arr = arr_times[toff + i]
+                        if arr < by_trip_k[s] and arr < bound:
+                            leg = (_TRIP, board_stop, s, board_dep, arr, trip, board_leg)
+                            improve(labels.by_trip, None, j, s, arr, None)
+                            by_trip[s] = (arr, leg)
+                            if arr < arrival[s]:
+                                last = last_arrival[s]
+                                improve(labels.arrival, labels.arrival_leg, j, s, arr, leg)
+                                if arr < last:
+                                    trips[s] = k
+                                    if touched is not None:
+                                        touched.add(s)
+                            r = arr + transfer_seconds[s]
+                            if r < ready[s]:
+                                improve(labels.ready, labels.ready_leg, j, s, r, leg)
+                                next_marked[s] = (r, leg)
+                    boardable = marked.get(s)
+                    if boardable is None:
+                        continue
+                    r = boardable[0]
+                    if trip < 0:
+                        t = first + bisect_left(range(first, end), r,
+                                                key=lambda t: dep_times[time_offsets[t] + i])
+                        if t == end:
+                            continue
+                    elif r <= dep_times[toff + i]:
+                        # FIFO: an earlier catchable trip precedes the current one
+                        t = trip
+                        while t > first and dep_times[time_offsets[t - 1] + i] >= r:
+                            t -= 1
+                        if t == trip:
+                            continue
+                    else:
+                        continue
+                    trip, toff = t, time_offsets[t]
+                    board_stop, board_dep, board_leg = s, dep_times[toff + i], boardable[1]
+
+            for s, (start_time, leg0) in by_trip.items():
+                for other, seconds in footpaths[s]:
+                    t = start_time + seconds
+                    if t >= limit:
+                        continue
+                    leg = (_WALK, s, other, start_time, t, -1, leg0)
+                    if t < arrival[other]:
+                        last = last_arrival[other]
+                        improve(labels.arrival, labels.arrival_leg, j, other, t, leg)
+                        if t < last:
+                            trips[other] = k
+                            if touched is not None:
+                                touched.add(other)
+                    if t < ready[other]:
+                        improve(labels.ready, labels.ready_leg, j, other, t, leg)
+                        next_marked[other] = (t, leg)
+            marked = next_marked
+        return rounds
+
+    def earliest_arrival(self, source, departure: int, max_transfers: int = DEFAULT_MAX_TRANSFERS,
+                         target=None, max_minutes: float | None = None) -> RaptorResult:
+        """One-to-all (or one-to-one with target pruning) earliest arrival leaving at departure."""
+        s = self.index(source)
+        labels = _Labels(len(self.stop_ids), max_transfers + 2)
+        limit = departure + round(max_minutes * 60) if max_minutes is not None else _UNREACHED
+        marked = self._origin(labels, s, departure)
+        rounds = self._rounds(labels, marked, limit, self.index(target) if target is not None else None)
+        return RaptorResult(self, departure, labels, rounds)
+
+    def origin_departures(self, source: int, window_start: int, window_end: int) -> list:
+        """Distinct departure times from the origin in [window_start, window_end], latest first.
+
+        Trips at footpath neighbours count with the walking time subtracted.
+        """
+        times = set()
+        for stop, offset in [(source, 0)] + self.footpaths[source]:
+            for p, pos in self.stop_patterns[stop]:
+                first, end = self.pattern_trip_offsets[p], self.pattern_trip_offsets[p + 1]
+                key = lambda t: self.departure[self.trip_time_offsets[t] + pos]
+                lo = bisect_left(range(first, end), window_start + offset, key=key)
+                hi = bisect_right(range(first, end), window_end + offset, key=key)
+                times.update(key(first + j) - offset for j in range(lo, hi))
+        return sorted(times, reverse=True)
+
+    def profile(self, source, window_start: int, window_end: int,
+                max_transfers: int = DEFAULT_MAX_TRANSFERS, target=None,
+                max_minutes: float | None = None) -> dict:
+        """rRAPTOR: stop_id → [(departure, arrival, transfers), ...] in the window.
+
+        Entries are ordered by departure and Pareto-optimal: each one arrives
+        earlier than every entry departing after it.
+        """
+        s = self.index(source)
+        t = self.index(target) if target is not None else None
+        labels = _Labels(len(self.stop_ids), max_transfers + 2, per_round=True)
+        entries = {}
+        for departure in self.origin_departures(s, window_start, window_end):
+            limit = departure + round(max_minutes * 60) if max_minutes is not None else _UNREACHED
+            touched = set()
+            marked = self._origin(labels, s, departure, touched)
+            self._rounds(labels, marked, limit, t, touched)
+            for stop in touched if t is None else touched & {t}:
+                entries.setdefault(stop, []).append(
+                    (departure, labels.arrival[-1][stop], max(0, labels.trips[stop] - 1)))
+        return {self.stop_ids[stop]: found[::-1] for stop, found in sorted(entries.items())}
+
+    def _trip_pattern(self, trip: int) -> int:
+        return bisect_right(self.pattern_trip_offsets, trip) - 1
+
+    def legs(self, leg) -> list:
+        """Leg objects of a label's leg chain, origin first."""
+        chain = []
+        while leg is not None:
+            chain.append(leg)
+            leg = leg[6]
+        tt = self.timetable
+        out = []
+        for mode, a, b, dep, arr, trip, _ in reversed(chain):
+            if mode == _TRIP:
+                route = tt.routes[tt.pattern_route[self._trip_pattern(trip)]]
+                out.append(Leg(mode, self.stop_ids[a], self.stop_ids[b], dep, arr, tt.trip_ids[trip], route))
+            else:
+                out.append(Leg(mode, self.stop_ids[a], self.stop_ids[b], dep, arr))
+        return out
+
+
+def _parse_clock(value: str) -> int:
+    hours, _, minutes = value.partition(":")
+    return int(hours) * 3600 + int(minutes or 0) * 60
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAPTOR earliest-arrival queries on a timetable export")
+    parser.add_argument("timetable", type=Path)
+    parser.add_argument("source", help="stop_id")
+    parser.add_argument("departure", help="HH:MM, or HH:MM-HH:MM for a profile query")
+    parser.add_argument("target", nargs="?", help="stop_id (default: one-to-all summary)")
+    parser.add_argument("--max-transfers", type=int, default=DEFAULT_MAX_TRANSFERS)
+    parser.add_argument("--min-transfer", type=int, default=DEFAULT_MIN_TRANSFER_SECONDS, metavar="SECONDS")
+    parser.add_argument("--walk-radius", type=float, metavar="KM", help="footpaths between stations within KM")
+    parser.add_argument("--max-minutes", type=float)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    router = RaptorRouter.load(args.timetable, walk_radius_km=args.walk_radius,
+                               min_transfer_seconds=args.min_transfer)
+    tt = router.timetable
+    print(f"Loaded {len(router.stop_ids)} stops, {tt.num_patterns} patterns, {len(router.trip_time_offsets)} trips "
+          f"in {(time.perf_counter() - t) * 1000:.0f} ms")
+
+    if "-" in args.departure:
+        start, end = (_parse_clock(v) for v in args.departure.split("-", 1))
+        t = time.perf_counter()
+        profile = router.profile(args.source, start, end, args.max_transfers, args.target, args.max_minutes)
+        print(f"Profile {format_time(start)}-{format_time(end)}: {(time.perf_counter() - t) * 1000:.1f} ms, "
+              f"{len(profile)} stops")
+        for dep, arr, transfers in profile.get(args.target, []) if args.target else []:
+            print(f"  {format_time(dep)} → {format_time(arr)}  ({(arr - dep) / 60:.0f} min, {transfers} transfers)")
+        return
+
+    departure = _parse_clock(args.departure)
+    t = time.perf_counter()
+    result = router.earliest_arrival(args.source, departure, args.max_transfers, args.target, args.max_minutes)
+    ms = (time.perf_counter() - t) * 1000
+    reached = result.reached()
+    print(f"Query: {ms:.1f} ms, {result.rounds} rounds, {len(reached)} stops reached")
+
+    if args.target:
+        legs = result.journey(args.target)
+        if legs is None:
+            print(f"{args.target} not reachable")
+            return
+        arrival = result.arrival(args.target)
+        print(f"Arrival {format_time(arrival)} ({(arrival - departure) / 60:.0f} min, "
+              f"{result.transfers(args.target)} transfers)")
+        for leg in legs:
+            what = f"{leg.route} ({leg.trip_id})" if leg.mode == "trip" else "walk"
+            print(f"  {format_time(leg.departure)} {leg.from_stop} → {format_time(leg.arrival)} {leg.to_stop}  {what}")
+    else:
+        for limit in (15, 30, 45, 60, 90):
+            print(f"  ≤{limit:3} min: {sum(1 for a in reached.values() if a - departure <= limit * 60)} stops")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Service calendar: which GTFS service_ids run on which day.
+
+Each service_id is compiled into a day bitset over the feed validity period
+(bit d = start + d days): calendar.txt weekday flags within start_date..end_date,
+then calendar_dates.txt exceptions (1 = added, 2 = removed). Active services
+for a date are one bit test per service, and profile_masks() turns a set of
+graph profiles into a per-service integer mask so trip filtering is a list
+lookup by service index.
+
+Usage:
+    python scripts/service_calendar.py data/GTFS_CR                # validity + services per day
+    python scripts/service_calendar.py data/GTFS_CR 2026-09-01     # services active on a date
+"""
+
+import argparse
+import csv
+from datetime import date, timedelta
+from pathlib import Path
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def parse_gtfs_date(value: str) -> date | None:
+    """Parse GTFS YYYYMMDD (also accepts ISO YYYY-MM-DD)."""
+    value = value.strip().replace("-", "")
+    if len(value) != 8 or not value.isdigit():
+        return None
+    try:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:]))
+    except ValueError:
+        return None
+
+
+class ServiceCalendar:
+    """Day bitsets of all services of one feed."""
+
+    def __init__(self, calendar_rows, exception_rows):
+        """
+        Args:
+            calendar_rows: [(service_id, weekday_mask, start_date, end_date), ...];
+                bit i of weekday_mask = WEEKDAYS[i], dates may be None
+            exception_rows: [(service_id, date, exception_type), ...]
+        """
+        calendar_rows = list(calendar_rows)
+        exception_rows = [row for row in exception_rows if row[1] is not None]
+
+        self.service_ids: list[str] = []
+        self.index: dict[str, int] = {}
+        self.weekdays: list[int] = []  # calendar.txt weekday flags per service
+
+        days = [d for _, _, start, end in calendar_rows for d in (start, end) if d]
+        days += [d for _, d, _ in exception_rows]
+        self.start = min(days) if days else date.today()
+        self.end = max(days) if days else self.start
+        self.num_days = (self.end - self.start).days + 1
+
+        # Bitset of all days that fall on each weekday
+        weekday_bits = [0] * 7
+        for offset in range(self.num_days):
+            weekday_bits[(self.start + timedelta(offset)).weekday()] |= 1 << offset
+
+        self.days: list[int] = []
+        for service_id, weekday_mask, start, end in calendar_rows:
+            idx = self._service(service_id)
+            self.weekdays[idx] = weekday_mask
+            first = (start - self.start).days if start else 0
+            last = (end - self.start).days if end else self.num_days - 1
+            in_range = ((1 << (last + 1)) - 1) & ~((1 << first) - 1)
+            bits = 0
+            for weekday in range(7):
+                if weekday_mask >> weekday & 1:
+                    bits |= weekday_bits[weekday]
+            self.days[idx] = bits & in_range
+
+        for service_id, day, exception_type in exception_rows:
+            idx = self._service(service_id)
+            bit = 1 << (day - self.start).days
+            if exception_type == 1:
+                self.days[idx] |= bit
+            elif exception_type == 2:
+                self.days[idx] &= ~bit
+
+    def _service(self, service_id: str) -> int:
+        idx = self.index.get(service_id)
+        if idx is None:
+            idx = self.index[service_id] = len(self.service_ids)
+            self.service_ids.append(service_id)
+            self.weekdays.append(0)
+            self.days.append(0)
+        return idx
+
+    @classmethod
+    def from_gtfs(cls, gtfs_dir: Path) -> "ServiceCalendar":
+        """Load calendar.txt and (optional) calendar_dates.txt."""
+        calendar_rows = []
+        with open(gtfs_dir / "calendar.txt", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                mask = 0
+                for bit, day in enumerate(WEEKDAYS):
+                    if row.get(day, "0") == "1":
+                        mask |= 1 << bit
+                calendar_rows.append((
+                    row["service_id"].strip(),
+                    mask,
+                    parse_gtfs_date(row.get("start_date", "")),
+                    parse_gtfs_date(row.get("end_date", "")),
+                ))
+
+        exception_rows = []
+        dates_path = gtfs_dir / "calendar_dates.txt"
+        if dates_path.exists():
+            with open(dates_path, encoding="utf-8-sig") as f:
+                for row in csv.DictReader(f):
+                    exception_type = row.get("exception_type", "").strip()
+                    exception_rows.append((
+                        row["service_id"].strip(),
+                        parse_gtfs_date(row.get("date", "")),
+                        int(exception_type) if exception_type.isdigit() else 0,
+                    ))
+
+        return cls(calendar_rows, exception_rows)
+
+    @classmethod
+    def from_cache(cls, cache) -> "ServiceCalendar":
+        """Build from a GTFSCache (gtfs_cache.py); service indices match the cache's."""
+        service_ids = cache.strings("service_ids")
+        starts, ends = cache.array("service_start"), cache.array("service_end")
+        calendar_rows = [
+            (sid, days, parse_gtfs_date(str(start)), parse_gtfs_date(str(end)))
+            for sid, days, start, end in zip(service_ids, cache.array("service_weekdays"), starts, ends)
+        ]
+        exception_rows = [
+            (service_ids[sid], parse_gtfs_date(str(day)), exception_type)
+            for sid, day, exception_type in zip(
+                cache.array("cd_service"), cache.array("cd_date"), cache.array("cd_type")
+            )
+        ]
+        return cls(calendar_rows, exception_rows)
+
+    def covers(self, day: date) -> bool:
+        return self.start <= day <= self.end
+
+    def is_active(self, service_id: str, day: date) -> bool:
+        idx = self.index.get(service_id)
+        if idx is None or not self.covers(day):
+            return False
+        return bool(self.days[idx] >> (day - self.start).days & 1)
+
+    def active_mask(self, day: date) -> int:
+        """Bit i set when service i (self.service_ids[i]) runs on day."""
+        if not self.covers(day):
+            return 0
+        offset = (day - self.start).days
+        mask = 0
+        for idx, bits in enumerate(self.days):
+            if bits >> offset & 1:
+                mask |= 1 << idx
+        return mask
+
+    def active_services(self, day: date) -> list[str]:
+        mask = self.active_mask(day)
+        return [sid for idx, sid in enumerate(self.service_ids) if mask >> idx & 1]
+
+    def profile_masks(self, profiles) -> list[int]:
+        """Per service index: bit i set when the service runs for profiles[i].
+
+        Profiles with a date use the compiled calendar (validity + exceptions);
+        profiles without one use the plain calendar.txt weekday flag.
+        """
+        masks = [0] * len(self.service_ids)
+        for i, profile in enumerate(profiles):
+            if profile.service_date is not None:
+                if not self.covers(profile.service_date):
+                    continue
+                offset = (profile.service_date - self.start).days
+                for idx, bits in enumerate(self.days):
+                    if bits >> offset & 1:
+                        masks[idx] |= 1 << i
+            else:
+                weekday_bit = 1 << WEEKDAYS.index(profile.weekday)
+                for idx, weekday_mask in enumerate(self.weekdays):
+                    if weekday_mask & weekday_bit:
+                        masks[idx] |= 1 << i
+        return masks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the service calendar of a GTFS feed")
+    parser.add_argument("gtfs_dir", type=Path)
+    parser.add_argument("date", nargs="?", help="YYYY-MM-DD or YYYYMMDD")
+    args = parser.parse_args()
+
+    calendar = ServiceCalendar.from_gtfs(args.gtfs_dir)
+    print(f"Validity: {calendar.start} .. {calendar.end} ({calendar.num_days} days), "
+          f"{len(calendar.service_ids)} services")
+
+    if args.date:
+        day = parse_gtfs_date(args.date)
+        if day is None:
+            parser.error(f"invalid date: {args.date}")
+        active = calendar.active_services(day)
+        print(f"{day} ({WEEKDAYS[day.weekday()]}): {len(active)} active services")
+        for sid in active[:50]:
+            print(f"  {sid}")
+        if len(active) > 50:
+            print(f"  ... {len(active) - 50} more")
+        return
+
+    for offset in range(min(calendar.num_days, 14)):
+        day = calendar.start + timedelta(offset)
+        print(f"  {day} {WEEKDAYS[day.weekday()]:<9} {bin(calendar.active_mask(day)).count('1')} services")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Clustering of standalone GTFS stops into synthetic parent stations.
+
+Stops without parent_station are their own parent in the builder (Step 4), so
+one physical stop often appears as several graph nodes: one per platform or
+direction, or one per source feed (CISJR / CRZ / PID). Standalone stops with
+the same normalized name (stop_matcher.fold_name) within radius_km of each
+other (transitively) form a cluster with the synthetic parent ID
+"<id1>|<id2>|..." (sorted member IDs, the format school_locations.json uses
+for merged stops), the most common member name and the mean position. Edges
+of the members merge because they are keyed by parent.
+
+A standalone stop is a parent that no other stop refers to; parent stations
+with platforms are kept as they are.
+
+Across feeds of a multi-feed build (namespaced "FEED:stop_id"), every parent
+is deduplicated the same way, except that a cluster holds at most one parent
+per feed: same-name pairs are linked closest first, and a link that would put
+two parents of one feed together is skipped (stops of one feed are merged only
+by --cluster-stops).
+"""
+
+from collections import Counter, defaultdict
+
+from stop_matcher import fold_name
+from walk_edges import nearby_pairs
+
+DEFAULT_CLUSTER_RADIUS_KM = 0.3
+
+
+def standalone_stops(stop_parent: dict, parent_info: dict) -> list:
+    """Parents in parent_info that are their own only member."""
+    members = Counter(stop_parent.values())
+    return [sid for sid in parent_info if members[sid] <= 1]
+
+
+def feed_of(stop_id: str) -> str:
+    """Namespace of a "FEED:stop_id" parent (synthetic parents: of the first member)."""
+    return stop_id.split(":", 1)[0]
+
+
+def _cluster(candidates: list, parent_info: dict, radius_km: float, exclusive=None) -> dict:
+    """member → synthetic parent ID.
+
+    With exclusive (stop_id → key), a cluster holds at most one stop per key;
+    pairs are then linked in order of distance.
+    """
+    names = {sid: fold_name(parent_info[sid][0]) for sid in candidates}
+    coords = {sid: parent_info[sid][1:] for sid in candidates}
+
+    root = {sid: sid for sid in candidates}
+    keys = {sid: {exclusive(sid)} for sid in candidates} if exclusive else None
+
+    def find(x):
+        while root[x] != x:
+            root[x] = root[root[x]]
+            x = root[x]
+        return x
+
+    pairs = [(a, b, d) for a, b, d in nearby_pairs(coords, radius_km)
+             if a < b and names[a] and names[a] == names[b]]
+    if exclusive:
+        pairs.sort(key=lambda pair: (pair[2], pair[0], pair[1]))
+    for a, b, _ in pairs:
+        ra, rb = find(a), find(b)
+        if ra == rb or (keys is not None and keys[ra] & keys[rb]):
+            continue
+        low, high = min(ra, rb), max(ra, rb)
+        root[high] = low
+        if keys is not None:
+            keys[low] |= keys.pop(high)
+
+    groups = defaultdict(list)
+    for sid in candidates:
+        groups[find(sid)].append(sid)
+
+    clusters = {}
+    for members in groups.values():
+        if len(members) > 1:
+            cluster_id = "|".join(sorted(members))
+            for sid in members:
+                clusters[sid] = cluster_id
+    return clusters
+
+
+def cluster_standalone_stops(stop_parent: dict, parent_info: dict,
+                             radius_km: float = DEFAULT_CLUSTER_RADIUS_KM) -> dict:
+    """member stop_id → synthetic parent ID for every cluster of 2+ standalone stops."""
+    return _cluster(standalone_stops(stop_parent, parent_info), parent_info, radius_km)
+
+
+def cluster_feed_duplicates(parent_info: dict, radius_km: float = DEFAULT_CLUSTER_RADIUS_KM) -> dict:
+    """member → synthetic parent ID for same-name parents of different feeds within radius_km.
+
+    Each cluster holds at most one parent per feed.
+    """
+    return _cluster(list(parent_info), parent_info, radius_km, exclusive=feed_of)
+
+
+def remap_parents(stop_parent: dict, clusters: dict):
+    """Point stop_parent values at the synthetic parents (in place)."""
+    for key, parent in stop_parent.items():
+        if parent in clusters:
+            stop_parent[key] = clusters[parent]
+
+
+def merge_parent_info(parent_info: dict, clusters: dict) -> int:
+    """Replace cluster members in parent_info by their synthetic parent (in place).
+
+    Returns the number of synthetic parents.
+    """
+    members = defaultdict(list)
+    for sid, cluster_id in clusters.items():
+        members[cluster_id].append(parent_info.pop(sid))
+    for cluster_id, infos in sorted(members.items()):
+        name = Counter(name for name, _, _ in infos).most_common(1)[0][0]
+        parent_info[cluster_id] = (
+            name,
+            sum(lat for _, lat, _ in infos) / len(infos),
+            sum(lon for _, _, lon in infos) / len(infos),
+        )
+    return len(members)
+
+
+def apply_clusters(stop_parent: dict, parent_info: dict, clusters: dict) -> int:
+    """remap_parents + merge_parent_info; returns the number of synthetic parents."""
+    remap_parents(stop_parent, clusters)
+    return merge_parent_info(parent_info, clusters)
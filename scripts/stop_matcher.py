@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Indexované párování názvů zastávek.
+
+Každý název se normalizuje jen jednou (malá písmena, bez diakritiky) a vloží
+do invertovaného indexu trigramů. Dotaz pak místo porovnání se všemi
+zastávkami ověří jen kandidáty sdílející všechny trigramy dotazu.
+
+Použití:
+    matcher = StopNameMatcher({'U1': 'Pardubice,Hlavní nádraží', ...})
+    matcher.best_match('Hlavní nádraží')   # -> ('U1', 0.58)
+"""
+
+import unicodedata
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def fold_name(name: str) -> str:
+    """Normalizuj název: malá písmena, bez diakritiky, jednoduché mezery."""
+    decomposed = unicodedata.normalize('NFKD', name.lower())
+    folded = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(folded.split())
+
+
+def _ngrams(text: str, n: int) -> set:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class StopNameMatcher:
+    """
+    Párování názvů zastávek přes invertovaný index n-gramů.
+
+    Skóre shody (0-1):
+        1.0 = shodný normalizovaný název
+        len(kratší) / len(delší) = jeden název je podřetězcem druhého
+        0.0 = bez shody
+    Při shodném skóre vyhrává zastávka vložená dříve.
+    """
+
+    def __init__(self, stops: Dict[str, str],
+                 normalize: Callable[[str], str] = fold_name, ngram: int = 3):
+        """
+        Args:
+            stops: Dict[stop_id, stop_name]
+            normalize: Normalizační funkce aplikovaná na obě strany
+            ngram: Délka n-gramu v indexu
+        """
+        self.normalize = normalize
+        self.ngram = ngram
+
+        self.stop_ids: List[str] = []
+        self.names: List[str] = []
+        self.by_name: Dict[str, List[int]] = defaultdict(list)
+        self.index: Dict[str, List[int]] = defaultdict(list)
+
+        for stop_id, stop_name in stops.items():
+            idx = len(self.stop_ids)
+            normalized = normalize(stop_name)
+            self.stop_ids.append(stop_id)
+            self.names.append(normalized)
+            self.by_name[normalized].append(idx)
+            for gram in _ngrams(normalized, ngram):
+                self.index[gram].append(idx)
+
+        # Délky názvů pro hledání "GTFS název je podřetězcem dotazu"
+        self.name_lengths = sorted({len(n) for n in self.by_name if n})
+
+    @staticmethod
+    def score(query: str, candidate: str) -> float:
+        """Skóre dvou už normalizovaných názvů."""
+        if not query or not candidate:
+            return 0.0
+        if query == candidate:
+            return 1.0
+        if query in candidate or candidate in query:
+            return min(len(query), len(candidate)) / max(len(query), len(candidate))
+        return 0.0
+
+    def _containing(self, query: str) -> Iterable[int]:
+        """Indexy názvů, které obsahují dotaz jako podřetězec."""
+        grams = _ngrams(query, self.ngram)
+        if not grams:
+            # Příliš krátký dotaz pro index — lineární průchod předpočítaných názvů
+            return (i for i, name in enumerate(self.names) if query in name)
+
+        postings = sorted((self.index.get(g, ()) for g in grams), key=len)
+        if not postings[0]:
+            return ()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return ()
+        return (i for i in candidates if query in self.names[i])
+
+    def _contained(self, query: str) -> Iterable[int]:
+        """Indexy názvů, které jsou podřetězcem dotazu."""
+        for length in self.name_lengths:
+            if length > len(query):
+                break
+            for start in range(len(query) - length + 1):
+                hits = self.by_name.get(query[start:start + length])
+                if hits:
+                    yield from hits
+
+    def candidates(self, name: str) -> List[Tuple[str, float]]:
+        """Vrať všechny shody [(stop_id, skóre), ...] seřazené od nejlepší."""
+        query = self.normalize(name)
+        if not query:
+            return []
+
+        scored = {}
+        for idx in (*self._containing(query), *self._contained(query)):
+            if idx not in scored:
+                scored[idx] = self.score(query, self.names[idx])
+
+        ranked = sorted(scored.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.stop_ids[idx], s) for idx, s in ranked if s > 0]
+
+    def best_match(self, name: str, min_score: float = 0.0) -> Optional[Tuple[str, float]]:
+        """Vrať nejlepší shodu (stop_id, skóre) nebo None."""
+        ranked = self.candidates(name)
+        if ranked and ranked[0][1] > min_score:
+            return ranked[0]
+        return None
+
+    def match_all(self, names: List[str], min_score: float = 0.0) -> Dict[int, str]:
+        """Namapuj index názvu -> stop_id nejlepší shody."""
+        mapping = {}
+        for idx, name in enumerate(names):
+            best = self.best_match(name, min_score)
+            if best:
+                mapping[idx] = best[0]
+        return mapping
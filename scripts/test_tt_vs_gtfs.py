@@ -5,10 +5,14 @@ Ověřuje správnost dekódovaných cestovních časů.
 """
 
 import json
+import sys
 from pathlib import Path
 import csv
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from stop_matcher import StopNameMatcher, fold_name
 
 
 def load_tt_data(json_file: Path) -> Dict:
@@ -17,9 +21,24 @@ def load_tt_data(json_file: Path) -> Dict:
         return json.load(f)
 
 
-def load_gtfs_stop_times(gtfs_dir: Path, route_filter=None) -> Dict[Tuple[str, str], List[int]]:
+def parse_time_minutes(time_str: str) -> Optional[int]:
+    """Parsuj HH:MM:SS na minuty od půlnoci (sekundy se zahazují)."""
+    try:
+        return int(time_str[:-6]) * 60 + int(time_str[-5:-3])
+    except ValueError:
+        return None
+
+
+def load_gtfs_stop_times(gtfs_dir: Path, stop_ids: Optional[Set[str]] = None) -> Dict[Tuple[str, str], List[int]]:
     """
-    Načti stop_times.txt z GTFS a vypočti cestovní časy mezi zastávkami.
+    Streamuj stop_times.txt z GTFS a vypočti cestovní časy mezi zastávkami.
+
+    Řádky se čtou v pořadí souboru (spoje po sobě, zastávky podle stop_sequence),
+    hrany se agregují průběžně a nic se nedrží pro celý spoj.
+
+    Args:
+        stop_ids: Jen hrany mezi těmito GTFS zastávkami (zastávky namapované
+            pro aktuální město). None = všechny zastávky.
 
     Returns:
         Dict[(from_stop, to_stop), [travel_times_in_minutes]]
@@ -30,49 +49,54 @@ def load_gtfs_stop_times(gtfs_dir: Path, route_filter=None) -> Dict[Tuple[str, s
         print(f"❌ Nenalezen {stop_times_file}")
         return {}
 
-    # Načti všechny stop_times
-    trip_stops = defaultdict(list)  # trip_id -> [(stop_id, arrival_time), ...]
+    travel_times = defaultdict(list)
+    minutes_cache: Dict[str, Optional[int]] = {}
 
-    print(f"📖 Načítám {stop_times_file}...")
+    print(f"📖 Streamuji {stop_times_file}...")
 
-    with open(stop_times_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+    trips_seen = 0
+    with open(stop_times_file, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader)]
+        i_trip = header.index('trip_id')
+        i_stop = header.index('stop_id')
+        i_arr = header.index('arrival_time')
+
+        current_trip = None
+        prev_stop = None  # Předchozí zastávka spoje, pokud je ve filtru
+        prev_time = None
 
         for row in reader:
-            trip_id = row['trip_id']
-            stop_id = row['stop_id']
-            arrival_time = row['arrival_time']
-
-            # Parsuj čas (HH:MM:SS)
-            try:
-                h, m, s = map(int, arrival_time.split(':'))
-                minutes = h * 60 + m
-                trip_stops[trip_id].append((stop_id, minutes))
-            except:
+            trip_id = row[i_trip]
+            if trip_id != current_trip:
+                current_trip = trip_id
+                prev_stop = None
+                trips_seen += 1
+
+            stop_id = row[i_stop]
+            if stop_ids is not None and stop_id not in stop_ids:
+                prev_stop = None
                 continue
 
-    print(f"✓ Načteno {len(trip_stops)} spojů")
-
-    # Vypočti cestovní časy mezi zastávkami
-    travel_times = defaultdict(list)
+            arrival = row[i_arr]
+            minutes = minutes_cache.get(arrival)
+            if minutes is None:
+                minutes = parse_time_minutes(arrival)
+                if minutes is None:
+                    continue
+                minutes_cache[arrival] = minutes
 
-    for trip_id, stops in trip_stops.items():
-        # Seřaď podle pořadí
-        stops.sort(key=lambda x: x[1])  # Seřaď podle času
+            if prev_stop is not None:
+                travel_time = minutes - prev_time
 
-        for i in range(len(stops) - 1):
-            from_stop, from_time = stops[i]
-            to_stop, to_time = stops[i + 1]
+                # Validace
+                if 0 <= travel_time <= 120:
+                    travel_times[(prev_stop, stop_id)].append(travel_time)
 
-            travel_time = to_time - from_time
-
-            # Validace
-            if travel_time < 0 or travel_time > 120:
-                continue
-
-            edge = (from_stop, to_stop)
-            travel_times[edge].append(travel_time)
+            prev_stop = stop_id
+            prev_time = minutes
 
+    print(f"✓ Prošlo {trips_seen} spojů")
     print(f"✓ Vypočteno {len(travel_times)} unikátních hran")
 
     return dict(travel_times)
@@ -83,55 +107,28 @@ def normalize_stop_name(name: str) -> str:
     name = name.lower()
     name = name.replace('brandýs nad labem-stará boleslav,', '')
     name = name.replace('brandýs n.l.-st.bol.,', '')
-    name = name.strip()
-
-    # Odstraň diakritiku (zjednodušeno)
-    replacements = {
-        'á': 'a', 'č': 'c', 'ď': 'd', 'é': 'e', 'ě': 'e',
-        'í': 'i', 'ň': 'n', 'ó': 'o', 'ř': 'r', 'š': 's',
-        'ť': 't', 'ú': 'u', 'ů': 'u', 'ý': 'y', 'ž': 'z'
-    }
-
-    for old, new in replacements.items():
-        name = name.replace(old, new)
 
-    return name
+    # Odstraň diakritiku
+    return fold_name(name)
 
 
-def match_stops(tt_stops: List[str], gtfs_stops: Dict[str, str]) -> Dict[int, str]:
+def match_stops(tt_stops: List[str], gtfs_stops: Dict[str, str],
+                matcher: Optional[StopNameMatcher] = None) -> Dict[int, str]:
     """
     Namapuj TT stop_idx -> GTFS stop_id.
 
     Args:
         tt_stops: List názvů zastávek z TT
         gtfs_stops: Dict[stop_id, stop_name] z GTFS
+        matcher: Předpřipravený index GTFS zastávek (pro opakované volání)
 
     Returns:
         Dict[tt_stop_idx, gtfs_stop_id]
     """
-    mapping = {}
-
-    for tt_idx, tt_name in enumerate(tt_stops):
-        tt_normalized = normalize_stop_name(tt_name)
-
-        # Hledej nejlepší match v GTFS
-        best_match = None
-        best_score = 0
-
-        for gtfs_id, gtfs_name in gtfs_stops.items():
-            gtfs_normalized = normalize_stop_name(gtfs_name)
-
-            # Jednoduchý match: substring
-            if tt_normalized in gtfs_normalized or gtfs_normalized in tt_normalized:
-                score = len(tt_normalized)
-                if score > best_score:
-                    best_score = score
-                    best_match = gtfs_id
-
-        if best_match:
-            mapping[tt_idx] = best_match
+    if matcher is None:
+        matcher = StopNameMatcher(gtfs_stops, normalize=normalize_stop_name)
 
-    return mapping
+    return matcher.match_all(tt_stops)
 
 
 def load_gtfs_stops(gtfs_dir: Path) -> Dict[str, str]:
@@ -147,37 +144,14 @@ def load_gtfs_stops(gtfs_dir: Path) -> Dict[str, str]:
     return stops
 
 
-def compare_tt_vs_gtfs(tt_json: Path, gtfs_dir: Path):
-    """Porovnej TT dekódovaná data s GTFS."""
-    print(f"\n{'='*80}")
-    print(f"TEST: {tt_json.stem}")
-    print(f"{'='*80}\n")
-
-    # Načti TT data
-    tt_data = load_tt_data(tt_json)
-    tt_stops = tt_data['stops']
-    tt_edges = tt_data['edges']
-
-    print(f"📊 TT data:")
-    print(f"  Zastávky: {len(tt_stops)}")
-    print(f"  Hrany: {len(tt_edges)}")
-
-    # Načti GTFS data
-    gtfs_stops = load_gtfs_stops(gtfs_dir)
-    gtfs_travel_times = load_gtfs_stop_times(gtfs_dir)
-
-    print(f"\n📊 GTFS data:")
-    print(f"  Zastávky: {len(gtfs_stops)}")
-    print(f"  Hrany: {len(gtfs_travel_times)}")
-
-    # Namapuj zastávky
-    print(f"\n🔗 Mapování zastávek...")
-    stop_mapping = match_stops(tt_stops, gtfs_stops)
-    print(f"  Namapováno: {len(stop_mapping)}/{len(tt_stops)} zastávek")
-
-    # Porovnej hrany
-    print(f"\n⚖️  Porovnání cestovních časů:")
+def compare_edges(tt_edges: Dict, stop_mapping: Dict[int, str],
+                  gtfs_travel_times: Dict[Tuple[str, str], List[int]]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Porovnej cestovní časy TT hran s GTFS hranami.
 
+    Returns:
+        (shody, neshody) — seznamy záznamů {from, to, tt_time, gtfs_time, diff, match}
+    """
     matches = []
     mismatches = []
 
@@ -218,6 +192,44 @@ def compare_tt_vs_gtfs(tt_json: Path, gtfs_dir: Path):
         else:
             mismatches.append(match_data)
 
+    return matches, mismatches
+
+
+def compare_tt_vs_gtfs(tt_json: Path, gtfs_dir: Path):
+    """Porovnej TT dekódovaná data s GTFS."""
+    print(f"\n{'='*80}")
+    print(f"TEST: {tt_json.stem}")
+    print(f"{'='*80}\n")
+
+    # Načti TT data
+    tt_data = load_tt_data(tt_json)
+    tt_stops = tt_data['stops']
+    tt_edges = tt_data['edges']
+
+    print(f"📊 TT data:")
+    print(f"  Zastávky: {len(tt_stops)}")
+    print(f"  Hrany: {len(tt_edges)}")
+
+    # Načti GTFS zastávky
+    gtfs_stops = load_gtfs_stops(gtfs_dir)
+
+    # Namapuj zastávky
+    print(f"\n🔗 Mapování zastávek...")
+    stop_mapping = match_stops(tt_stops, gtfs_stops)
+    print(f"  Namapováno: {len(stop_mapping)}/{len(tt_stops)} zastávek")
+
+    # Streamuj jen spoje přes namapované zastávky
+    gtfs_travel_times = load_gtfs_stop_times(gtfs_dir, set(stop_mapping.values()))
+
+    print(f"\n📊 GTFS data:")
+    print(f"  Zastávky: {len(gtfs_stops)}")
+    print(f"  Hrany (mezi namapovanými zastávkami): {len(gtfs_travel_times)}")
+
+    # Porovnej hrany
+    print(f"\n⚖️  Porovnání cestovních časů:")
+
+    matches, mismatches = compare_edges(tt_edges, stop_mapping, gtfs_travel_times)
+
     # Výsledky
     total = len(matches) + len(mismatches)
 
@@ -246,8 +258,6 @@ def compare_tt_vs_gtfs(tt_json: Path, gtfs_dir: Path):
 
 
 def main():
-    import sys
-
     if len(sys.argv) < 2:
         print("Usage: python test_tt_vs_gtfs.py <tt_file.json>")
         print("Example: python test_tt_vs_gtfs.py data/decoded_tt_v2/Brandys.json")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""Timetable export (route patterns + trip times) for schedule-based routing.
+
+Input are the trips accepted by one graph profile, as parent-station stop
+sequences with arrival/departure seconds. Trips of one route with the same
+stop sequence form a pattern; a pattern is further split so that its trips
+never overtake each other (FIFO), which lets a RAPTOR router pick the earliest
+catchable trip by binary search.
+
+Binary layout (transit_graph_binary container, magic b"SSKTTBL\\0"):
+    stop_id_*, stop_name_*            string tables (parent stations)
+    stop_lat, stop_lon                float64, NaN = unknown
+    route_*                           route_short string table
+    trip_id_*                         string table, trips ordered by pattern, then departure
+    pattern_route                     uint16 route index per pattern
+    pattern_stop_offsets, pattern_stops
+                                      stops of pattern p = pattern_stops[off[p]:off[p+1]]
+    pattern_trip_offsets              trips of pattern p = [off[p], off[p+1]), sorted by departure
+    trip_time_offsets                 times of trip t start at off[t] (one entry per pattern stop)
+    arrival, departure                int32 seconds since midnight
+    stop_pattern_offsets, stop_patterns, stop_pattern_positions
+                                      patterns serving stop s and the stop's position in them
+"""
+
+import math
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+from transit_graph_binary import BinaryContainer, _string_table, write_container
+
+TIMETABLE_MAGIC = b"SSKTTBL\0"
+TIMETABLE_VERSION = 1
+
+
+def timetable_stops(stops_list: list, stop_parent: dict) -> list:
+    """[(parent, arrival, departure), ...] of one trip.
+
+    Stops without any time are dropped, a missing arrival/departure is taken
+    from the other one, and consecutive stops in the same parent station are
+    merged (arrival of the first, departure of the last).
+    """
+    out = []
+    for sid, arr, dep in stops_list:
+        if arr is None and dep is None:
+            continue
+        if arr is None:
+            arr = dep
+        elif dep is None:
+            dep = arr
+        parent = stop_parent.get(sid, sid)
+        if out and out[-1][0] == parent:
+            out[-1] = (parent, out[-1][1], dep)
+        else:
+            out.append((parent, arr, dep))
+    return out
+
+
+def _dominates(earlier: list, later: list) -> bool:
+    """True if trip `later` never arrives/departs before trip `earlier` at any stop."""
+    return all(a[1] <= b[1] and a[2] <= b[2] for a, b in zip(earlier, later))
+
+
+def build_patterns(trips: list) -> list:
+    """Group trips into FIFO patterns.
+
+    trips: [(trip_id, route_short, [(stop, arrival, departure), ...]), ...]
+    Returns [(route_short, stop_tuple, [(trip_id, times), ...]), ...] with trips
+    sorted by first departure and no overtaking inside a pattern.
+    """
+    groups = defaultdict(list)
+    for trip_id, route_short, stops in trips:
+        if len(stops) < 2:
+            continue
+        groups[(route_short, tuple(s for s, _, _ in stops))].append((trip_id, stops))
+
+    patterns = []
+    for (route_short, stop_seq), group in sorted(groups.items()):
+        group.sort(key=lambda item: (item[1][0][2], item[0]))
+        fifo = []  # [[(trip_id, times), ...], ...]
+        for trip in group:
+            for pattern_trips in fifo:
+                if _dominates(pattern_trips[-1][1], trip[1]):
+                    pattern_trips.append(trip)
+                    break
+            else:
+                fifo.append([trip])
+        for pattern_trips in fifo:
+            patterns.append((route_short, stop_seq, pattern_trips))
+    return patterns
+
+
+def write_timetable(trips: list, parent_info: dict, path: Path, meta: dict | None = None) -> dict:
+    """Write the timetable of accepted trips; returns summary counts."""
+    patterns = build_patterns(trips)
+
+    stop_ids = sorted({s for _, stop_seq, _ in patterns for s in stop_seq})
+    stop_index = {sid: i for i, sid in enumerate(stop_ids)}
+    routes = sorted({route for route, _, _ in patterns})
+    route_index = {r: i for i, r in enumerate(routes)}
+    if len(routes) > 0xFFFF:
+        raise ValueError(f"{len(routes)} routes do not fit uint16 route indices")
+
+    names, lat, lon = [], array("d"), array("d")
+    for sid in stop_ids:
+        name, stop_lat, stop_lon = parent_info.get(sid, ("", math.nan, math.nan))
+        names.append(name)
+        lat.append(stop_lat)
+        lon.append(stop_lon)
+
+    pattern_route = array("H")
+    pattern_stop_offsets, pattern_stops = array("I", [0]), array("I")
+    pattern_trip_offsets, trip_time_offsets = array("I", [0]), array("I", [0])
+    arrival, departure = array("i"), array("i")
+    trip_ids = []
+    stop_patterns = defaultdict(list)
+
+    for p, (route_short, stop_seq, pattern_trips) in enumerate(patterns):
+        pattern_route.append(route_index[route_short])
+        for position, sid in enumerate(stop_seq):
+            pattern_stops.append(stop_index[sid])
+            stop_patterns[stop_index[sid]].append((p, position))
+        pattern_stop_offsets.append(len(pattern_stops))
+        for trip_id, times in pattern_trips:
+            trip_ids.append(trip_id)
+            arrival.extend(arr for _, arr, _ in times)
+            departure.extend(dep for _, _, dep in times)
+            trip_time_offsets.append(len(arrival))
+        pattern_trip_offsets.append(len(trip_ids))
+
+    stop_pattern_offsets, stop_pattern_list, stop_pattern_positions = array("I", [0]), array("I"), array("H")
+    for s in range(len(stop_ids)):
+        for p, position in stop_patterns.get(s, ()):
+            stop_pattern_list.append(p)
+            stop_pattern_positions.append(position)
+        stop_pattern_offsets.append(len(stop_pattern_list))
+
+    stop_id_blob, stop_id_offsets = _string_table(stop_ids)
+    stop_name_blob, stop_name_offsets = _string_table(names)
+    route_blob, route_offsets = _string_table(routes)
+    trip_id_blob, trip_id_offsets = _string_table(trip_ids)
+
+    summary = {"stops": len(stop_ids), "routes": len(routes), "patterns": len(patterns),
+               "trips": len(trip_ids), "stop_times": len(arrival)}
+    write_container(path, TIMETABLE_MAGIC, TIMETABLE_VERSION, {
+        "stop_id_blob": stop_id_blob,
+        "stop_id_offsets": stop_id_offsets,
+        "stop_name_blob": stop_name_blob,
+        "stop_name_offsets": stop_name_offsets,
+        "stop_lat": lat,
+        "stop_lon": lon,
+        "route_blob": route_blob,
+        "route_offsets": route_offsets,
+        "trip_id_blob": trip_id_blob,
+        "trip_id_offsets": trip_id_offsets,
+        "pattern_route": pattern_route,
+        "pattern_stop_offsets": pattern_stop_offsets,
+        "pattern_stops": pattern_stops,
+        "pattern_trip_offsets": pattern_trip_offsets,
+        "trip_time_offsets": trip_time_offsets,
+        "arrival": arrival,
+        "departure": departure,
+        "stop_pattern_offsets": stop_pattern_offsets,
+        "stop_patterns": stop_pattern_list,
+        "stop_pattern_positions": stop_pattern_positions,
+    }, meta={**(meta or {}), **summary})
+    return summary
+
+
+class Timetable:
+    """Memory-mapped timetable; trip and stop indices refer to the string tables."""
+
+    def __init__(self, path: Path):
+        self.container = c = BinaryContainer(path, TIMETABLE_MAGIC, TIMETABLE_VERSION)
+        self.meta = c.meta
+        self.stop_ids = c.strings("stop_id")
+        self.stop_names = c.strings("stop_name")
+        self.routes = c.strings("route")
+        self.stop_index = {sid: i for i, sid in enumerate(self.stop_ids)}
+        self.stop_lat = c.section("stop_lat")
+        self.stop_lon = c.section("stop_lon")
+        self.pattern_route = c.section("pattern_route")
+        self.pattern_stop_offsets = c.section("pattern_stop_offsets")
+        self.pattern_stops_flat = c.section("pattern_stops")
+        self.pattern_trip_offsets = c.section("pattern_trip_offsets")
+        self.trip_time_offsets = c.section("trip_time_offsets")
+        self.arrival = c.section("arrival")
+        self.departure = c.section("departure")
+        self.stop_pattern_offsets = c.section("stop_pattern_offsets")
+        self.stop_patterns_flat = c.section("stop_patterns")
+        self.stop_pattern_positions = c.section("stop_pattern_positions")
+        self._trip_ids = None
+
+    @property
+    def num_patterns(self) -> int:
+        return len(self.pattern_route)
+
+    @property
+    def trip_ids(self) -> list[str]:
+        if self._trip_ids is None:
+            self._trip_ids = self.container.strings("trip_id")
+        return self._trip_ids
+
+    def pattern_stops(self, pattern: int):
+        return self.pattern_stops_flat[self.pattern_stop_offsets[pattern]:self.pattern_stop_offsets[pattern + 1]]
+
+    def pattern_trips(self, pattern: int) -> range:
+        return range(self.pattern_trip_offsets[pattern], self.pattern_trip_offsets[pattern + 1])
+
+    def patterns_at(self, stop: int) -> list[tuple[int, int]]:
+        """[(pattern, position), ...] of patterns serving a stop index."""
+        lo, hi = self.stop_pattern_offsets[stop], self.stop_pattern_offsets[stop + 1]
+        return list(zip(self.stop_patterns_flat[lo:hi], self.stop_pattern_positions[lo:hi]))
+
+    def arrival_at(self, trip: int, position: int) -> int:
+        return self.arrival[self.trip_time_offsets[trip] + position]
+
+    def departure_at(self, trip: int, position: int) -> int:
+        return self.departure[self.trip_time_offsets[trip] + position]
+
+    def earliest_trip(self, pattern: int, position: int, time: int) -> int | None:
+        """First trip of the pattern departing at `position` no earlier than time (FIFO)."""
+        trips = self.pattern_trips(pattern)
+        i = bisect_left(trips, time, key=lambda t: self.departure_at(t, position))
+        return trips[i] if i < len(trips) else None
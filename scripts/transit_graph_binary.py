@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""Compact binary (CSR) form of transit_graph.json.
+
+Container layout (little-endian):
+    magic     8 bytes   b"SSKGRAF\\0" (or another format's magic)
+    version   uint16
+    reserved  uint16
+    dir_len   uint32    length of the JSON directory that follows
+    directory JSON      {"meta": {...}, "sections": {name: [typecode, offset, count]}}
+    sections            raw array data, each aligned to 8 bytes
+
+Graph sections:
+    stop_id_blob/stop_id_offsets       UTF-8 string table (stop i = blob[off[i]:off[i+1]])
+    stop_name_blob/stop_name_offsets
+    stop_lat, stop_lon                 float64
+    stop_flags                         uint8, bit 0 = stop has [name, lat, lon] in "stops"
+    edge_offsets                       uint32 CSR row offsets (n_stops + 1)
+    edge_dest                          uint32 destination stop index
+    edge_weight                        uint16 travel time in deciminutes (0.1 min)
+    route_blob/route_offsets           route_short string table
+    edge_route_offsets, edge_routes    routes of edge e = edge_routes[off[e]:off[e+1]]
+    route_headway                      uint16 headway in deciminutes, 0xFFFF = none
+                                       (version 1: 0 = none)
+
+Sections are memory-mapped and cast in place, so loading does not parse or
+copy the edge arrays. The same container is reused by other binary outputs
+(timetable export) with their own magic.
+
+Usage:
+    python scripts/transit_graph_binary.py data/transit_graph.json          # writes .bin next to it
+    python scripts/transit_graph_binary.py data/transit_graph.bin --check   # round-trip vs JSON
+"""
+
+import argparse
+import json
+import math
+import mmap
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+
+GRAPH_MAGIC = b"SSKGRAF\0"
+GRAPH_VERSION = 2
+NO_HEADWAY = 0xFFFF
+
+_HEADER = struct.Struct("<8sHHI")
+_ALIGN = 8
+
+
+def _string_table(values: list[str]) -> tuple[bytes, array]:
+    blob = bytearray()
+    offsets = array("I", [0])
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return bytes(blob), offsets
+
+
+def write_container(path: Path, magic: bytes, version: int, sections: dict, meta: dict | None = None):
+    """Write named arrays (array.array or bytes) into a versioned binary container."""
+    if sys.byteorder != "little":
+        raise ValueError("binary containers are written little-endian only")
+
+    directory = {"meta": meta or {}, "sections": {}}
+    payload = []
+    offset = 0
+    for name, data in sections.items():
+        if isinstance(data, array):
+            typecode, raw, count = data.typecode, data.tobytes(), len(data)
+        else:
+            typecode, raw, count = "B", bytes(data), len(data)
+        offset += -offset % _ALIGN
+        directory["sections"][name] = [typecode, offset, count]
+        payload.append((offset, raw))
+        offset += len(raw)
+
+    dir_bytes = json.dumps(directory, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    data_start = _HEADER.size + len(dir_bytes)
+    data_start += -data_start % _ALIGN
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(magic, version, 0, len(dir_bytes)))
+        f.write(dir_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for section_offset, raw in payload:
+            f.write(b"\0" * (data_start + section_offset - f.tell()))
+            f.write(raw)
+
+
+class BinaryContainer:
+    """Memory-mapped container; section(name) returns a typed memoryview."""
+
+    def __init__(self, path: Path, magic: bytes, max_version: int):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        file_magic, self.version, _, dir_len = _HEADER.unpack_from(self._map, 0)
+        if file_magic != magic:
+            raise ValueError(f"{path}: not a {magic.rstrip(bytes(1)).decode()} file")
+        if self.version > max_version:
+            raise ValueError(f"{path}: format version {self.version} is newer than supported {max_version}")
+
+        directory = json.loads(self._map[_HEADER.size:_HEADER.size + dir_len].decode("utf-8"))
+        self.meta = directory["meta"]
+        self._sections = directory["sections"]
+        data_start = _HEADER.size + dir_len
+        self._data_start = data_start + -data_start % _ALIGN
+        self._view = memoryview(self._map)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sections
+
+    def section(self, name: str):
+        typecode, offset, count = self._sections[name]
+        start = self._data_start + offset
+        size = count * array(typecode).itemsize
+        return self._view[start:start + size].cast(typecode)
+
+    def strings(self, name: str) -> list[str]:
+        """Decode a string table stored as <name>_blob + <name>_offsets."""
+        blob = bytes(self.section(f"{name}_blob"))
+        offsets = self.section(f"{name}_offsets")
+        return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def graph_to_csr(graph: dict) -> dict:
+    """CSR arrays of a transit_graph.json-style dict, named like the graph sections.
+
+    String tables are plain lists (stop_ids, stop_names, routes); weights and
+    headways are deciminutes as in the binary file.
+    """
+    stops = graph["stops"]
+    edges = graph["edges"]
+
+    stop_ids = list(stops)
+    stop_index = {sid: i for i, sid in enumerate(stop_ids)}
+    for neighbors in edges.values():
+        for dest, _, _ in neighbors:
+            if dest not in stop_index:
+                stop_index[dest] = len(stop_ids)
+                stop_ids.append(dest)
+    for source in edges:
+        if source not in stop_index:
+            stop_index[source] = len(stop_ids)
+            stop_ids.append(source)
+
+    routes = sorted({r for neighbors in edges.values() for _, _, rs in neighbors for r in rs}
+                    | set(graph.get("headways", {})))
+    route_index = {r: i for i, r in enumerate(routes)}
+    if len(routes) > 0xFFFF:
+        raise ValueError(f"{len(routes)} routes do not fit uint16 route indices")
+
+    names, lat, lon, flags = [], array("d"), array("d"), array("B")
+    for sid in stop_ids:
+        info = stops.get(sid)
+        if info:
+            names.append(info[0])
+            lat.append(info[1])
+            lon.append(info[2])
+            flags.append(1)
+        else:
+            names.append("")
+            lat.append(math.nan)
+            lon.append(math.nan)
+            flags.append(0)
+
+    edge_offsets = array("I", [0])
+    edge_dest, edge_weight = array("I"), array("H")
+    edge_route_offsets, edge_routes = array("I", [0]), array("H")
+    for sid in stop_ids:
+        for dest, minutes, rs in edges.get(sid, ()):
+            edge_dest.append(stop_index[dest])
+            edge_weight.append(min(0xFFFF, round(minutes * 10)))
+            edge_routes.extend(route_index[r] for r in rs)
+            edge_route_offsets.append(len(edge_routes))
+        edge_offsets.append(len(edge_dest))
+
+    headways = graph.get("headways", {})
+    route_headway = array("H", (round(headways[r] * 10) if r in headways else NO_HEADWAY for r in routes))
+
+    return {
+        "stop_ids": stop_ids,
+        "stop_names": names,
+        "stop_lat": lat,
+        "stop_lon": lon,
+        "stop_flags": flags,
+        "edge_offsets": edge_offsets,
+        "edge_dest": edge_dest,
+        "edge_weight": edge_weight,
+        "routes": routes,
+        "edge_route_offsets": edge_route_offsets,
+        "edge_routes": edge_routes,
+        "route_headway": route_headway,
+    }
+
+
+def write_graph_binary(graph: dict, path: Path):
+    """Write a transit_graph.json-style dict (stops, edges, headways, metadata) as CSR."""
+    csr = graph_to_csr(graph)
+    stop_id_blob, stop_id_offsets = _string_table(csr["stop_ids"])
+    stop_name_blob, stop_name_offsets = _string_table(csr["stop_names"])
+    route_blob, route_offsets = _string_table(csr["routes"])
+
+    write_container(path, GRAPH_MAGIC, GRAPH_VERSION, {
+        "stop_id_blob": stop_id_blob,
+        "stop_id_offsets": stop_id_offsets,
+        "stop_name_blob": stop_name_blob,
+        "stop_name_offsets": stop_name_offsets,
+        "stop_lat": csr["stop_lat"],
+        "stop_lon": csr["stop_lon"],
+        "stop_flags": csr["stop_flags"],
+        "edge_offsets": csr["edge_offsets"],
+        "edge_dest": csr["edge_dest"],
+        "edge_weight": csr["edge_weight"],
+        "route_blob": route_blob,
+        "route_offsets": route_offsets,
+        "edge_route_offsets": csr["edge_route_offsets"],
+        "edge_routes": csr["edge_routes"],
+        "route_headway": csr["route_headway"],
+    }, meta={
+        "metadata": graph.get("metadata", {}),
+        "stops": len(csr["stop_ids"]),
+        "edges": len(csr["edge_dest"]),
+        "routes": len(csr["routes"]),
+    })
+
+
+class BinaryGraph:
+    """Read-only CSR transit graph loaded from a .bin file.
+
+    Edge arrays stay memory-mapped; string tables are decoded on load.
+    """
+
+    def __init__(self, path: Path):
+        self.container = BinaryContainer(path, GRAPH_MAGIC, GRAPH_VERSION)
+        c = self.container
+        self.metadata = c.meta["metadata"]
+        self.stop_ids = c.strings("stop_id")
+        self.stop_names = c.strings("stop_name")
+        self.routes = c.strings("route")
+        self.stop_index = {sid: i for i, sid in enumerate(self.stop_ids)}
+
+        self.stop_lat = c.section("stop_lat")
+        self.stop_lon = c.section("stop_lon")
+        self.stop_flags = c.section("stop_flags")
+        self.edge_offsets = c.section("edge_offsets")
+        self.edge_dest = c.section("edge_dest")
+        self.edge_weight = c.section("edge_weight")
+        self.edge_route_offsets = c.section("edge_route_offsets")
+        self.edge_routes = c.section("edge_routes")
+        self.route_headway = c.section("route_headway")
+        self._no_headway = 0 if c.version == 1 else NO_HEADWAY
+
+    @property
+    def num_stops(self) -> int:
+        return len(self.stop_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_dest)
+
+    def edge_range(self, stop: int) -> range:
+        return range(self.edge_offsets[stop], self.edge_offsets[stop + 1])
+
+    def edge_route_indices(self, edge: int):
+        return self.edge_routes[self.edge_route_offsets[edge]:self.edge_route_offsets[edge + 1]]
+
+    def neighbors(self, stop: int):
+        """Yield (dest_index, minutes, [route_short, ...]) for one stop index."""
+        for e in self.edge_range(stop):
+            yield (self.edge_dest[e], self.edge_weight[e] / 10,
+                   [self.routes[r] for r in self.edge_route_indices(e)])
+
+    def headway(self, route: int) -> float | None:
+        value = self.route_headway[route]
+        return value / 10 if value != self._no_headway else None
+
+    def to_dict(self) -> dict:
+        """Rebuild the transit_graph.json structure (weights rounded to 0.1 min)."""
+        stops = {
+            sid: [self.stop_names[i], self.stop_lat[i], self.stop_lon[i]]
+            for i, sid in enumerate(self.stop_ids) if self.stop_flags[i] & 1
+        }
+        edges = {}
+        for i, sid in enumerate(self.stop_ids):
+            neighbors = [[self.stop_ids[d], minutes, rs] for d, minutes, rs in self.neighbors(i)]
+            if neighbors:
+                edges[sid] = neighbors
+        headways = {r: self.headway(i) for i, r in enumerate(self.routes) if self.headway(i) is not None}
+        return {
+            "metadata": self.metadata,
+            "stops": dict(sorted(stops.items())),
+            "edges": dict(sorted(edges.items())),
+            "headways": dict(sorted(headways.items())),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert transit_graph.json to the binary CSR format")
+    parser.add_argument("path", type=Path, help="transit_graph.json (convert) or .bin (with --check)")
+    parser.add_argument("-o", "--output", type=Path, help="output .bin (default: next to the JSON)")
+    parser.add_argument("--check", action="store_true", help="compare .bin against the JSON next to it")
+    args = parser.parse_args()
+
+    if args.check:
+        json_path = args.path.with_suffix(".json")
+        t = time.time()
+        with open(json_path, encoding="utf-8") as f:
+            reference = json.load(f)
+        json_ms = (time.time() - t) * 1000
+        t = time.time()
+        graph = BinaryGraph(args.path)
+        bin_ms = (time.time() - t) * 1000
+        same = graph.to_dict() == reference
+        print(f"JSON load {json_ms:.0f} ms, binary load {bin_ms:.0f} ms, round-trip {'OK' if same else 'DIFFERS'}")
+        sys.exit(0 if same else 1)
+
+    with open(args.path, encoding="utf-8") as f:
+        graph = json.load(f)
+    output = args.output or args.path.with_suffix(".bin")
+    write_graph_binary(graph, output)
+    print(f"Output: {output} ({output.stat().st_size / (1024 * 1024):.1f} MB, "
+          f"JSON {args.path.stat().st_size / (1024 * 1024):.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Shortest-time routing on the CSR transit graph.
+
+The graph (transit_graph.bin or .json) is loaded once into integer-indexed
+arrays; searches run on stop and route indices only. Cost model is the one of
+/api/dostupnost (src/app/api/dostupnost/route.ts):
+- search state = (stop, current route), "" before the first boarding
+- riding on along the current route costs the edge travel time
+- boarding a route costs min(headway / 2, MAX_WAIT) (DEFAULT_HEADWAY if
+  unknown), plus TRANSFER_PENALTY unless it is the first boarding
+- WALK edges cost the travel time only; boarding after a walk is a transfer
+
+Searches:
+    one_to_one(source, target)           stops when the target is settled
+    one_to_all(source)                   whole reachable network
+    within(source, max_minutes)          everything reachable in max_minutes,
+                                         states over the budget are never queued
+search() combines a budget with a target set and returns a SearchResult with
+the cost per stop and the predecessor states for path reconstruction. On a
+contracted graph (graph_contraction.py, JSON with "via") the stations inside
+a shortcut are reached at the shortcut's start + their offset, and paths are
+expanded to the intermediate stations.
+
+Usage:
+    python scripts/transit_router.py data/transit_graph.bin STOP_ID [TARGET_ID] [--max-minutes 60]
+"""
+
+import argparse
+import heapq
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from transit_graph_binary import GRAPH_MAGIC, BinaryGraph, graph_to_csr
+from walk_edges import WALK_ROUTE
+
+# Same as src/app/api/dostupnost/route.ts
+TRANSFER_PENALTY = 2
+DEFAULT_HEADWAY = 60
+MAX_WAIT = 10
+
+# Route codes of search states: route index + _FIRST_ROUTE
+_NOT_BOARDED = 0
+_WALKING = 1
+_FIRST_ROUTE = 2
+
+
+@dataclass
+class Journey:
+    """Best path to one stop; legs are (stop_id, minutes at the stop, route used to get there)."""
+    minutes: float
+    transfers: int
+    wait_minutes: float
+    routes: list = field(default_factory=list)
+    legs: list = field(default_factory=list)
+
+
+class SearchResult:
+    """Settled cost per stop of one search, with predecessor states for paths."""
+
+    def __init__(self, router: "TransitRouter", source: int, best: dict, dist: dict, pred: dict,
+                 settled: int, via_pred: dict | None = None):
+        self.router = router
+        self.source = source
+        self.best = best          # stop index → (minutes, state); state -1 - stop inside a shortcut
+        self.dist = dist          # state → minutes
+        self.pred = pred          # state → (predecessor state, edge index), (-1, -1) at the source
+        self.settled = settled    # states taken from the queue
+        self.via_pred = via_pred or {}  # stop inside a shortcut → (state, shortcut edge, route code)
+
+    def minutes(self, stop) -> float | None:
+        found = self.best.get(self.router.index(stop))
+        return found[0] if found else None
+
+    def reached(self) -> dict:
+        """stop_id → minutes for every reached stop."""
+        stop_ids = self.router.stop_ids
+        return {stop_ids[s]: minutes for s, (minutes, _) in self.best.items()}
+
+    def journey(self, stop) -> Journey | None:
+        """Path and transfer/wait summary to a reached stop, None if unreached."""
+        target = self.router.index(stop)
+        found = self.best.get(target)
+        if found is None:
+            return None
+        router = self.router
+        state, tail = found[1], None
+        if state < 0:  # inside a shortcut: path to its start, then part of the shortcut
+            state, edge, code = self.via_pred[target]
+            tail = (edge, code)
+        states = []  # (state, edge used to reach it)
+        while state != -1:
+            prev, edge = self.pred[state]
+            states.append((state, edge))
+            state = prev
+        states.reverse()
+
+        source, _ = divmod(states[0][0], router.codes_per_stop)
+        journey = Journey(minutes=found[0], transfers=0, wait_minutes=0.0,
+                          legs=[(router.stop_ids[source], 0.0, "")])
+        prev_code = _NOT_BOARDED
+
+        def ride(code: int) -> str:
+            """Route of a leg on code; counts waits, transfers and routes."""
+            if code < _FIRST_ROUTE:
+                return WALK_ROUTE
+            route = router.routes[code - _FIRST_ROUTE]
+            if code != prev_code:
+                journey.wait_minutes += router.board_wait[code]
+                if prev_code != _NOT_BOARDED:
+                    journey.transfers += 1
+                if route not in journey.routes:
+                    journey.routes.append(route)
+            return route
+
+        for state, edge in states[1:]:
+            stop, code = divmod(state, router.codes_per_stop)
+            minutes = self.dist[state]
+            route = ride(code)
+            via = router.edge_via.get(edge)
+            if via:
+                shortcut = router.edge_minutes[edge]
+                for via_stop, offset in via:
+                    journey.legs.append((router.stop_ids[via_stop], round(minutes - shortcut + offset, 1), route))
+            journey.legs.append((router.stop_ids[stop], round(minutes, 1), route))
+            prev_code = code
+
+        if tail is not None:
+            edge, code = tail
+            route = ride(code)
+            via = router.edge_via[edge]
+            end = next(offset for via_stop, offset in via if via_stop == target)
+            for via_stop, offset in via:
+                journey.legs.append((router.stop_ids[via_stop], round(found[0] - end + offset, 1), route))
+                if via_stop == target:
+                    break
+        return journey
+
+
+class TransitRouter:
+    """Integer-indexed CSR graph with /api/dostupnost-cost Dijkstra searches."""
+
+    def __init__(self, stop_ids: list, stop_names: list, routes: list, headways: list,
+                 edge_offsets, edge_dest, edge_weight, edge_route_offsets, edge_routes,
+                 via: dict | None = None):
+        """Arrays as in transit_graph_binary (weights in deciminutes); headways in minutes or None."""
+        self.stop_ids = stop_ids
+        self.stop_names = stop_names
+        self.routes = routes
+        self.stop_index = {sid: i for i, sid in enumerate(stop_ids)}
+        self.via = via or {}
+
+        self.edge_offsets = list(edge_offsets)
+        self.edge_dest = list(edge_dest)
+        self.edge_minutes = [w / 10 for w in edge_weight]
+
+        walk = routes.index(WALK_ROUTE) if WALK_ROUTE in routes else -1
+        codes = [_WALKING if r == walk else r + _FIRST_ROUTE for r in edge_routes]
+        self.edge_codes = [tuple(codes[edge_route_offsets[e]:edge_route_offsets[e + 1]])
+                           for e in range(len(self.edge_dest))]
+
+        self.codes_per_stop = len(routes) + _FIRST_ROUTE
+        self.board_wait = [0.0] * _FIRST_ROUTE + [
+            min((DEFAULT_HEADWAY if h is None else h) / 2, MAX_WAIT) for h in headways
+        ]
+        # wait + penalty summed first, as in the API (same float rounding at the budget limit)
+        self.transfer_cost = [wait + TRANSFER_PENALTY for wait in self.board_wait]
+
+        # Shortcut edge → [(stop index, minutes from the shortcut's start), ...] of its inner stations
+        self.edge_via = {}
+        for source_id, targets in self.via.items():
+            s = self.stop_index.get(source_id)
+            if s is None:
+                continue
+            for e in range(self.edge_offsets[s], self.edge_offsets[s + 1]):
+                inner = targets.get(stop_ids[self.edge_dest[e]])
+                if inner:
+                    self.edge_via[e] = [(self.stop_index[sid], offset) for sid, offset in inner
+                                        if sid in self.stop_index]
+
+    @classmethod
+    def from_binary(cls, graph: BinaryGraph) -> "TransitRouter":
+        return cls(graph.stop_ids, graph.stop_names, graph.routes,
+                   [graph.headway(r) for r in range(len(graph.routes))],
+                   graph.edge_offsets, graph.edge_dest, graph.edge_weight,
+                   graph.edge_route_offsets, graph.edge_routes)
+
+    @classmethod
+    def from_dict(cls, graph: dict) -> "TransitRouter":
+        """From a transit_graph.json dict (weights rounded to 0.1 min like the .bin)."""
+        csr = graph_to_csr(graph)
+        headways = graph.get("headways", {})
+        return cls(csr["stop_ids"], csr["stop_names"], csr["routes"],
+                   [headways.get(r) for r in csr["routes"]],
+                   csr["edge_offsets"], csr["edge_dest"], csr["edge_weight"],
+                   csr["edge_route_offsets"], csr["edge_routes"], via=graph.get("via"))
+
+    @classmethod
+    def load(cls, path: Path) -> "TransitRouter":
+        """transit_graph.bin (by magic) or transit_graph.json."""
+        with open(path, "rb") as f:
+            is_binary = f.read(len(GRAPH_MAGIC)) == GRAPH_MAGIC
+        if is_binary:
+            return cls.from_binary(BinaryGraph(path))
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    @property
+    def num_stops(self) -> int:
+        return len(self.stop_ids)
+
+    def index(self, stop) -> int | None:
+        """Stop index of a stop_id (indices pass through)."""
+        return stop if isinstance(stop, int) else self.stop_index.get(stop)
+
+    def _board(self, current: int, codes: tuple) -> tuple[int, float]:
+        """(route code, boarding cost) of the cheapest way onto an edge from a state on current."""
+        if current >= _FIRST_ROUTE and current in codes:
+            return current, 0.0
+        best = None
+        for code in codes:
+            if code == _WALKING:
+                entry = (_NOT_BOARDED if current == _NOT_BOARDED else _WALKING, 0.0)
+            else:
+                entry = (code, self.board_wait[code] if current == _NOT_BOARDED else self.transfer_cost[code])
+            if best is None or entry[1] < best[1]:
+                best = entry
+        return best
+
+    def search(self, source, max_minutes: float = math.inf, targets=None) -> SearchResult:
+        """Dijkstra from source over (stop, route) states.
+
+        States over max_minutes are not queued; with targets (stop IDs or
+        indices) the search stops once all of them are settled. Stations
+        inside shortcuts are queued as pseudo-states -1 - stop.
+        """
+        start = self.index(source)
+        if start is None:
+            raise KeyError(f"unknown stop {source!r}")
+        remaining = {self.index(t) for t in targets} if targets is not None else None
+        if remaining is not None:
+            remaining.discard(None)
+
+        k = self.codes_per_stop
+        offsets, dest, minutes, edge_codes = self.edge_offsets, self.edge_dest, self.edge_minutes, self.edge_codes
+        board_wait, transfer_cost = self.board_wait, self.transfer_cost
+        start_state = start * k + _NOT_BOARDED
+        dist = {start_state: 0.0}
+        pred = {start_state: (-1, -1)}
+        done = set()
+        best = {}
+        heap = [(0.0, start_state)]
+        push, pop = heapq.heappush, heapq.heappop
+        edge_via = self.edge_via
+        via_dist, via_pred = {}, {}
+
+        while heap:
+            d, state = pop(heap)
+            if state < 0:  # station inside a shortcut, reached for the first time
+                u = -1 - state
+                if u not in best:
+                    best[u] = (d, state)
+                    if remaining is not None:
+                        remaining.discard(u)
+                        if not remaining:
+                            break
+                continue
+            if state in done:
+                continue
+            done.add(state)
+            u, current = divmod(state, k)
+            if u not in best:
+                best[u] = (d, state)
+                if remaining is not None:
+                    remaining.discard(u)
+                    if not remaining:
+                        break
+
+            for e in range(offsets[u], offsets[u + 1]):
+                if edge_via and e in edge_via:
+                    code, cost = self._board(current, edge_codes[e])
+                    for inner, offset in edge_via[e]:
+                        nd = d + offset + cost
+                        if nd <= max_minutes and nd < via_dist.get(inner, math.inf):
+                            via_dist[inner] = nd
+                            via_pred[inner] = (state, e, code)
+                            push(heap, (nd, -1 - inner))
+                t = d + minutes[e]
+                if t > max_minutes:
+                    continue
+                base = dest[e] * k
+                codes = edge_codes[e]
+                if current >= _FIRST_ROUTE and current in codes:
+                    nxt = base + current
+                    if t < dist.get(nxt, math.inf):
+                        dist[nxt] = t
+                        pred[nxt] = (state, e)
+                        push(heap, (t, nxt))
+                for code in codes:
+                    if code == _WALKING:
+                        nd = t
+                        nxt = base + (_NOT_BOARDED if current == _NOT_BOARDED else _WALKING)
+                    else:
+                        nd = t + (board_wait[code] if current == _NOT_BOARDED else transfer_cost[code])
+                        if nd > max_minutes:
+                            continue
+                        nxt = base + code
+                    if nd < dist.get(nxt, math.inf):
+                        dist[nxt] = nd
+                        pred[nxt] = (state, e)
+                        push(heap, (nd, nxt))
+
+        return SearchResult(self, start, best, dist, pred, len(done), via_pred)
+
+    def one_to_one(self, source, target, max_minutes: float = math.inf) -> Journey | None:
+        return self.search(source, max_minutes, targets=[target]).journey(target)
+
+    def one_to_all(self, source) -> SearchResult:
+        return self.search(source)
+
+    def within(self, source, max_minutes: float) -> SearchResult:
+        return self.search(source, max_minutes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shortest-time queries on transit_graph.bin/.json")
+    parser.add_argument("graph", type=Path)
+    parser.add_argument("source", help="stop_id")
+    parser.add_argument("target", nargs="?", help="stop_id (default: one-to-all summary)")
+    parser.add_argument("--max-minutes", type=float, default=math.inf)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    router = TransitRouter.load(args.graph)
+    print(f"Loaded {router.num_stops} stops, {len(router.edge_dest)} edges "
+          f"in {(time.perf_counter() - t) * 1000:.0f} ms")
+
+    t = time.perf_counter()
+    targets = [args.target] if args.target else None
+    result = router.search(args.source, args.max_minutes, targets=targets)
+    ms = (time.perf_counter() - t) * 1000
+    print(f"Search: {ms:.1f} ms, {result.settled} states settled, {len(result.best)} stops reached")
+
+    if args.target:
+        journey = result.journey(args.target)
+        if journey is None:
+            print(f"{args.target} not reachable")
+            return
+        print(f"{journey.minutes:.1f} min, {journey.transfers} transfers, "
+              f"wait {journey.wait_minutes:.1f} min, routes {', '.join(journey.routes)}")
+        for stop_id, minutes, route in journey.legs:
+            name = router.stop_names[router.stop_index[stop_id]] if stop_id in router.stop_index else ""
+            print(f"  {minutes:6.1f}  {route:8} {stop_id}  {name}")
+    else:
+        reached = sorted(result.reached().values())
+        for limit in (15, 30, 45, 60, 90):
+            print(f"  ≤{limit:3} min: {sum(1 for m in reached if m <= limit)} stops")
+
+
+if __name__ == "__main__":
+    main()
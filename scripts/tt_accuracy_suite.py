@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Regresní sada přesnosti TT dekodéru proti GTFS pro celý KOMPLET.
+
+GTFS reference (zastávky, index názvů, cestovní časy) se načte jen jednou,
+města se dekódují a mapují paralelně v process poolu. Výstupem je tabulka
+přesnosti po městech (shoda, průměrný a p95 rozdíl, pokrytí) a časy fází.
+
+Použití:
+    python scripts/tt_accuracy_suite.py data/KOMPLET/Data3
+    python scripts/tt_accuracy_suite.py data/decoded_tt_v2 --workers 8 -o logs/accuracy.json
+    python scripts/tt_accuracy_suite.py data/KOMPLET/Data3 --min-accuracy 80  # exit 1 pod 80 %
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from stop_matcher import StopNameMatcher
+from test_tt_vs_gtfs import (
+    compare_edges,
+    load_gtfs_stop_times,
+    load_gtfs_stops,
+    load_tt_data,
+    normalize_stop_name,
+)
+from tt_decoder_v2 import TTDecoderV2
+
+# Sdílená read-only data pro workery (dědí se přes fork)
+_MATCHER: Optional[StopNameMatcher] = None
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentil metodou nejbližšího pořadí."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def collect_inputs(paths: List[Path]) -> List[Path]:
+    """Rozbal složky na .tt a .json soubory měst."""
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(path.glob('*.tt')))
+            files.extend(sorted(path.glob('*.json')))
+        elif path.suffix in ('.tt', '.json'):
+            files.append(path)
+    return files
+
+
+def _load_and_map(city_file: Path) -> Dict:
+    """Worker: dekóduj/načti město a namapuj jeho zastávky na GTFS."""
+    result = {'city': city_file.stem, 'file': str(city_file), 'ok': False}
+
+    t = time.time()
+    try:
+        if city_file.suffix == '.tt':
+            decoder = TTDecoderV2(city_file)
+            if not decoder.decode():
+                result['error'] = 'decode failed'
+                return result
+            tt_data = decoder.to_dict()
+        else:
+            tt_data = load_tt_data(city_file)
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+    result['load_ms'] = int((time.time() - t) * 1000)
+
+    t = time.time()
+    mapping = _MATCHER.match_all(tt_data['stops'])
+    result['match_ms'] = int((time.time() - t) * 1000)
+
+    result.update({
+        'ok': True,
+        'stops': tt_data['stops'],
+        'edges': tt_data['edges'],
+        'mapping': mapping,
+    })
+    return result
+
+
+def evaluate_city(city: Dict, gtfs_travel_times: Dict) -> Dict:
+    """Spočti metriky přesnosti jednoho města."""
+    t = time.time()
+    matches, mismatches = compare_edges(city['edges'], city['mapping'], gtfs_travel_times)
+    diffs = [m['diff'] for m in matches + mismatches]
+    compared = len(diffs)
+
+    return {
+        'city': city['city'],
+        'stops': len(city['stops']),
+        'mapped_stops': len(city['mapping']),
+        'edges': len(city['edges']),
+        'compared': compared,
+        'matched': len(matches),
+        'coverage_pct': round(100 * compared / len(city['edges']), 1) if city['edges'] else 0.0,
+        'match_pct': round(100 * len(matches) / compared, 1) if compared else None,
+        'mean_diff': round(sum(diffs) / compared, 2) if compared else None,
+        'p95_diff': percentile(diffs, 95),
+        'load_ms': city['load_ms'],
+        'match_ms': city['match_ms'],
+        'compare_ms': int((time.time() - t) * 1000),
+    }
+
+
+def _fmt(value, spec: str, width: int = 0, suffix: str = '') -> str:
+    return format(value, spec) + suffix if value is not None else '-'.rjust(width)
+
+
+def print_table(rows: List[Dict]):
+    """Vytiskni tabulku přesnosti po městech."""
+    print(f"{'Město':<24} {'Zast.':>6} {'Namap.':>6} {'Hrany':>6} {'Porov.':>6} "
+          f"{'Pokrytí':>8} {'Shoda':>7} {'Ø diff':>7} {'p95':>6} {'ms':>7}")
+    print('-' * 96)
+    for r in rows:
+        total_ms = r['load_ms'] + r['match_ms'] + r['compare_ms']
+        print(f"{r['city'][:24]:<24} {r['stops']:>6} {r['mapped_stops']:>6} {r['edges']:>6} "
+              f"{r['compared']:>6} {r['coverage_pct']:>7.1f}% {_fmt(r['match_pct'], '>6.1f', 7, '%')} "
+              f"{_fmt(r['mean_diff'], '>7.2f', 7)} {_fmt(r['p95_diff'], '>6.1f', 6)} {total_ms:>7}")
+
+
+def run_suite(city_files: List[Path], gtfs_dir: Path, workers: int) -> Dict:
+    """Spusť celou sadu a vrať výsledky."""
+    global _MATCHER
+
+    timings = {}
+    t0 = time.time()
+
+    # 1. GTFS zastávky + index názvů (jednou, sdílené přes fork)
+    t = time.time()
+    gtfs_stops = load_gtfs_stops(gtfs_dir)
+    _MATCHER = StopNameMatcher(gtfs_stops, normalize=normalize_stop_name)
+    timings['gtfs_stops_s'] = round(time.time() - t, 2)
+    print(f"✓ {len(gtfs_stops)} GTFS zastávek zaindexováno ({timings['gtfs_stops_s']} s)")
+
+    # 2. Dekódování + mapování měst paralelně
+    t = time.time()
+    ctx = multiprocessing.get_context('fork')
+    with ctx.Pool(workers) as pool:
+        cities = pool.map(_load_and_map, city_files, chunksize=1)
+    timings['decode_match_s'] = round(time.time() - t, 2)
+
+    failed = [c for c in cities if not c['ok']]
+    cities = [c for c in cities if c['ok']]
+    print(f"✓ {len(cities)} měst dekódováno a namapováno, {len(failed)} selhalo "
+          f"({timings['decode_match_s']} s, {workers} workerů)")
+
+    # 3. Jeden průchod stop_times.txt pro zastávky všech měst
+    t = time.time()
+    mapped = set()
+    for city in cities:
+        mapped.update(city['mapping'].values())
+    gtfs_travel_times = load_gtfs_stop_times(gtfs_dir, mapped)
+    timings['gtfs_stop_times_s'] = round(time.time() - t, 2)
+
+    # 4. Vyhodnocení
+    t = time.time()
+    rows = [evaluate_city(city, gtfs_travel_times) for city in cities]
+    timings['evaluate_s'] = round(time.time() - t, 2)
+    timings['total_s'] = round(time.time() - t0, 2)
+
+    compared = sum(r['compared'] for r in rows)
+    matched = sum(r['matched'] for r in rows)
+    all_edges = sum(r['edges'] for r in rows)
+
+    return {
+        'gtfs_dir': str(gtfs_dir),
+        'cities': rows,
+        'failed': [{'city': c['city'], 'error': c.get('error', '')} for c in failed],
+        'summary': {
+            'cities': len(rows),
+            'failed': len(failed),
+            'compared_edges': compared,
+            'match_pct': round(100 * matched / compared, 1) if compared else None,
+            'coverage_pct': round(100 * compared / all_edges, 1) if all_edges else 0.0,
+        },
+        'timings': timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Přesnost TT dekodéru proti GTFS pro celý KOMPLET")
+    parser.add_argument('inputs', nargs='+', type=Path, help=".tt/.json soubory nebo složky")
+    parser.add_argument('--gtfs-dir', type=Path, default=Path('data/GTFS_CR'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('-o', '--output', type=Path, help="zapiš výsledky jako JSON")
+    parser.add_argument('--min-accuracy', type=float,
+                        help="exit 1, pokud celková shoda (%%) klesne pod tuto hodnotu")
+    args = parser.parse_args()
+
+    if not args.gtfs_dir.exists():
+        print(f"❌ GTFS složka neexistuje: {args.gtfs_dir}")
+        sys.exit(1)
+
+    city_files = collect_inputs(args.inputs)
+    if not city_files:
+        print("❌ Žádné .tt ani .json soubory")
+        sys.exit(1)
+
+    result = run_suite(city_files, args.gtfs_dir, args.workers)
+
+    print()
+    print_table(result['cities'])
+    summary = result['summary']
+    print(f"\n{'='*96}")
+    print(f"Města: {summary['cities']} (selhalo {summary['failed']}), "
+          f"porovnáno hran: {summary['compared_edges']}, "
+          f"shoda: {_fmt(summary['match_pct'], '.1f')} %, pokrytí: {summary['coverage_pct']:.1f} %")
+    print("Časy: " + ", ".join(f"{k}={v}" for k, v in result['timings'].items()))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"💾 Výsledky: {args.output}")
+
+    if args.min_accuracy is not None:
+        if summary['match_pct'] is None or summary['match_pct'] < args.min_accuracy:
+            print(f"❌ Shoda pod prahem {args.min_accuracy} %")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
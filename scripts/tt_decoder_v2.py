@@ -329,29 +329,38 @@ class TTDecoderV2:
             'p_records': len(self.p_records)
         }
 
-    def export_json(self, output_path: Path):
-        """Export do JSON."""
+    def edge_averages(self) -> Dict[Tuple[int, int], float]:
+        """Vrať průměrný cestovní čas hran (minuty, 1 desetinné místo)."""
+        return {
+            edge: round(sum(times) / len(times), 1)
+            for edge, times in self.edges.items()
+        }
+
+    def to_dict(self) -> Dict:
+        """Vrať dekódovaná data ve struktuře exportovaného JSON."""
         edges_avg = {}
+        averages = self.edge_averages()
         for (from_idx, to_idx), times in self.edges.items():
-            avg_time = sum(times) / len(times)
             edges_avg[f"{from_idx}->{to_idx}"] = {
                 'from_stop': self.stops[from_idx] if from_idx < len(self.stops) else f"Stop#{from_idx}",
                 'to_stop': self.stops[to_idx] if to_idx < len(self.stops) else f"Stop#{to_idx}",
-                'travel_time_avg': round(avg_time, 1),
+                'travel_time_avg': averages[(from_idx, to_idx)],
                 'travel_time_min': min(times),
                 'travel_time_max': max(times),
                 'samples': len(times)
             }
 
-        data = {
+        return {
             'source_file': self.filepath.name,
             'stops': self.stops,
             'stats': self.get_stats(),
             'edges': edges_avg
         }
 
+    def export_json(self, output_path: Path):
+        """Export do JSON."""
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
 
 
 def batch_decode(data_dir: Path, output_dir: Path):
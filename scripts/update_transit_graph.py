@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Incremental update of transit_graph.json from a GTFS delta.
+
+A full build with --state persists the per-profile accumulators (travel time
+histograms, headway departures) and every trip's contribution to them. An
+update then subtracts removed/changed trips, streams stop_times.txt of the new
+feed for added/changed trips only (other lines are skipped without CSV
+parsing) and rewrites the graphs from the updated accumulators.
+
+The graphs go to the --output of the state's build, with the same artifacts
+(--binary, --tiles, --quantiles, --walk-radius, --contract, --components,
+--timetable, --frequencies); timetable and frequencies are rebuilt from the
+per-trip timetable rows kept in the state. The build_stats sidecar is
+rewritten with the update's steps.
+
+Usage:
+    python scripts/build_transit_graph_v2.py --state data/transit_graph_state.pkl
+    python scripts/gtfs_diff.py data/GTFS_CR_prev data/GTFS_CR -o data/gtfs_diff.json
+    python scripts/update_transit_graph.py data/transit_graph_state.pkl --diff data/gtfs_diff.json
+
+    # or explicit trip lists (one trip_id per line, or a JSON list)
+    python scripts/update_transit_graph.py data/transit_graph_state.pkl \\
+        --added-trips added.txt --removed-trips removed.txt
+
+Changes to routes, stops or the calendar affect trips that did not change
+themselves, so a diff touching those files needs a full rebuild (--force
+updates anyway).
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import build_transit_graph_v2 as builder
+
+# Files whose changes invalidate trips that are not listed in the diff
+FULL_REBUILD_FILES = ("routes.txt", "stops.txt", "calendar.txt", "calendar_dates.txt")
+
+
+def trips_from_diff(diff: dict) -> tuple[set, set, list]:
+    """(added, removed, blocking_files) from gtfs_diff.py output.
+
+    Changed trips (in trips.txt or in their stop_times) count as removed + added.
+    """
+    added, removed = set(), set()
+    files = diff.get("files", {})
+    for name in ("trips.txt", "stop_times.txt"):
+        info = files.get(name, {})
+        if info.get("status") != "compared":
+            continue
+        added.update(info["added"])
+        removed.update(info["removed"])
+        added.update(info["changed"])
+        removed.update(info["changed"])
+
+    blocking = []
+    for name in FULL_REBUILD_FILES:
+        info = files.get(name)
+        if not info:
+            continue
+        if info["status"] != "compared" or info["added"] or info["removed"] or info["changed"]:
+            blocking.append(name)
+    return added, removed, blocking
+
+
+def read_trip_list(path: Path) -> set:
+    """trip_ids from a JSON list or a text file with one trip_id per line."""
+    text = path.read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        return set(json.loads(text))
+    return {line.strip() for line in text.splitlines() if line.strip()}
+
+
+def update_accumulators(state: dict, gtfs_dir: Path, added: set, removed: set) -> dict:
+    """Apply the delta to state["accumulators"] (and "timetable_trips") in place.
+
+    Returns parent_info of the new feed.
+    """
+    profiles = state["profiles"]
+    accumulators = state["accumulators"]
+    contributions = state["contributions"]
+    timetable_trips = state["timetable_trips"]
+
+    # Subtract removed and changed trips (and stale copies of "added" ones)
+    t = time.time()
+    subtracted = 0
+    for trip_id in removed | added:
+        contribution = contributions.pop(trip_id, None)
+        if contribution is not None:
+            builder.remove_trip_contribution(accumulators, profiles, contribution)
+            subtracted += 1
+    print(f"  Subtracted {subtracted} trips ({time.time() - t:.1f}s)")
+    if timetable_trips is not None:
+        stale = removed | added
+        timetable_trips[:] = [trip for trip in timetable_trips if trip[0] not in stale]
+
+    # Small files of the new feed: trip → (route, profile mask), stop → parent
+    trip_info, stop_parent, parent_info = builder.load_feed(gtfs_dir, profiles)
+    if state.get("cluster_radius"):
+        builder.cluster_feed_stops(stop_parent, parent_info, state["cluster_radius"])
+    selected = {trip_id: trip_info[trip_id] for trip_id in added if trip_id in trip_info}
+
+    t = time.time()
+    stop_times_path = gtfs_dir / "stop_times.txt"
+    header, data_start = builder.read_stop_times_header(stop_times_path)
+    cols = builder.stop_times_columns(header)
+    rows = builder.iter_selected_trip_rows(stop_times_path, data_start, set(selected), cols[0])
+    new_contributions = {}
+    new_trips = [] if timetable_trips is not None else None
+    delta, lines, _ = builder.stream_feed(
+        gtfs_dir, selected, stop_parent, profiles, 1, new_contributions, rows=rows,
+        timetable_trips=new_trips,
+    )
+    if new_trips:
+        timetable_trips.extend(new_trips)
+
+    builder.merge_accumulators(accumulators, delta)
+    contributions.update(new_contributions)
+    print(f"  Added {len(new_contributions)} of {len(selected)} selected trips "
+          f"from {lines} rows ({time.time() - t:.1f}s)")
+
+    return parent_info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update transit graphs from a GTFS delta")
+    parser.add_argument("state", type=Path, help="state file from build_transit_graph_v2.py --state")
+    parser.add_argument("--diff", type=Path, help="gtfs_diff.py JSON output")
+    parser.add_argument("--added-trips", type=Path)
+    parser.add_argument("--removed-trips", type=Path)
+    parser.add_argument("--gtfs-dir", type=Path, help="new feed (default: feed of the state)")
+    parser.add_argument("--state-out", type=Path, help="updated state (default: overwrite STATE)")
+    parser.add_argument("--force", action="store_true",
+                        help="update even if routes/stops/calendar changed")
+    args = parser.parse_args()
+
+    if not (args.diff or args.added_trips or args.removed_trips):
+        parser.error("give --diff or --added-trips/--removed-trips")
+
+    t0 = time.time()
+    added, removed = set(), set()
+    if args.diff:
+        with open(args.diff, encoding="utf-8") as f:
+            added, removed, blocking = trips_from_diff(json.load(f))
+        if blocking and not args.force:
+            print(f"❌ {', '.join(blocking)} changed — run a full build "
+                  f"(build_transit_graph_v2.py --state) or pass --force")
+            sys.exit(1)
+    if args.added_trips:
+        added |= read_trip_list(args.added_trips)
+    if args.removed_trips:
+        removed |= read_trip_list(args.removed_trips)
+    print(f"Delta: {len(added)} added/changed trips, {len(removed)} removed/changed trips")
+
+    print(f"Loading state {args.state}...")
+    state = builder.load_build_state(args.state)
+    gtfs_dir = args.gtfs_dir or Path(state["gtfs_dir"])
+    output = Path(state["output"])
+    options = state["options"]
+    enabled = [name for name, value in options.items() if value]
+    print(f"  {len(state['contributions'])} trips, built {state['created']}")
+    print(f"  Output {output}" + (f" with {', '.join(enabled)}" if enabled else ""))
+
+    stats = builder.BuildStats()
+    parent_info = update_accumulators(state, gtfs_dir, added, removed)
+    stats.lap("update", len(added) + len(removed))
+
+    builder.write_profile_outputs(state["profiles"], state["accumulators"], parent_info,
+                                  output, options, state["timetable_trips"], stats,
+                                  source=builder.feed_source([(gtfs_dir.name, gtfs_dir)]))
+
+    builder.save_build_state(args.state_out or args.state, gtfs_dir, state["profiles"],
+                             state["accumulators"], state["contributions"],
+                             cluster_radius=state["cluster_radius"], output=output,
+                             options=options, timetable_trips=state["timetable_trips"])
+
+    stats_path = builder.build_stats_path(output)
+    stats.write(
+        stats_path,
+        feeds=[{"name": gtfs_dir.name, "dir": str(gtfs_dir),
+                "stop_times_bytes": (gtfs_dir / "stop_times.txt").stat().st_size}],
+        profiles=[p.name for p in state["profiles"]],
+        update={"state": str(args.state), "added": len(added), "removed": len(removed)},
+    )
+    print(f"\nBuild stats: {stats_path}")
+    print(f"Done in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
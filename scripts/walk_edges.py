@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Walking transfer edges between nearby stations.
+
+Stops are bucketed into a lat/lon grid whose cells are one search radius
+wide, so each stop is compared only with stops in its own and the 8
+neighbouring cells (near-linear instead of all pairs). Walking time uses the
+same model as /api/dostupnost: haversine distance × route factor at walking
+speed.
+
+Walking edges use the pseudo-route WALK_ROUTE with headway 0 (no waiting).
+"""
+
+import math
+from collections import defaultdict
+
+# Same walking model as src/app/api/dostupnost/route.ts
+WALK_SPEED_KMPH = 4.0
+WALK_ROUTE_MULTIPLIER = 1.3
+WALK_ROUTE = "WALK"
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def walk_minutes(distance_km: float) -> float:
+    """Walking time in minutes (0.1 min resolution, at least 0.5 like transit edges)."""
+    return max(0.5, round(distance_km * WALK_ROUTE_MULTIPLIER / WALK_SPEED_KMPH * 60, 1))
+
+
+def nearby_pairs(coords: dict, radius_km: float):
+    """Yield (stop_a, stop_b, distance_km) for every ordered pair within radius_km.
+
+    coords: {stop_id: (lat, lon)}; stops at (0, 0) (unknown position) are ignored.
+    """
+    located = [(sid, lat, lon) for sid, (lat, lon) in coords.items() if lat or lon]
+    if not located:
+        return
+    # Longitude cells sized at the highest latitude, so no cell is narrower than the radius
+    max_lat = max(abs(lat) for _, lat, _ in located)
+    cell_lat = radius_km / KM_PER_DEG_LAT
+    cell_lon = radius_km / (KM_PER_DEG_LAT * max(0.1, math.cos(math.radians(max_lat))))
+
+    grid = defaultdict(list)
+    for sid, lat, lon in located:
+        grid[(math.floor(lat / cell_lat), math.floor(lon / cell_lon))].append((sid, lat, lon))
+
+    for (row, col), cell in grid.items():
+        candidates = []
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                candidates.extend(grid.get((row + dr, col + dc), ()))
+        for sid, lat, lon in cell:
+            for other, other_lat, other_lon in candidates:
+                if other == sid:
+                    continue
+                distance = haversine_km(lat, lon, other_lat, other_lon)
+                if distance <= radius_km:
+                    yield sid, other, distance
+
+
+def build_walk_edges(stops: dict, radius_km: float) -> dict:
+    """Walking edges between stops of a transit_graph.json "stops" dict.
+
+    Returns {from_id: [[to_id, minutes], ...]} sorted by destination.
+    """
+    coords = {sid: (info[1], info[2]) for sid, info in stops.items()}
+    edges = defaultdict(list)
+    for sid, other, distance in nearby_pairs(coords, radius_km):
+        edges[sid].append([other, walk_minutes(distance)])
+    return {sid: sorted(neighbors) for sid, neighbors in sorted(edges.items())}
+
+
+def add_walk_edges(edges_out: dict, headways_out: dict, stops_out: dict, radius_km: float) -> int:
+    """Add walking edges to an aggregated graph in place; returns the number added.
+
+    Pairs already linked by a transit edge keep only the transit edge.
+    """
+    added = 0
+    for sid, neighbors in build_walk_edges(stops_out, radius_km).items():
+        linked = {dest for dest, _, _ in edges_out.get(sid, ())}
+        for dest, minutes in neighbors:
+            if dest in linked:
+                continue
+            edges_out[sid].append([dest, minutes, [WALK_ROUTE]])
+            added += 1
+    if added:
+        headways_out[WALK_ROUTE] = 0
+    return added
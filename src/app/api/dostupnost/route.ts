@@ -402,6 +402,7 @@ function buildStopToSchoolsIndex(
 const TRANSFER_PENALTY = 2; // minutes for changing platforms
 const DEFAULT_HEADWAY = 60; // fallback headway when route not in table (high penalty to discourage unknown routes)
 const MAX_WAIT = 10; // cap on waiting time (students plan their departure, so 10 min is realistic)
+const WALK_ROUTE = 'WALK'; // pseudo-route of precomputed walking edges (build_transit_graph_v2.py --walk-radius)
 const NEAR_MISS_EXTRA_MINUTES = 10; // how many minutes beyond limit to show in near miss count
 
 type DijkstraResult = {
@@ -453,7 +454,7 @@ function dijkstra(
 
     for (const [neighbor, travelTime, edgeRoutes] of neighbors) {
       // Can we continue on the same route?
-      const sameRoute = curRoute !== '' && edgeRoutes.includes(curRoute);
+      const sameRoute = curRoute !== '' && curRoute !== WALK_ROUTE && edgeRoutes.includes(curRoute);
 
       if (sameRoute) {
         // No transfer — just travel time
@@ -468,6 +469,18 @@ function dijkstra(
 
       // Consider transferring to each route available on this edge
       for (const edgeRoute of edgeRoutes) {
+        if (edgeRoute === WALK_ROUTE) {
+          // Walking: no wait and no boarding; boarding after a walk still counts as a transfer
+          const walkState = curRoute === '' ? '' : WALK_ROUTE;
+          const nd = d + travelTime;
+          if (nd > maxMinutes) continue;
+          const nKey = `${neighbor}|${walkState}`;
+          if (!dist.has(nKey) || nd < dist.get(nKey)!) {
+            dist.set(nKey, nd);
+            pq.push([nd, neighbor, walkState, transfers, waitMin, usedRoutes]);
+          }
+          continue;
+        }
         const headway = headways[edgeRoute] ?? DEFAULT_HEADWAY;
         const waitTime = Math.min(headway / 2, MAX_WAIT);
         const isFirstBoarding = curRoute === '';